@@ -14,8 +14,12 @@ from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import ValidationError
 
+from poker.bot_harness import harness_source, parse_report, DEFAULT_HANDS
+from poker.sandbox import run_python, limit_message, SandboxBusy
 from .models import PokerBot, BotFile, BotTemplate
 
+TEST_TIMEOUT = 30  # Seconds a Python bot test may run in the sandbox
+
 
 @ensure_csrf_cookie
 def get_csrf_token(request):
@@ -210,6 +214,10 @@ def run_code(request):
                 'error': 'code required'
             }, status=400)
         
+        if language == 'python':
+            hands = data.get('hands', DEFAULT_HANDS)
+            return JsonResponse(_run_python_test(code, test_scenario, hands, data.get('seed')))
+        
         # Create temporary file
         with tempfile.NamedTemporaryFile(mode='w', suffix=f'.{language}', delete=False) as temp_file:
             temp_file.write(code)
@@ -303,12 +311,11 @@ def _run_javascript_test(file_path, test_scenario):
         )
         
         if result.returncode == 0:
-            # Syntax is valid, run a basic test
-            test_output = _simulate_poker_test(test_scenario)
+            # Bots only play in the Python engine, so JavaScript stops at the syntax check
             return {
                 'success': True,
                 'message': 'Code compiled successfully',
-                'test_results': test_output,
+                'test_results': None,
                 'syntax_valid': True
             }
         else:
@@ -328,8 +335,8 @@ def _run_javascript_test(file_path, test_scenario):
         # Node.js not available, do basic validation
         return {
             'success': True,
-            'message': 'Basic validation passed (Node.js not available for full testing)',
-            'test_results': _simulate_poker_test(test_scenario),
+            'message': 'Syntax not checked (Node.js not available)',
+            'test_results': None,
             'syntax_valid': True
         }
     except Exception as e:
@@ -340,30 +347,44 @@ def _run_javascript_test(file_path, test_scenario):
         }
 
 
-def _simulate_poker_test(test_scenario):
-    """Simulate poker game scenarios for testing"""
-    test_scenarios = {
-        'basic': {
-            'scenario': 'Basic decision making',
-            'hands_played': 10,
-            'decisions': ['call', 'check', 'fold', 'call', 'check', 'raise', 'call', 'fold', 'check', 'call'],
-            'avg_decision_time': '50ms',
-            'status': 'passed'
-        },
-        'aggressive': {
-            'scenario': 'Aggressive play test',
-            'hands_played': 5,
-            'decisions': ['raise', 'raise', 'call', 'raise', 'call'],
-            'avg_decision_time': '45ms',
-            'status': 'passed'
-        },
-        'conservative': {
-            'scenario': 'Conservative play test',
-            'hands_played': 5,
-            'decisions': ['fold', 'check', 'call', 'fold', 'check'],
-            'avg_decision_time': '40ms',
-            'status': 'passed'
+def _run_python_test(code, test_scenario, hands, seed=None):
+    """Play a Python bot against the scenario's reference bot in the sandbox"""
+    try:
+        hands = int(hands)
+        seed = None if seed is None else int(seed)
+    except (TypeError, ValueError):
+        return {
+            'success': False,
+            'error': 'hands and seed must be integers'
+        }
+    
+    try:
+        # A seeded test deals the same cards every time, so it may come from the result cache
+        result = run_python(harness_source(code, test_scenario, hands, seed), timeout=TEST_TIMEOUT, cache=seed is not None)
+    except SandboxBusy:
+        return {
+            'success': False,
+            'error': 'All sandboxes are busy, try again'
         }
-    }
     
-    return test_scenarios.get(test_scenario, test_scenarios['basic'])
\ No newline at end of file
+    report = parse_report(result.stdout)
+    if report is None:
+        return {
+            'success': False,
+            'error': 'Test timed out' if result.timed_out else (limit_message(result) or result.stderr),
+            'resources': result.resources
+        }
+    if 'error' in report:
+        return {
+            'success': False,
+            'error': report['error'],
+            'syntax_valid': report.get('syntax_valid', True)
+        }
+    return {
+        'success': True,
+        'message': f"Played {report['hands_played']} hands against the {test_scenario} reference bot",
+        'test_results': report,
+        'syntax_valid': True,
+        'resources': result.resources,
+        'cached': result.cached
+    }
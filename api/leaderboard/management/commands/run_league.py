@@ -0,0 +1,137 @@
+import json
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections
+from poker.engine import BIG_BLIND
+from poker.models import BotRepository
+from poker.early_stopping import EARLY_STOPPING_METHODS
+from leaderboard.models import LeaguePairing
+
+
+def _play_pairing(bot_a, bot_b, hands, seed, early_stopping=None, profile=False):
+    """Worker: play one pairing headless and return its result fields"""
+    from poker.manager import BotInterface
+    from poker.headless import run_match
+    from poker.early_stopping import SequentialTest
+
+    bots = []
+    try:
+        test = SequentialTest(early_stopping, hands_to_play=hands) if early_stopping else None
+        bots = [BotInterface(bot_repository=bot_a, profile=profile), BotInterface(bot_repository=bot_b, profile=profile)]
+        summary = run_match(bots[0], bots[1], hands, seed=seed, on_hand=test)
+        for bot in bots:
+            bot.save_profile()
+        return {
+            'hands': summary.hands,
+            'hands_saved': hands - summary.hands,
+            'bot_a_delta': summary.deltas[0],
+            'bot_a_illegal': summary.illegal_actions[0],
+            'bot_b_illegal': summary.illegal_actions[1],
+            'error': '',
+        }
+    except Exception as e:
+        return {'hands': 0, 'hands_saved': 0, 'bot_a_delta': 0, 'bot_a_illegal': 0, 'bot_b_illegal': 0, 'error': str(e)}
+    finally:
+        for bot in bots:
+            bot.release()
+
+
+class Command(BaseCommand):
+    help = 'Play every pair of active bots against each other and print the league cross-table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hands', type=int, default=1000, help='Hands per pairing')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+        parser.add_argument('--seed', type=int, default=0, help='Card seed shared by every pairing')
+        parser.add_argument('--force', action='store_true', help='Replay every pairing, ignoring cached results')
+        parser.add_argument('--json', action='store_true', help='Print the cross-table as JSON')
+        parser.add_argument('--early-stopping', choices=EARLY_STOPPING_METHODS,
+                            help='End a pairing as soon as a sequential test decides its winner')
+        parser.add_argument('--profile', action='store_true',
+                            help='Profile bot decisions and add them to each bot version\'s BotProfile')
+
+    def handle(self, *args, **options):
+        hands, seed = options['hands'], options['seed']
+        bots = sorted(BotRepository.objects.filter(is_active=True).select_related('user'), key=lambda bot: str(bot.id))
+        if len(bots) < 2:
+            self.stdout.write(self.style.WARNING('A league needs at least two active bots'))
+            return
+
+        cached = {
+            (pairing.bot_a_id, pairing.bot_b_id): pairing
+            for pairing in LeaguePairing.objects.filter(bot_a__in=bots, bot_b__in=bots)
+        }
+        results = {}
+        to_play = []
+        for bot_a, bot_b in itertools.combinations(bots, 2):
+            pairing = cached.get((bot_a.id, bot_b.id))
+            if pairing is not None and not options['force'] and pairing.is_current(bot_a, bot_b, hands, seed, options['early_stopping']):
+                results[(bot_a.id, bot_b.id)] = pairing
+            else:
+                to_play.append((bot_a, bot_b))
+
+        self.stdout.write(f'{len(bots)} bots: replaying {len(to_play)} pairings, reusing {len(results)}')
+
+        if to_play:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                futures = {
+                    pool.submit(_play_pairing, bot_a, bot_b, hands, seed, options['early_stopping'], options['profile']): (bot_a, bot_b)
+                    for bot_a, bot_b in to_play
+                }
+                for future in as_completed(futures):
+                    bot_a, bot_b = futures[future]
+                    pairing, _ = LeaguePairing.objects.update_or_create(
+                        bot_a=bot_a, bot_b=bot_b,
+                        defaults=dict(
+                            future.result(),
+                            bot_a_version=bot_a.updated_at,
+                            bot_b_version=bot_b.updated_at,
+                            seed=seed,
+                            early_stopping=options['early_stopping'] or '',
+                        )
+                    )
+                    results[(bot_a.id, bot_b.id)] = pairing
+                    if pairing.error:
+                        self.stdout.write(self.style.ERROR(f'{bot_a.name} vs {bot_b.name} failed: {pairing.error}'))
+
+        table = self._cross_table(bots, results)
+        if options['json']:
+            self.stdout.write(json.dumps(table, indent=2))
+        else:
+            self._print_cross_table(table)
+        hands_saved = sum(pairing.hands_saved for pairing in results.values())
+        self.stdout.write(self.style.SUCCESS(f'League complete: {len(results)} pairings, {hands_saved} hands saved by early stopping'))
+
+    def _cross_table(self, bots, results):
+        """Big blinds won per 100 hands by each bot (row) against each other bot (column)"""
+        rows = {
+            str(bot.id): {'name': f'{bot.user.username}/{bot.name}', 'total': 0, 'hands': 0, 'results': {}}
+            for bot in bots
+        }
+        for (bot_a_id, bot_b_id), pairing in results.items():
+            if pairing.error or not pairing.hands:
+                continue
+            bb_per_100 = round(100 * pairing.bot_a_delta / BIG_BLIND / pairing.hands, 1)
+            for subject, opponent, sign in ((bot_a_id, bot_b_id, 1), (bot_b_id, bot_a_id, -1)):
+                row = rows[str(subject)]
+                row['results'][str(opponent)] = sign * bb_per_100
+                row['total'] += sign * pairing.bot_a_delta
+                row['hands'] += pairing.hands
+
+        standings = sorted(rows.items(), key=lambda item: item[1]['total'], reverse=True)
+        return [dict(row, id=bot_id, rank=rank) for rank, (bot_id, row) in enumerate(standings, 1)]
+
+    def _print_cross_table(self, table):
+        width = 8
+        header = f"{'':<32}" + ''.join(f'{row["rank"]:>{width}}' for row in table) + f"{'total':>{width + 2}}"
+        self.stdout.write(header)
+        for row in table:
+            cells = ''.join(
+                f"{'-' if other['id'] == row['id'] else row['results'].get(other['id'], '?'):>{width}}"
+                for other in table
+            )
+            self.stdout.write(f"{row['rank']:>3}. {row['name'][:27]:<28}{cells}{row['total']:>{width + 2}}")
+        self.stdout.write('Cells are big blinds per 100 hands won by the row bot; total is chips won.')
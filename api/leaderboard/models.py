@@ -1,3 +1,109 @@
 from django.db import models
+from users.models import CustomUser
+from poker.models import BotRepository
 
-# Create your models here.
+
+class Rating(models.Model):
+    """
+    Materialized ranking row per rated player (bot, human user or the house bot).
+
+    Updated incrementally when a match finishes, so the leaderboard is a plain
+    indexed scan ordered by rating rather than an aggregate over game history.
+    """
+    KINDS = (
+        ('bot', 'Bot'),
+        ('user', 'Human'),
+        ('house', 'House'),
+    )
+
+    subject = models.CharField(max_length=64, unique=True)  # Same keys as HudStats: 'bot:<id>', 'user:<id>', 'house'
+    kind = models.CharField(max_length=5, choices=KINDS)
+    bot = models.ForeignKey(BotRepository, on_delete=models.CASCADE, null=True, blank=True, related_name='ratings')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True, related_name='ratings')
+
+    # Glicko rating and rating deviation
+    rating = models.FloatField(default=1500.0)
+    deviation = models.FloatField(default=350.0)
+
+    matches = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    hands = models.PositiveIntegerField(default=0)
+    net_chips = models.IntegerField(default=0)
+    last_match_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'leaderboard_ratings'
+        indexes = [
+            # Keyset pagination: ORDER BY rating DESC, id with an optional kind filter
+            models.Index(fields=['-rating', 'id'], name='rating_rank_idx'),
+            models.Index(fields=['kind', '-rating', 'id'], name='rating_kind_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject}: {self.rating:.0f} (±{self.deviation:.0f})"
+
+
+class MatchResult(models.Model):
+    """A finished session that has been applied to the ratings (at most once)"""
+    session_id = models.UUIDField(unique=True)
+    player_subject = models.CharField(max_length=64)
+    opponent_subject = models.CharField(max_length=64)
+    score = models.FloatField()  # From the player's side: 1 win, 0.5 draw, 0 loss
+    hands = models.PositiveIntegerField(default=0)
+    player_delta = models.IntegerField(default=0)
+    player_rating_before = models.FloatField()
+    player_rating_after = models.FloatField()
+    opponent_rating_before = models.FloatField()
+    opponent_rating_after = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'leaderboard_matches'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['player_subject', 'created_at']),
+            models.Index(fields=['opponent_subject', 'created_at']),
+        ]
+
+
+class LeaguePairing(models.Model):
+    """
+    Result of one round-robin league pairing (see run_league).
+
+    Stays valid, and is reused by later league runs with the same hands, seed
+    and early stopping method, while neither bot's updated_at changes.
+    """
+    bot_a = models.ForeignKey(BotRepository, on_delete=models.CASCADE, related_name='league_pairings_a')
+    bot_b = models.ForeignKey(BotRepository, on_delete=models.CASCADE, related_name='league_pairings_b')
+    bot_a_version = models.DateTimeField()  # bot_a.updated_at when the pairing was played
+    bot_b_version = models.DateTimeField()
+    hands = models.PositiveIntegerField(default=0)
+    hands_saved = models.PositiveIntegerField(default=0)  # Hands skipped because the pairing was decided early
+    early_stopping = models.CharField(max_length=8, blank=True, default='')  # '', 'sprt' or 'bound'
+    seed = models.BigIntegerField(null=True, blank=True)
+    bot_a_delta = models.IntegerField(default=0)  # Chips won by bot_a (bot_b won the negative)
+    bot_a_illegal = models.PositiveIntegerField(default=0)
+    bot_b_illegal = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    played_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'league_pairings'
+        constraints = [
+            models.UniqueConstraint(fields=['bot_a', 'bot_b'], name='unique_league_pairing')
+        ]
+
+    def is_current(self, bot_a, bot_b, hands, seed, early_stopping=''):
+        """Whether this result can stand in for a new match between the two bots"""
+        return (
+            not self.error
+            and self.hands + self.hands_saved == hands
+            and self.seed == seed
+            # A pairing cut short by early stopping doesn't stand in for a full-length one
+            and self.early_stopping == (early_stopping or '')
+            and self.bot_a_version == bot_a.updated_at
+            and self.bot_b_version == bot_b.updated_at
+        )
@@ -0,0 +1,164 @@
+"""
+Incremental Glicko ratings for bots and human players.
+
+Each finished session counts as one match between its two seats, scored from
+the chips won over the session (win, draw or loss). Ratings are updated in
+place as matches finish; nothing is recomputed from history.
+"""
+import math
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from poker.hud_stats import player_key, HOUSE_KEY
+
+INITIAL_RATING = 1500.0
+INITIAL_DEVIATION = 350.0
+MIN_DEVIATION = 30.0  # Keep established ratings responsive
+PROVISIONAL_DEVIATION = 110.0  # Ratings less certain than this are flagged as provisional
+
+GLICKO_Q = math.log(10) / 400
+
+logger = logging.getLogger(__name__)
+
+
+def _g(deviation):
+    return 1 / math.sqrt(1 + 3 * (GLICKO_Q * deviation) ** 2 / math.pi ** 2)
+
+
+def expected_score(rating, opponent_rating, opponent_deviation):
+    """Expected score against an opponent (0..1)"""
+    return 1 / (1 + 10 ** (-_g(opponent_deviation) * (rating - opponent_rating) / 400))
+
+
+def glicko_update(rating, deviation, opponent_rating, opponent_deviation, score):
+    """
+    Glicko-1 update for a single game
+
+    Returns:
+        (new rating, new deviation)
+    """
+    g = _g(opponent_deviation)
+    expected = expected_score(rating, opponent_rating, opponent_deviation)
+    d_squared = 1 / (GLICKO_Q ** 2 * g ** 2 * expected * (1 - expected))
+    precision = 1 / deviation ** 2 + 1 / d_squared
+    new_rating = rating + GLICKO_Q / precision * g * (score - expected)
+    new_deviation = max(math.sqrt(1 / precision), MIN_DEVIATION)
+    return new_rating, new_deviation
+
+
+def match_score(net_chips):
+    """Score of a match from the chips the player won over it"""
+    if net_chips > 0:
+        return 1.0
+    if net_chips < 0:
+        return 0.0
+    return 0.5
+
+
+def _subject_kind(subject):
+    if subject == HOUSE_KEY:
+        return 'house'
+    return subject.split(':', 1)[0]
+
+
+def _locked_ratings(seats):
+    """
+    Fetch (creating if needed) and lock the Rating rows of both seats
+
+    Args:
+        seats: {subject: (bot, user)}
+    """
+    from .models import Rating
+
+    for subject, (bot, user) in seats.items():
+        Rating.objects.get_or_create(
+            subject=subject,
+            defaults={'kind': _subject_kind(subject), 'bot': bot, 'user': user}
+        )
+    # Lock in a fixed order so concurrent matches sharing a player cannot deadlock
+    rows = Rating.objects.select_for_update().filter(subject__in=seats).order_by('subject')
+    return {row.subject: row for row in rows}
+
+
+def _apply(row, score, rating, deviation, hands, net_chips, now):
+    row.rating, row.deviation = rating, deviation
+    row.matches += 1
+    if score == 1.0:
+        row.wins += 1
+    elif score == 0.0:
+        row.losses += 1
+    else:
+        row.draws += 1
+    row.hands += hands
+    row.net_chips += net_chips
+    row.last_match_at = now
+    row.save()
+
+
+def record_session_result(session):
+    """
+    Apply a finished session to the ratings of its two seats
+
+    The session's result is taken from its HandHistory rows, so pending hands
+    must be flushed first. Each session is rated at most once.
+
+    Returns:
+        MatchResult, or None if the session was already rated or has no hands
+    """
+    from poker.models import HandHistory
+    from .models import MatchResult
+
+    totals = HandHistory.objects.filter(session_id=session.session_id).aggregate(
+        hands=Count('id'), net=Sum('player_delta')
+    )
+    if not totals['hands']:
+        return None
+
+    if session.play_mode == 'bot':
+        player_seat = (session.player_bot, None)
+    else:
+        player_seat = (None, session.player)
+    opponent_seat = (session.opponent_bot, None)
+    player_subject = player_key(*player_seat)
+    opponent_subject = player_key(*opponent_seat)
+    if player_subject == opponent_subject:
+        return None  # A bot playing itself says nothing about its strength
+
+    net = totals['net'] or 0
+    score = match_score(net)
+    now = timezone.now()
+
+    try:
+        with transaction.atomic():
+            if MatchResult.objects.filter(session_id=session.session_id).exists():
+                return None
+
+            rows = _locked_ratings({player_subject: player_seat, opponent_subject: opponent_seat})
+            player, opponent = rows[player_subject], rows[opponent_subject]
+            before = (player.rating, player.deviation, opponent.rating, opponent.deviation)
+
+            # Both sides are updated from the pre-match values
+            player_rating = glicko_update(before[0], before[1], before[2], before[3], score)
+            opponent_rating = glicko_update(before[2], before[3], before[0], before[1], 1 - score)
+            _apply(player, score, *player_rating, totals['hands'], net, now)
+            _apply(opponent, 1 - score, *opponent_rating, totals['hands'], -net, now)
+
+            return MatchResult.objects.create(
+                session_id=session.session_id,
+                player_subject=player_subject,
+                opponent_subject=opponent_subject,
+                score=score,
+                hands=totals['hands'],
+                player_delta=net,
+                player_rating_before=before[0],
+                player_rating_after=player.rating,
+                opponent_rating_before=before[2],
+                opponent_rating_after=opponent.rating,
+            )
+    except IntegrityError:
+        # Rated concurrently by another worker; the transaction above was rolled back
+        logger.info(f"Session {session.session_id} was already rated")
+        return None
@@ -2,5 +2,5 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
-    # Add leaderboard URLs here later
-]
\ No newline at end of file
+    path('', views.leaderboard, name='leaderboard'),
+]
@@ -1,3 +1,102 @@
-from django.shortcuts import render
+import json
+import base64
+import logging
+from django.db.models import Q
+from django.http import JsonResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from .models import Rating
+from .ratings import PROVISIONAL_DEVIATION
 
-# Create your views here.
+LEADERBOARD_PAGE_SIZE = 50
+LEADERBOARD_MAX_PAGE_SIZE = 200
+LEADERBOARD_TYPES = {
+    'bots': ['bot'],
+    'humans': ['user'],
+    'overall': ['bot', 'user'],
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_cursor(row, rank):
+    payload = json.dumps({'r': row.rating, 'id': row.id, 'rank': rank}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def _decode_cursor(cursor):
+    payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return float(payload['r']), int(payload['id']), int(payload['rank'])
+
+
+def _serialize_rating(row, rank):
+    if row.bot_id:
+        name, university = row.bot.name, row.bot.user.university
+    elif row.user_id:
+        name, university = row.user.username, row.user.university
+    else:
+        name, university = 'House Bot', ''
+    return {
+        'rank': rank,
+        'subject': row.subject,
+        'name': name,
+        'university': university,
+        'type': 'human' if row.kind == 'user' else row.kind,
+        'rating': round(row.rating),
+        'deviation': round(row.deviation),
+        'provisional': row.deviation > PROVISIONAL_DEVIATION,
+        'games': row.matches,
+        'wins': row.wins,
+        'losses': row.losses,
+        'draws': row.draws,
+        'winRate': round(100 * row.wins / row.matches, 1) if row.matches else 0,
+        'hands': row.hands,
+        'earnings': row.net_chips,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def leaderboard(request):
+    """
+    Ratings ordered from best to worst, paginated by keyset
+
+    Query params:
+        type: overall (default), bots or humans
+        limit: page size
+        cursor: next_cursor of the previous page
+    """
+    try:
+        kinds = LEADERBOARD_TYPES.get(request.GET.get('type', 'overall'))
+        if kinds is None:
+            return JsonResponse({'error': f"type must be one of {', '.join(LEADERBOARD_TYPES)}"}, status=400)
+
+        try:
+            limit = int(request.GET.get('limit', LEADERBOARD_PAGE_SIZE))
+            cursor = request.GET.get('cursor')
+            after = _decode_cursor(cursor) if cursor else None
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'Invalid limit or cursor'}, status=400)
+        limit = max(1, min(limit, LEADERBOARD_MAX_PAGE_SIZE))
+
+        rows = Rating.objects.filter(kind__in=kinds, matches__gt=0)
+        rank = 0
+        if after is not None:
+            rating, last_id, rank = after
+            # Seek past the last row of the previous page instead of OFFSET
+            rows = rows.filter(Q(rating__lt=rating) | Q(rating=rating, id__gt=last_id))
+        rows = list(
+            rows.select_related('bot__user', 'user').order_by('-rating', 'id')[:limit + 1]
+        )
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        results = [_serialize_rating(row, rank + i + 1) for i, row in enumerate(rows)]
+
+        return JsonResponse({
+            'results': results,
+            'next_cursor': _encode_cursor(rows[-1], rank + len(rows)) if has_more else None,
+        })
+    except Exception as e:
+        logger.error(f"Error getting leaderboard: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,273 @@
+"""
+Engine benchmark suite.
+
+Every benchmark is a function taking a size ``n`` and returning how many
+operations (hands, calls) it performed; the runner times a few repetitions
+and reports operations per second. Results are written as JSON so a later
+run can be compared against a stored baseline (see run_benchmarks and
+compare_benchmarks).
+
+Benchmarks marked ``db`` drive PokerGameManager / BotGameSimulator and need
+the in-memory database of poker_backend.settings_benchmark.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import tempfile
+from collections import namedtuple
+
+from .engine import (
+    RoundState, CallAction, CheckAction, RaiseAction,
+    SMALL_BLIND, BIG_BLIND, STARTING_STACK, Game, Player
+)
+
+BASELINE_VERSION = 1
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10  # Slowdown (fraction of ops/sec) reported as a regression
+
+Benchmark = namedtuple('Benchmark', ['name', 'function', 'size', 'unit', 'db'])
+
+BENCHMARKS = {}
+
+
+def benchmark(name, size, unit='ops', db=False):
+    """Register a benchmark function"""
+    def register(function):
+        BENCHMARKS[name] = Benchmark(name, function, size, unit, db)
+        return function
+    return register
+
+
+def _preflop_state(deck):
+    return RoundState(
+        button=0,
+        street=0,
+        final_street=5,
+        pips=[SMALL_BLIND, BIG_BLIND],
+        stacks=[STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND],
+        hands=[deck[0:2], deck[2:4]],
+        deck=deck[4:],
+        previous_state=None
+    )
+
+
+def _check_call(round_state, player_message=None):
+    legal_actions = round_state.legal_actions()
+    return CheckAction() if CheckAction in legal_actions else CallAction()
+
+
+_DECK = ['As', 'Kd', '7c', '2h', 'Qs', 'Jh', '3d', '9c', '5s', 'Td', '4h']
+# SB raises, BB calls, then checked down: every street of proceed is exercised
+_LINE = [RaiseAction(6), CallAction(), CheckAction(), CheckAction(),
+         CheckAction(), CheckAction(), CheckAction(), CheckAction()]
+
+
+@benchmark('round_state.proceed', size=20000, unit='hands')
+def bench_proceed(n):
+    for _ in range(n):
+        round_state = _preflop_state(_DECK)
+        for action in _LINE:
+            round_state = round_state.proceed(action)
+    return n
+
+
+@benchmark('round_state.legal_actions', size=200000, unit='calls')
+def bench_legal_actions(n):
+    round_state = _preflop_state(_DECK)
+    for _ in range(n):
+        round_state.legal_actions()
+    return n
+
+
+@benchmark('round_state.raise_bounds', size=200000, unit='calls')
+def bench_raise_bounds(n):
+    round_state = _preflop_state(_DECK)
+    for _ in range(n):
+        round_state.raise_bounds()
+    return n
+
+
+@benchmark('round_state.showdown', size=20000, unit='showdowns')
+def bench_showdown(n):
+    round_state = _preflop_state(_DECK)._replace(street=5, pips=[0, 0], stacks=[190, 190])
+    for _ in range(n):
+        round_state.showdown()
+    return n
+
+
+@benchmark('game.run_round', size=2000, unit='hands')
+def bench_run_round(n):
+    game = Game(log_dir=tempfile.mkdtemp(prefix='poker_benchmark_'), seed=0)
+    players = [Player('A', _check_call), Player('B', _check_call)]
+    for _ in range(n):
+        game.run_round(players)
+        game.log.clear()
+    return n
+
+
+@benchmark('headless.run_match', size=2000, unit='hands')
+def bench_headless(n):
+    from .headless import run_match
+    from .manager import SimpleBot
+    return run_match(SimpleBot(), SimpleBot(), n, seed=0).hands
+
+
+@benchmark('vector_sim.simulate', size=16384, unit='hands')
+def bench_vector_sim(n):
+    from .vector_sim import simulate, ThresholdBot, VectorSimpleBot
+    return simulate(ThresholdBot(), VectorSimpleBot(), tables=n, seed=0).hands
+
+
+def _benchmark_user():
+    from users.models import CustomUser
+    user, _ = CustomUser.objects.get_or_create(
+        username='benchmark', defaults={'email': 'benchmark@example.com', 'coins': 10 ** 9}
+    )
+    return user
+
+
+@benchmark('manager.process_player_action', size=200, unit='hands', db=True)
+def bench_process_player_action(n):
+    from .models import GameSession
+    from .manager import PokerGameManager
+
+    session = GameSession.objects.create(player=_benchmark_user(), play_mode='human', current_coins=STARTING_STACK)
+    PokerGameManager(session).start_new_hand(continue_session=False)
+    hands = 0
+    while hands < n:
+        # A fresh manager per action, as in the make_move view
+        manager = PokerGameManager(session)
+        round_state = manager._deserialize_game_state(session.game_state)
+        action = 'check' if round_state and CheckAction in round_state.legal_actions() else 'call'
+        response = manager.process_player_action(action, 0)
+        if response.get('hand_complete') or round_state is None:
+            hands += 1
+            manager.flush_hand_history()
+            manager.start_new_hand(continue_session=True)
+    return hands
+
+
+@benchmark('simulator.bot_game', size=200, unit='hands', db=True)
+def bench_bot_game_simulator(n):
+    from .models import GameSession, BotRepository
+    from .manager import BotGameSimulator
+
+    user = _benchmark_user()
+    # A repository named 'simple' loads the built-in SimpleBot
+    bot, _ = BotRepository.objects.get_or_create(user=user, name='simple')
+    session = GameSession.objects.create(
+        player=user, play_mode='bot', player_bot=bot, opponent_bot=bot,
+        hands_to_play=n, player_stack=STARTING_STACK, bot_stack=STARTING_STACK
+    )
+    simulator = BotGameSimulator(session.session_id)
+    simulator.step_delay = 0
+    simulator.start()
+    simulator.join()
+    if simulator.error:
+        raise RuntimeError(simulator.error)
+    return simulator.hands_played
+
+
+def run_benchmark(bench, repeat=DEFAULT_REPEAT, scale=1.0):
+    """
+    Time a benchmark
+
+    Returns:
+        dict with median/best ops per second and the raw timings
+    """
+    size = max(1, int(bench.size * scale))
+    bench.function(max(1, size // 10))  # Warm up caches and imports
+    rates = []
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ops = bench.function(size)
+        elapsed = time.perf_counter() - start
+        timings.append(round(elapsed, 6))
+        rates.append(ops / elapsed if elapsed else 0.0)
+    return {
+        'unit': bench.unit,
+        'size': size,
+        'ops_per_sec': round(statistics.median(rates), 2),
+        'best_ops_per_sec': round(max(rates), 2),
+        'stdev_ops_per_sec': round(statistics.stdev(rates), 2) if len(rates) > 1 else 0.0,
+        'timings': timings,
+    }
+
+
+def environment():
+    return {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_suite(names=None, repeat=DEFAULT_REPEAT, scale=1.0, include_db=True, on_result=None):
+    """
+    Run the selected benchmarks (all by default)
+
+    Returns:
+        dict ready to be written as a JSON baseline
+    """
+    results = {}
+    skipped = {}
+    for name, bench in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        if bench.db and not include_db:
+            skipped[name] = 'needs the benchmark database'
+            continue
+        try:
+            results[name] = run_benchmark(bench, repeat=repeat, scale=scale)
+        except ImportError as e:
+            skipped[name] = str(e)
+            continue
+        if on_result:
+            on_result(name, results[name])
+    return {
+        'version': BASELINE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment(),
+        'results': results,
+        'skipped': skipped,
+    }
+
+
+def load_results(path):
+    with open(path) as results_file:
+        data = json.load(results_file)
+    if data.get('version') != BASELINE_VERSION:
+        raise ValueError(f"{path}: unsupported benchmark file version {data.get('version')}")
+    return data
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two benchmark result sets
+
+    Returns:
+        list of (name, baseline ops/sec, current ops/sec, change, status) where
+        change is the relative difference in ops/sec and status is
+        'regression', 'improvement', 'ok' or 'missing'
+    """
+    rows = []
+    for name, base in baseline['results'].items():
+        result = current['results'].get(name)
+        if result is None:
+            rows.append((name, base['ops_per_sec'], None, None, 'missing'))
+            continue
+        change = (result['ops_per_sec'] - base['ops_per_sec']) / base['ops_per_sec'] if base['ops_per_sec'] else 0.0
+        if change < -threshold:
+            status = 'regression'
+        elif change > threshold:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append((name, base['ops_per_sec'], result['ops_per_sec'], change, status))
+    return rows
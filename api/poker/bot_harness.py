@@ -0,0 +1,179 @@
+"""
+Test harness for bots submitted from the IDE.
+
+Plays the submitted player.py source against a reference bot (see
+reference_bots) through the headless runner and reports how it did: chips
+won, decision latency percentiles, illegal actions, exceptions and
+decisions that ran past the time limit. It runs inside the sandbox (see
+sandbox.py) and must not import Django.
+
+    source = harness_source(code, opponent='basic', hands=100, seed=1)
+    report = parse_report(run_python(source, timeout=30).stdout)
+"""
+import io
+import sys
+import json
+import time
+import types
+import signal
+import contextlib
+
+from .engine import FoldAction, CallAction, CheckAction, RaiseAction, BIG_BLIND
+from .headless import run_match
+from .decks import new_seed
+from .bot_loader import find_bot_class
+from .reference_bots import REFERENCE_BOTS
+
+DEFAULT_HANDS = 100
+MAX_HANDS = 1000
+DECISION_TIMEOUT = 1.0  # Seconds a decision may take before it counts as timed out
+BOT_OUTPUT_LIMIT = 4096  # Characters of the bot's own printing kept in the report
+REPORT_PREFIX = 'HARNESS_REPORT '
+ACTION_TYPES = {
+    'FoldAction': FoldAction,
+    'CallAction': CallAction,
+    'CheckAction': CheckAction,
+    'RaiseAction': RaiseAction,
+}
+
+
+class DecisionTimeout(BaseException):
+    """
+    Raised in a bot's get_action when its time is up; not an Exception, so a
+    bot catching Exception around its work doesn't swallow it
+    """
+
+
+def load_source(code):
+    """
+    Bot instance from player.py source, with the engine's action types injected
+    the way BotInterface does it
+    """
+    module = types.ModuleType('player')
+    module.__file__ = 'player.py'
+    module.__dict__.update(ACTION_TYPES)
+    exec(compile(code, 'player.py', 'exec'), module.__dict__)
+    module.__dict__.update(ACTION_TYPES)
+
+    bot_class = find_bot_class(module)
+    if bot_class is None:
+        if callable(getattr(module, 'get_action', None)):
+            return module  # The module itself has get_action directly as a function
+        raise ValueError("No bot class with get_action method found")
+    return bot_class()
+
+
+class TimedBot:
+    """
+    Wraps a bot, timing its decisions and cutting off slow ones
+
+    When the timeout passes, DecisionTimeout is raised in the bot and the
+    decision counts as timed out even if the bot catches it; the headless
+    runner then gets a TimeoutError, which it treats like any other exception
+    (check/fold instead).
+    """
+    def __init__(self, bot, timeout=DECISION_TIMEOUT):
+        self.bot = bot
+        self.timeout = timeout
+        self.latencies = []
+        self.timeouts = 0
+        self.timed_out = False
+
+    def _alarm(self, signum, frame):
+        self.timed_out = True
+        raise DecisionTimeout()
+
+    def get_action(self, game_state, round_state, active):
+        self.timed_out = False
+        action = None
+        signal.setitimer(signal.ITIMER_REAL, self.timeout)
+        start = time.perf_counter()
+        try:
+            action = self.bot.get_action(game_state, round_state, active)
+        except DecisionTimeout:
+            pass
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            self.latencies.append(time.perf_counter() - start)
+        if self.timed_out:
+            self.timeouts += 1
+            raise TimeoutError(f"Decision took longer than {self.timeout}s")
+        return action
+
+
+def latency_summary(latencies):
+    """Percentiles of decision times, in milliseconds"""
+    samples = sorted(seconds * 1000 for seconds in latencies)
+    if not samples:
+        return {'count': 0}
+    count = len(samples)
+    return {
+        'count': count,
+        'mean_ms': round(sum(samples) / count, 3),
+        'p50_ms': round(samples[int(0.50 * (count - 1))], 3),
+        'p90_ms': round(samples[int(0.90 * (count - 1))], 3),
+        'p99_ms': round(samples[int(0.99 * (count - 1))], 3),
+        'max_ms': round(samples[-1], 3),
+    }
+
+
+def run_harness(code, opponent='basic', hands=DEFAULT_HANDS, seed=None, decision_timeout=DECISION_TIMEOUT):
+    """
+    Play the bot in ``code`` against a reference bot
+
+    Returns:
+        Report dict; it has an 'error' key if the bot could not be loaded
+    """
+    if opponent not in REFERENCE_BOTS:
+        return {'error': f"Unknown opponent {opponent}, expected one of {sorted(REFERENCE_BOTS)}"}
+    hands = max(1, min(int(hands), MAX_HANDS))
+    seed = new_seed() if seed is None else int(seed)
+
+    bot_output = io.StringIO()
+    with contextlib.redirect_stdout(bot_output):
+        try:
+            bot = load_source(code)
+        except SyntaxError as e:
+            return {'error': f"Syntax error: {e}", 'syntax_valid': False}
+        except Exception as e:
+            return {'error': f"Could not load bot: {e}", 'syntax_valid': True}
+        timed_bot = TimedBot(bot, decision_timeout)
+        previous_handler = signal.signal(signal.SIGALRM, timed_bot._alarm)
+        try:
+            summary = run_match(timed_bot, REFERENCE_BOTS[opponent](), hands, seed=seed)
+        finally:
+            signal.signal(signal.SIGALRM, previous_handler)
+
+    errors = summary.errors[0] - timed_bot.timeouts
+    return {
+        'opponent': opponent,
+        'hands_played': summary.hands,
+        'seed': seed,
+        'bankroll': summary.deltas[0],
+        'big_blinds_per_100': round(summary.deltas[0] / BIG_BLIND / summary.hands * 100, 2),
+        'decision_latency': latency_summary(timed_bot.latencies),
+        'illegal_actions': summary.illegal_actions[0] - summary.errors[0],
+        'errors': errors,
+        'timeouts': timed_bot.timeouts,
+        'bot_output': bot_output.getvalue()[-BOT_OUTPUT_LIMIT:],
+    }
+
+
+def main(params):
+    """Sandbox entry point: run the harness and print the report"""
+    report = run_harness(**params)
+    sys.stdout.write(REPORT_PREFIX + json.dumps(report) + '\n')
+
+
+def harness_source(code, opponent='basic', hands=DEFAULT_HANDS, seed=None, decision_timeout=DECISION_TIMEOUT):
+    """Python source running the harness, for sandbox.run_python"""
+    params = {'code': code, 'opponent': opponent, 'hands': hands, 'seed': seed, 'decision_timeout': decision_timeout}
+    return f"import json\nfrom poker.bot_harness import main\nmain(json.loads({json.dumps(params)!r}))\n"
+
+
+def parse_report(stdout):
+    """The report printed by main, or None if the run didn't get that far"""
+    for line in reversed(stdout.splitlines()):
+        if line.startswith(REPORT_PREFIX):
+            return json.loads(line[len(REPORT_PREFIX):])
+    return None
@@ -0,0 +1,238 @@
+"""
+Loading of user bot modules.
+
+A bot's player.py is imported under a private module name. While it runs,
+the bot directory (and the skeleton directory next to it) is put at the
+front of sys.path; afterwards those entries are removed again and the bot's
+own helper modules (its skeleton package, other files in its directory) are
+taken out of sys.modules, so bots shipping same-named helpers don't pick up
+each other's copies and nothing accumulates per load.
+
+Loaded modules are kept in a bounded LRU cache keyed by the bot file and its
+modification time. Every load_bot holds its entry until release_bot is called
+for it. Evicting an entry unregisters the module and deletes the directory a
+zipped bot was extracted to, but an entry still held by running bots is only
+unloaded once its last holder releases it.
+"""
+import os
+import sys
+import shutil
+import zipfile
+import tempfile
+import threading
+import itertools
+import importlib.util
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+MAX_LOADED_BOTS = 32  # Bot modules kept loaded by the cache
+MODULE_PREFIX = 'user_bot_module_'
+
+LoadedBot = namedtuple('LoadedBot', [
+    'module',       # The imported player.py
+    'bot_class',    # Class with get_action, or None if the module defines get_action itself
+    'bot_dir',      # Directory of player.py
+    'temp_dir',     # Directory a zip was extracted to, removed once evicted and released
+])
+
+_cache = OrderedDict()
+_holders = {}  # Module name -> number of unreleased load_bot calls
+_evicted = {}  # Module name -> entry out of the cache but still held
+_cache_lock = threading.Lock()
+_import_lock = threading.Lock()  # sys.path and sys.modules are process-wide
+_module_ids = itertools.count()
+
+
+def _project_skeleton_dir():
+    project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    return os.path.join(project_dir, 'skeletons')
+
+
+def _locate(bot_path):
+    """
+    Returns:
+        (module_path, extra sys.path entries, temp_dir)
+    """
+    if bot_path.endswith('.zip'):
+        temp_dir = tempfile.mkdtemp(prefix='poker_bot_')
+        try:
+            with zipfile.ZipFile(bot_path, 'r') as zip_ref:
+                zip_ref.extractall(temp_dir)
+            player_files = list(Path(temp_dir).glob('**/player.py'))
+            if not player_files:
+                raise FileNotFoundError(f"No player.py found in {bot_path}")
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        module_path = str(player_files[0])
+        return module_path, [os.path.dirname(module_path), _project_skeleton_dir()], temp_dir
+
+    if os.path.isdir(bot_path):
+        module_path = os.path.join(bot_path, 'player.py')
+        if not os.path.exists(module_path):
+            raise FileNotFoundError(f"No player.py found in {bot_path}")
+    else:
+        module_path = bot_path
+    module_dir = os.path.dirname(module_path)
+    return module_path, [module_dir, os.path.join(module_dir, 'skeleton')], None
+
+
+def _is_private(module, directories):
+    """Whether a module was loaded from one of the bot's directories"""
+    filenames = [getattr(module, '__file__', None)]
+    filenames.extend(getattr(module, '__path__', None) or [])  # Namespace packages have no __file__
+    return any(
+        os.path.abspath(filename).startswith(directory + os.sep)
+        for filename in filenames if filename
+        for directory in directories
+    )
+
+
+def find_bot_class(module):
+    """
+    The bot class of a module: a class with get_action, preferring classes the
+    module defines over ones it imports (such as the skeleton's Bot base class)
+    """
+    candidates = [
+        value for value in vars(module).values()
+        if isinstance(value, type) and callable(getattr(value, 'get_action', None))
+    ]
+    own = [candidate for candidate in candidates if candidate.__module__ == module.__name__]
+    return (own or candidates or [None])[0]
+
+
+def _import(module_path, paths, extra_globals):
+    module_name = f'{MODULE_PREFIX}{next(_module_ids)}'
+    directories = [os.path.abspath(path) for path in paths if os.path.isdir(path)]
+
+    with _import_lock:
+        before = set(sys.modules)
+        added = [path for path in directories if path not in sys.path]
+        sys.path[:0] = added
+        try:
+            spec = importlib.util.spec_from_file_location(module_name, module_path)
+            if spec is None:
+                raise ImportError(f"Could not load module from {module_path}")
+            module = importlib.util.module_from_spec(spec)
+            for name, value in extra_globals.items():
+                setattr(module, name, value)
+            sys.modules[module_name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                sys.modules.pop(module_name, None)
+                raise
+            # Again, so names the bot imported from its own skeleton don't shadow them
+            for name, value in extra_globals.items():
+                setattr(module, name, value)
+        finally:
+            for path in added:
+                try:
+                    sys.path.remove(path)
+                except ValueError:
+                    pass
+            for name in set(sys.modules) - before:
+                if name != module_name and _is_private(sys.modules[name], directories):
+                    del sys.modules[name]
+    return module
+
+
+def _cache_key(bot_path):
+    return os.path.abspath(bot_path), os.path.getmtime(bot_path)
+
+
+def _acquire(loaded):
+    # Callers hold _cache_lock
+    name = loaded.module.__name__
+    _holders[name] = _holders.get(name, 0) + 1
+
+
+def _retire(loaded):
+    """Take an entry out of use: unload it now or, if held, on its last release (under _cache_lock)"""
+    if _holders.get(loaded.module.__name__):
+        _evicted[loaded.module.__name__] = loaded
+        return None
+    return loaded
+
+
+def _unload(loaded):
+    sys.modules.pop(loaded.module.__name__, None)
+    if loaded.temp_dir:
+        shutil.rmtree(loaded.temp_dir, ignore_errors=True)
+
+
+def load_bot(bot_path, extra_globals=None):
+    """
+    Load (or reuse) the bot module at a path: player.py, its directory or a zip
+
+    The entry stays loaded until release_bot is called for it, even if the
+    cache evicts it meanwhile.
+
+    Args:
+        extra_globals: Names injected into the module before and after it runs
+
+    Returns:
+        (LoadedBot, cache_hit)
+    """
+    key = _cache_key(bot_path)
+    with _cache_lock:
+        loaded = _cache.get(key)
+        if loaded is not None:
+            _cache.move_to_end(key)
+            _acquire(loaded)
+            return loaded, True
+
+    module_path, paths, temp_dir = _locate(bot_path)
+    try:
+        module = _import(module_path, paths, extra_globals or {})
+    except BaseException:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    loaded = LoadedBot(module, find_bot_class(module), os.path.dirname(module_path), temp_dir)
+
+    evicted = []
+    with _cache_lock:
+        if key in _cache:
+            # Loaded concurrently by another thread; keep the cached copy
+            evicted.append(loaded)
+            loaded = _cache[key]
+        else:
+            _cache[key] = loaded
+            while len(_cache) > MAX_LOADED_BOTS:
+                evicted.append(_retire(_cache.popitem(last=False)[1]))
+        _acquire(loaded)
+    for old in evicted:
+        if old is not None:
+            _unload(old)
+    return loaded, False
+
+
+def release_bot(loaded):
+    """Give back an entry returned by load_bot, unloading it if it was evicted meanwhile"""
+    name = loaded.module.__name__
+    with _cache_lock:
+        count = _holders.get(name, 0) - 1
+        if count > 0:
+            _holders[name] = count
+            return
+        _holders.pop(name, None)
+        old = _evicted.pop(name, None)
+    if old is not None:
+        _unload(old)
+
+
+def clear_bot_cache():
+    """Unload every cached bot module that isn't held; held ones go on their last release"""
+    with _cache_lock:
+        loaded = [_retire(old) for old in _cache.values()]
+        _cache.clear()
+    for old in loaded:
+        if old is not None:
+            _unload(old)
+
+
+def loaded_bot_count():
+    """Bot modules loaded: cached plus evicted ones still held"""
+    with _cache_lock:
+        return len(_cache) + len(_evicted)
@@ -0,0 +1,82 @@
+"""
+Pre-generated, replayable decks.
+
+Instead of building and shuffling an eval7.Deck for every hand, decks are
+generated in blocks of DECK_BLOCK_SIZE permutations at once with a seeded
+NumPy generator, and each hand consumes one row. Block ``b`` of a seed is
+always generated from the generator seeded with (seed, b), so the deck of any
+hand can be rebuilt from just (seed, index, block size) without replaying
+earlier hands.
+
+Game sessions are served by a new manager per request and deal one hand at a
+time, so they use SESSION_DECK_BLOCK_SIZE (one deck per block) and only ever
+generate the deck they deal. Big blocks are for simulations dealing many
+hands from one DeckSource.
+"""
+import secrets
+import threading
+
+import numpy as np
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+DECK_CARDS = np.array([rank + suit for rank in RANKS for suit in SUITS])
+DECK_BLOCK_SIZE = 4096  # Permutations generated per block
+SESSION_DECK_BLOCK_SIZE = 1  # Game sessions generate just the deck of each hand
+
+
+def new_seed():
+    """A random seed that fits a signed 64-bit database column"""
+    return secrets.randbits(63)
+
+
+def generate_block(seed, block, size=DECK_BLOCK_SIZE):
+    """
+    Generate one block of shuffled decks
+
+    Returns:
+        uint8 array of shape (size, 52) holding card indexes into DECK_CARDS
+    """
+    rng = np.random.default_rng([seed, block])
+    decks = np.tile(np.arange(len(DECK_CARDS), dtype=np.uint8), (size, 1))
+    return rng.permuted(decks, axis=1, out=decks)
+
+
+class DeckSource:
+    """
+    Sequence of shuffled decks for one seed
+
+    deck(index) is random access; next_deck() walks the sequence in order.
+    """
+    def __init__(self, seed=None, start=0, block_size=DECK_BLOCK_SIZE):
+        self.seed = new_seed() if seed is None else int(seed)
+        self.block_size = block_size
+        self.next_index = start
+        self.block_no = None
+        self.block = None
+        self.lock = threading.Lock()
+
+    def deck(self, index):
+        """The deck dealt for hand ``index``, as a list of 52 card strings"""
+        block_no, row = divmod(index, self.block_size)
+        with self.lock:
+            if block_no != self.block_no:
+                self.block = generate_block(self.seed, block_no, self.block_size)
+                self.block_no = block_no
+            cards = self.block[row]
+        return DECK_CARDS[cards].tolist()
+
+    def next_deck(self):
+        """
+        Returns:
+            (index, deck) for the next hand
+        """
+        with self.lock:
+            index = self.next_index
+            self.next_index += 1
+        return index, self.deck(index)
+
+
+def replay_deck(seed, index, block_size=DECK_BLOCK_SIZE):
+    """Rebuild the deck of a past hand"""
+    return DeckSource(seed, block_size=block_size).deck(index)
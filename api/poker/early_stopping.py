@@ -0,0 +1,121 @@
+"""
+Sequential early stopping for heads-up matches.
+
+Per-hand chip deltas are folded into a running mean and variance (Welford),
+and after every hand a sequential test decides whether the match already has
+a clear winner, so lopsided matches end long before hands_to_play.
+
+Methods:
+    sprt:  Wald's sequential probability ratio test of "bot a wins `effect`
+           chips per hand" against "bot b does", with error rates alpha/beta.
+    bound: Stop once the mean is more than `z` standard errors from zero;
+           z is kept large because the bound is checked after every hand.
+"""
+import math
+
+EARLY_STOPPING_METHODS = ('sprt', 'bound')
+DEFAULT_MIN_HANDS = 100  # Variance estimates are too noisy before this
+DEFAULT_EFFECT = 0.5  # Chips per hand (25 bb/100) the SPRT should detect
+DEFAULT_ALPHA = 0.05
+DEFAULT_BETA = 0.05
+DEFAULT_Z = 3.0
+
+
+class RunningStats:
+    """Welford's online mean and variance"""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stderr(self):
+        return math.sqrt(self.variance / self.count) if self.count else 0.0
+
+
+class SequentialTest:
+    """
+    Early-stopping rule for a match, usable as run_match's on_hand callback
+
+    Deltas are from bot a's (the player's) point of view. Once decided,
+    ``winner`` is 0 (bot a) or 1 (bot b).
+    """
+    def __init__(self, method='sprt', hands_to_play=None, min_hands=DEFAULT_MIN_HANDS,
+                 effect=DEFAULT_EFFECT, alpha=DEFAULT_ALPHA, beta=DEFAULT_BETA, z=DEFAULT_Z):
+        if method not in EARLY_STOPPING_METHODS:
+            raise ValueError(f"Unknown early stopping method: {method}")
+        self.method = method
+        self.hands_to_play = hands_to_play
+        self.min_hands = min_hands
+        self.effect = effect
+        self.z = z
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+        self.stats = RunningStats()
+        self.winner = None
+
+    def __call__(self, hand_no, delta):
+        return self.add(delta)
+
+    def log_likelihood_ratio(self):
+        """SPRT statistic for mean +effect vs -effect with the estimated variance"""
+        variance = self.stats.variance
+        if not variance:
+            return 0.0
+        return 2 * self.effect * self.stats.total / variance
+
+    def add(self, delta):
+        """
+        Add one hand's delta
+
+        Returns:
+            bool: True once the match is decided
+        """
+        self.stats.add(delta)
+        if self.winner is not None:
+            return True
+        if self.stats.count < self.min_hands or not self.stats.variance:
+            return False
+
+        if self.method == 'sprt':
+            llr = self.log_likelihood_ratio()
+            if llr >= self.upper:
+                self.winner = 0
+            elif llr <= self.lower:
+                self.winner = 1
+        elif abs(self.stats.mean) > self.z * self.stats.stderr:
+            self.winner = 0 if self.stats.mean > 0 else 1
+        return self.winner is not None
+
+    @property
+    def decided(self):
+        return self.winner is not None
+
+    def hands_saved(self):
+        if not self.decided or self.hands_to_play is None:
+            return 0
+        return max(0, self.hands_to_play - self.stats.count)
+
+    def report(self):
+        """Summary for status endpoints and stored results"""
+        return {
+            'early_stopping': self.method,
+            'decided': self.decided,
+            'winner': self.winner,
+            'hands': self.stats.count,
+            'hands_saved': self.hands_saved(),
+            'mean_delta': round(self.stats.mean, 4),
+            'stderr': round(self.stats.stderr, 4),
+        }
@@ -4,6 +4,8 @@ import time
 import os
 from queue import Queue
 from threading import Thread
+from .decks import DeckSource
+from .events import EventHooks
 
 # Game constants
 SMALL_BLIND = 1
@@ -26,6 +28,37 @@ PCARDS = lambda cards: '[{}]'.format(' '.join(map(str, cards)))
 PVALUE = lambda name, value: ', {} ({})'.format(name, value)
 STATUS = lambda players: ''.join([PVALUE(p.name, p.bankroll) for p in players])
 
+
+def street_name(street):
+    return STREET_NAMES[street - 3] if 3 <= street <= 5 else f'Street {street}'
+
+
+def action_code(action):
+    '''
+    Compact code of an action, as sent to players and stored in hand histories
+    '''
+    if isinstance(action, FoldAction):
+        return 'F'
+    if isinstance(action, CallAction):
+        return 'C'
+    if isinstance(action, CheckAction):
+        return 'K'
+    return f'R{action.amount}'
+
+
+def action_phrase(action, bet=False):
+    '''
+    Game log wording of an action, to follow the player's name
+    '''
+    if isinstance(action, FoldAction):
+        return ' folds'
+    if isinstance(action, CallAction):
+        return ' calls'
+    if isinstance(action, CheckAction):
+        return ' checks'
+    return (' bets ' if bet else ' raises to ') + str(action.amount)
+
+
 class RoundState(namedtuple('_RoundState', ['button', 'street', 'final_street', 'pips', 'stacks', 'hands', 'deck', 'previous_state'])):
     '''
     Encodes the game tree for one round of poker.
@@ -158,6 +191,93 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'final_street',
             raise ValueError(f"Unknown action type: {action}")
 
 
+def play_round(round_state, decide, hooks=None):
+    '''
+    Plays a round from round_state until it reaches a TerminalState.
+
+    decide(round_state, active) returns the active player's action. hooks, an
+    EventHooks, is told about the hand start, streets, actions and the result;
+    without subscribers the loop does nothing but play.
+    '''
+    if hooks:
+        hooks.hand_start(round_state)
+    while not isinstance(round_state, TerminalState):
+        active = round_state.button % 2
+        action = decide(round_state, active)
+        if hooks:
+            hooks.action(active, action, round_state)
+        next_state = round_state.proceed(action)
+        if hooks and isinstance(next_state, RoundState) and next_state.street != round_state.street:
+            hooks.street(next_state)
+        round_state = next_state
+    if hooks:
+        hooks.terminal(round_state)
+    return round_state
+
+
+class GameLogWriter:
+    '''
+    Event subscriber writing the text game log (see log_parser for the format).
+    '''
+    def __init__(self, write, names):
+        self.write = write  # Called with every log line
+        self.names = names  # [seat 0 name, seat 1 name]
+
+    def on_hand_start(self, event):
+        small_blind = event.round_state.button % 2
+        for seat in (small_blind, 1 - small_blind):
+            self.write(f'{self.names[seat]} posts the blind of {event.blinds[seat]}')
+        self.write(f'{self.names[0]} dealt {PCARDS(event.hands[0])}')
+        self.write(f'{self.names[1]} dealt {PCARDS(event.hands[1])}')
+
+    def on_street(self, event):
+        stacks = event.round_state.stacks
+        self.write(f"{street_name(event.street)} {PCARDS(event.board)}" +
+                   f"{PVALUE(self.names[0], STARTING_STACK - stacks[0])}" +
+                   f"{PVALUE(self.names[1], STARTING_STACK - stacks[1])}")
+
+    def on_action(self, event):
+        self.write(self.names[event.seat] + action_phrase(event.action, event.bet))
+
+    def on_showdown(self, event):
+        self.write(f'{self.names[0]} shows {PCARDS(event.hands[0])}')
+        self.write(f'{self.names[1]} shows {PCARDS(event.hands[1])}')
+
+    def on_terminal(self, event):
+        self.write(f'{self.names[0]} awarded {event.deltas[0]}')
+        self.write(f'{self.names[1]} awarded {event.deltas[1]}')
+
+
+class PlayerMessages:
+    '''
+    Event subscriber building the compact message history each player sees.
+    '''
+    def __init__(self):
+        self.messages = [[], []]
+
+    def on_hand_start(self, event):
+        self.messages[0] = ['T0.', 'P0', 'H' + CCARDS(event.hands[0])]
+        self.messages[1] = ['T0.', 'P1', 'H' + CCARDS(event.hands[1])]
+
+    def on_street(self, event):
+        compressed_board = 'B' + CCARDS(event.board)
+        self.messages[0].append(compressed_board)
+        self.messages[1].append(compressed_board)
+
+    def on_action(self, event):
+        code = action_code(event.action)
+        self.messages[0].append(code)
+        self.messages[1].append(code)
+
+    def on_showdown(self, event):
+        self.messages[0].append('O' + CCARDS(event.hands[1]))
+        self.messages[1].append('O' + CCARDS(event.hands[0]))
+
+    def on_terminal(self, event):
+        self.messages[0].append('D' + str(event.deltas[0]))
+        self.messages[1].append('D' + str(event.deltas[1]))
+
+
 class Player:
     '''
     Manages player information and logging.
@@ -224,84 +344,33 @@ class Game:
     '''
     Manages the poker game and handles logging.
     '''
-    def __init__(self, player1_name="Player A", player2_name="Player B", num_rounds=100, log_dir='.'):
+    def __init__(self, player1_name="Player A", player2_name="Player B", num_rounds=100, log_dir='.', seed=None):
         self.player1_name = player1_name
         self.player2_name = player2_name
         self.num_rounds = num_rounds
         self.log_dir = log_dir
-        self.log = [f'Poker Game - {player1_name} vs {player2_name}']
-        self.player_messages = [[], []]
+        # Hand n is dealt deck n of this seed, so any hand can be replayed
+        self.deck_source = DeckSource(seed)
+        self.log = [f'Poker Game - {player1_name} vs {player2_name}', f'Deck seed {self.deck_source.seed}']
+
+        # The game log and player messages are event subscribers; more can be
+        # added with self.hooks.subscribe
+        self.log_writer = GameLogWriter(self.log.append, [player1_name, player2_name])
+        self.message_writer = PlayerMessages()
+        self.player_messages = self.message_writer.messages
+        self.hooks = EventHooks(self.log_writer, self.message_writer)
         
         # Ensure log directory exists
         os.makedirs(self.log_dir, exist_ok=True)
 
-    def log_round_state(self, players, round_state):
-        '''
-        Logs the current state of the round
-        '''
-        if round_state.street == 0 and round_state.button == 0:
-            self.log.append(f'{players[0].name} posts the blind of {SMALL_BLIND}')
-            self.log.append(f'{players[1].name} posts the blind of {BIG_BLIND}')
-            self.log.append(f'{players[0].name} dealt {PCARDS(round_state.hands[0])}')
-            self.log.append(f'{players[1].name} dealt {PCARDS(round_state.hands[1])}')
-            self.player_messages[0] = ['T0.', 'P0', 'H' + CCARDS(round_state.hands[0])]
-            self.player_messages[1] = ['T0.', 'P1', 'H' + CCARDS(round_state.hands[1])]
-        elif round_state.street > 0 and round_state.button == 1:
-            # For simplicity, we're using the first n cards from the deck
-            board = round_state.deck[:round_state.street]
-            street_name = STREET_NAMES[round_state.street - 3] if round_state.street <= 5 else f'Street {round_state.street}'
-            self.log.append(f"{street_name} {PCARDS(board)}" +
-                           f"{PVALUE(players[0].name, STARTING_STACK - round_state.stacks[0])}" +
-                           f"{PVALUE(players[1].name, STARTING_STACK - round_state.stacks[1])}")
-            compressed_board = 'B' + CCARDS(board)
-            self.player_messages[0].append(compressed_board)
-            self.player_messages[1].append(compressed_board)
-
-    def log_action(self, name, action, bet_override):
-        '''
-        Logs a player's action
-        '''
-        if isinstance(action, FoldAction):
-            phrasing = ' folds'
-            code = 'F'
-        elif isinstance(action, CallAction):
-            phrasing = ' calls'
-            code = 'C'
-        elif isinstance(action, CheckAction):
-            phrasing = ' checks'
-            code = 'K'
-        else:  # isinstance(action, RaiseAction)
-            phrasing = (' bets ' if bet_override else ' raises to ') + str(action.amount)
-            code = f'R{action.amount}'
-        
-        self.log.append(name + phrasing)
-        self.player_messages[0].append(code)
-        self.player_messages[1].append(code)
-
-    def log_terminal_state(self, players, round_state):
-        '''
-        Logs the end state of a round
-        '''
-        previous_state = round_state.previous_state
-        if previous_state and FoldAction not in previous_state.legal_actions():
-            self.log.append(f'{players[0].name} shows {PCARDS(previous_state.hands[0])}')
-            self.log.append(f'{players[1].name} shows {PCARDS(previous_state.hands[1])}')
-            self.player_messages[0].append('O' + CCARDS(previous_state.hands[1]))
-            self.player_messages[1].append('O' + CCARDS(previous_state.hands[0]))
-        
-        self.log.append(f'{players[0].name} awarded {round_state.deltas[0]}')
-        self.log.append(f'{players[1].name} awarded {round_state.deltas[1]}')
-        self.player_messages[0].append('D' + str(round_state.deltas[0]))
-        self.player_messages[1].append('D' + str(round_state.deltas[1]))
-
     def run_round(self, players):
         '''
         Runs a single round of poker
         '''
-        # Create and shuffle a new deck
-        deck = eval7.Deck()
-        deck.shuffle()
-        hands = [deck.deal(2), deck.deal(2)]
+        # Take the next pre-generated deck
+        _, cards = self.deck_source.next_deck()
+        hands = [cards[0:2], cards[2:4]]
+        deck = cards[4:]
 
         # Set final street based on rules (default to 5)
         final_street = 5
@@ -309,30 +378,18 @@ class Game:
         pips = [SMALL_BLIND, BIG_BLIND]
         stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
         round_state = RoundState(0, 0, final_street, pips, stacks, hands, deck, None)
-        
-        # Run the round until we reach a terminal state
-        while not isinstance(round_state, TerminalState):
-            self.log_round_state(players, round_state)
-            
-            # Determine active player
-            active = round_state.button % 2
+
+        def decide(round_state, active):
             player = players[active]
-            
-            # Get player's action
             start_time = time.time()
             action = player.make_decision(round_state, self.player_messages[active], self.log)
             end_time = time.time()
             player.game_clock += (end_time - start_time)
-            
-            # Log the action
-            bet_override = (round_state.pips == [0, 0])
-            self.log_action(player.name, action, bet_override)
-            
-            # Update game state
-            round_state = round_state.proceed(action)
-        
-        # Log the final state
-        self.log_terminal_state(players, round_state)
+            return action
+
+        # Play until we reach a terminal state, logging through the event hooks
+        self.log_writer.names = [player.name for player in players]
+        round_state = play_round(round_state, decide, self.hooks)
         
         # Update player bankrolls
         for player, delta in zip(players, round_state.deltas):
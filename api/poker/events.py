@@ -0,0 +1,120 @@
+"""
+Hand events.
+
+The engine loop (engine.play_round) and PokerGameManager report what happens
+in a hand through an EventHooks object instead of formatting logs inline.
+Subscribers are plain objects implementing any of on_hand_start, on_street,
+on_action, on_showdown and on_terminal; each handler receives one of the
+typed events below.
+
+Emitters guard every call with ``if hooks:``, and an event is only built when
+somebody handles it, so a run without subscribers does no logging work.
+"""
+from collections import namedtuple
+
+HandStartEvent = namedtuple('HandStartEvent', [
+    'hands',        # [seat 0 cards, seat 1 cards]
+    'blinds',       # Chips posted by each seat
+    'round_state',
+])
+StreetEvent = namedtuple('StreetEvent', [
+    'street',       # 3, 4 or 5 board cards
+    'board',
+    'round_state',  # First state of the street
+])
+ActionEvent = namedtuple('ActionEvent', [
+    'seat',
+    'action',
+    'bet',          # True for a raise that opens the betting of a street
+    'round_state',  # State the action was taken in
+])
+ShowdownEvent = namedtuple('ShowdownEvent', [
+    'hands',
+    'board',
+    'terminal_state',
+])
+TerminalEvent = namedtuple('TerminalEvent', [
+    'deltas',
+    'showdown',     # Whether the hand was decided by showing cards
+    'saw_flop',
+    'terminal_state',
+])
+
+HANDLERS = ('on_hand_start', 'on_street', 'on_action', 'on_showdown', 'on_terminal')
+
+
+def went_to_showdown(terminal_state):
+    """Whether a finished hand was decided at showdown rather than by a fold"""
+    previous_state = terminal_state.previous_state
+    # The last bet was called or checked through, so nobody could fold
+    return previous_state is not None and previous_state.pips[0] == previous_state.pips[1]
+
+
+class EventHooks:
+    """
+    Dispatches hand events to subscribers
+
+    Evaluates to False while nobody is subscribed, so emitters can skip
+    building events altogether.
+    """
+    def __init__(self, *subscribers):
+        self.subscribers = []
+        self.handlers = {name: [] for name in HANDLERS}
+        for subscriber in subscribers:
+            self.subscribe(subscriber)
+
+    def __bool__(self):
+        return bool(self.subscribers)
+
+    def subscribe(self, subscriber):
+        """Register every on_* handler the subscriber implements"""
+        for name, handlers in self.handlers.items():
+            handler = getattr(subscriber, name, None)
+            if handler is not None:
+                handlers.append(handler)
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.remove(subscriber)
+        for name, handlers in self.handlers.items():
+            handler = getattr(subscriber, name, None)
+            if handler is not None:
+                handlers.remove(handler)
+
+    def hand_start(self, round_state):
+        handlers = self.handlers['on_hand_start']
+        if handlers:
+            event = HandStartEvent(round_state.hands, list(round_state.pips), round_state)
+            for handler in handlers:
+                handler(event)
+
+    def street(self, round_state):
+        handlers = self.handlers['on_street']
+        if handlers:
+            event = StreetEvent(round_state.street, round_state.deck[:round_state.street], round_state)
+            for handler in handlers:
+                handler(event)
+
+    def action(self, seat, action, round_state):
+        handlers = self.handlers['on_action']
+        if handlers:
+            event = ActionEvent(seat, action, round_state.pips[0] == 0 and round_state.pips[1] == 0, round_state)
+            for handler in handlers:
+                handler(event)
+
+    def terminal(self, terminal_state):
+        """Emit the showdown (if the hand had one) and terminal events"""
+        previous_state = terminal_state.previous_state
+        showdown = went_to_showdown(terminal_state)
+        handlers = self.handlers['on_showdown']
+        if showdown and handlers:
+            event = ShowdownEvent(previous_state.hands, previous_state.deck[:previous_state.street], terminal_state)
+            for handler in handlers:
+                handler(event)
+        handlers = self.handlers['on_terminal']
+        if handlers:
+            saw_flop = previous_state is not None and previous_state.street > 0
+            event = TerminalEvent(terminal_state.deltas, showdown, saw_flop, terminal_state)
+            for handler in handlers:
+                handler(event)
@@ -0,0 +1,125 @@
+"""
+Headless heads-up match runner.
+
+Plays two bots against each other through the engine loop (engine.play_round),
+with no GameSession, logs or database writes, so it can be used for batch
+work such as leagues and benchmarks. Seats are swapped every hand so both
+bots play the small blind equally often, and a seed makes a match
+reproducible. Logs, stats and the like can be attached as event subscribers
+(see events.EventHooks) without slowing down plain runs.
+"""
+from collections import namedtuple
+
+from .engine import (
+    RoundState, FoldAction, CheckAction, RaiseAction, SMALL_BLIND, BIG_BLIND, STARTING_STACK, play_round
+)
+from .decks import DeckSource
+
+MatchSummary = namedtuple('MatchSummary', [
+    'hands',            # Hands played
+    'deltas',           # [bot a chips won, bot b chips won]
+    'illegal_actions',  # [bot a, bot b] actions replaced by check/fold
+    'errors',           # [bot a, bot b] exceptions raised by get_action
+])
+
+
+def legalize(action, round_state):
+    """
+    Return the action if it is legal in round_state, else the check/fold fallback
+
+    Returns:
+        (action, was_legal)
+    """
+    legal_actions = round_state.legal_actions()
+    if isinstance(action, RaiseAction) and RaiseAction in legal_actions:
+        min_raise, max_raise = round_state.raise_bounds()
+        if min_raise <= action.amount <= max_raise:
+            return action, True
+    elif action is not None and type(action) in legal_actions and not isinstance(action, RaiseAction):
+        return action, True
+    return (CheckAction() if CheckAction in legal_actions else FoldAction()), False
+
+
+def play_hand(bots, deck, stats=None, hooks=None):
+    """
+    Play one hand between two bots
+
+    Args:
+        bots: [seat 0 bot, seat 1 bot]; seat 0 posts the small blind.
+              Anything with get_action(game_state, round_state, active).
+        deck: Shuffled list of card strings
+        stats: Optional {'illegal': [0, 0], 'errors': [0, 0]} updated in place
+        hooks: Optional events.EventHooks told about the hand
+
+    Returns:
+        TerminalState of the hand
+    """
+    round_state = RoundState(
+        button=0,
+        street=0,
+        final_street=5,
+        pips=[SMALL_BLIND, BIG_BLIND],
+        stacks=[STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND],
+        hands=[deck[0:2], deck[2:4]],
+        deck=deck[4:9],
+        previous_state=None
+    )
+
+    def decide(round_state, active):
+        try:
+            action = bots[active].get_action(None, round_state, active)
+        except Exception:
+            action = None
+            if stats is not None:
+                stats['errors'][active] += 1
+        action, was_legal = legalize(action, round_state)
+        if not was_legal and stats is not None:
+            stats['illegal'][active] += 1
+        return action
+
+    return play_round(round_state, decide, hooks)
+
+
+def run_match(bot_a, bot_b, hands, seed=None, on_hand=None, hooks=None):
+    """
+    Play a heads-up match
+
+    Args:
+        bot_a, bot_b: Bots (e.g. BotInterface instances)
+        hands: Number of hands to play
+        seed: Deck seed (see decks.DeckSource); same seed, same cards
+        on_hand: Optional callback(hand_no, delta_a) after each hand;
+                 returning True ends the match early
+        hooks: Optional events.EventHooks; events report seats of the hand
+               (seat 0 is bot b on odd hands)
+
+    Returns:
+        MatchSummary
+    """
+    deck_source = DeckSource(seed)
+    deltas = [0, 0]
+    illegal = [0, 0]
+    errors = [0, 0]
+    played = 0
+
+    for hand_no in range(hands):
+        deck = deck_source.deck(hand_no)
+
+        # Swap seats every hand; seat 0 is the small blind
+        order = (1, 0) if hand_no % 2 else (0, 1)
+        bots = (bot_a, bot_b)
+        stats = {'illegal': [0, 0], 'errors': [0, 0]}
+        terminal_state = play_hand([bots[order[0]], bots[order[1]]], deck, stats, hooks)
+        for seat, index in enumerate(order):
+            illegal[index] += stats['illegal'][seat]
+            errors[index] += stats['errors'][seat]
+
+        delta_a = terminal_state.deltas[order.index(0)]
+        deltas[0] += delta_a
+        deltas[1] -= delta_a
+        played += 1
+
+        if on_hand is not None and on_hand(hand_no + 1, delta_a):
+            break
+
+    return MatchSummary(played, deltas, illegal, errors)
@@ -0,0 +1,170 @@
+"""
+Incremental HUD statistics.
+
+Every completed hand is reduced to a handful of counter increments per seat
+(see hand_counters), which are added to the HudStats row of the
+(player, opponent) pair. Percentages such as VPIP or W$SD are derived from the
+counters when they are read, so nothing ever rescans hand history.
+"""
+import re
+import logging
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import F, Sum
+
+HUD_COUNTERS = (
+    'hands', 'vpip', 'pfr', 'three_bet_chances', 'three_bets',
+    'postflop_aggressive', 'postflop_calls', 'saw_flop', 'showdowns', 'showdown_wins',
+)
+HUD_CACHE_TIMEOUT = 30  # Seconds a computed HUD stays cached
+HUD_CACHE_PREFIX = 'hud_stats'
+HOUSE_KEY = 'house'
+
+ACTION_TOKEN = re.compile(r'([ab])(F|C|K|R\d+)')
+
+logger = logging.getLogger(__name__)
+
+
+def player_key(bot=None, user=None):
+    """HudStats key of a seat: its bot, else its human user, else the house bot"""
+    if bot is not None:
+        return f'bot:{bot.id}'
+    if user is not None:
+        return f'user:{user.id}'
+    return HOUSE_KEY
+
+
+def hand_counters(actions, seat, saw_flop, showdown, delta):
+    """
+    Reduce one hand to counter increments for one seat
+
+    Args:
+        actions: Compact action string of the hand (see HandHistory)
+        seat: 'a' or 'b'
+        saw_flop: Whether the hand reached the flop
+        showdown: Whether the hand went to showdown
+        delta: Chips won (negative if lost) by this seat
+
+    Returns:
+        Counter keyed by HUD_COUNTERS
+    """
+    counters = Counter(hands=1)
+    streets = actions.split('/')
+
+    preflop = ACTION_TOKEN.findall(streets[0])
+    raises = 0
+    open_raiser = None
+    for actor, code in preflop:
+        if actor == seat:
+            if code == 'C' or code.startswith('R'):
+                counters['vpip'] = 1
+            if code.startswith('R'):
+                counters['pfr'] = 1
+            # Facing exactly one raise, made by the opponent: a 3-bet spot
+            if raises == 1 and open_raiser != seat and not counters['three_bet_chances']:
+                counters['three_bet_chances'] = 1
+                if code.startswith('R'):
+                    counters['three_bets'] = 1
+        if code.startswith('R'):
+            raises += 1
+            if raises == 1:
+                open_raiser = actor
+
+    for street in streets[1:]:
+        for actor, code in ACTION_TOKEN.findall(street):
+            if actor != seat:
+                continue
+            if code.startswith('R'):
+                counters['postflop_aggressive'] += 1
+            elif code == 'C':
+                counters['postflop_calls'] += 1
+
+    if saw_flop:
+        counters['saw_flop'] = 1
+        if showdown:
+            counters['showdowns'] = 1
+            if delta > 0:
+                counters['showdown_wins'] = 1
+    return counters
+
+
+class HudStatsBuffer:
+    """
+    Accumulates counter increments per (subject, opponent) until flushed
+    """
+    def __init__(self):
+        self.pending = {}
+
+    def add_hand(self, subjects, actions, saw_flop, showdown, deltas):
+        """
+        Add a completed hand
+
+        Args:
+            subjects: [seat a key, seat b key]
+            deltas: [seat a delta, seat b delta]
+        """
+        for index, seat in enumerate('ab'):
+            pair = (subjects[index], subjects[1 - index])
+            counters = hand_counters(actions, seat, saw_flop, showdown, deltas[index])
+            self.pending.setdefault(pair, Counter()).update(counters)
+
+    def flush(self):
+        """Apply the accumulated increments with one UPDATE per pair"""
+        from .models import HudStats
+
+        pending, self.pending = self.pending, {}
+        for (subject, opponent), counters in pending.items():
+            try:
+                HudStats.objects.get_or_create(subject=subject, opponent=opponent)
+                HudStats.objects.filter(subject=subject, opponent=opponent).update(
+                    **{name: F(name) + counters[name] for name in HUD_COUNTERS if counters[name]}
+                )
+                cache.delete_many([_cache_key(subject, opponent), _cache_key(subject, None)])
+            except Exception as e:
+                logger.error(f"Error updating HUD stats for {subject} vs {opponent}: {str(e)}")
+        return len(pending)
+
+
+def _cache_key(subject, opponent):
+    return f"{HUD_CACHE_PREFIX}:{subject}:{opponent or '*'}"
+
+
+def _percent(numerator, denominator):
+    return round(100 * numerator / denominator) if denominator else 0
+
+
+def format_hud(counters):
+    """Turn raw counters into the stats shown by the HUD"""
+    return {
+        'hands': counters['hands'],
+        'vpip': _percent(counters['vpip'], counters['hands']),
+        'pfr': _percent(counters['pfr'], counters['hands']),
+        '3b': _percent(counters['three_bets'], counters['three_bet_chances']),
+        'af': round(counters['postflop_aggressive'] / counters['postflop_calls'], 2)
+              if counters['postflop_calls'] else float(counters['postflop_aggressive']),
+        'wtsd': _percent(counters['showdowns'], counters['saw_flop']),
+        'wsd': _percent(counters['showdown_wins'], counters['showdowns']),
+    }
+
+
+def get_hud(subject, opponent=None):
+    """
+    HUD stats of a player, against one opponent or across all of them (cached)
+    """
+    from .models import HudStats
+
+    key = _cache_key(subject, opponent)
+    hud = cache.get(key)
+    if hud is not None:
+        return hud
+
+    rows = HudStats.objects.filter(subject=subject)
+    if opponent:
+        rows = rows.filter(opponent=opponent)
+    totals = rows.aggregate(**{name: Sum(name) for name in HUD_COUNTERS})
+    hud = format_hud({name: totals[name] or 0 for name in HUD_COUNTERS})
+    hud.update({'subject': subject, 'opponent': opponent})
+
+    cache.set(key, hud, HUD_CACHE_TIMEOUT)
+    return hud
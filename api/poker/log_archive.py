@@ -0,0 +1,397 @@
+"""
+Segmented, compressed archive for finished session logs.
+
+Instead of one directory with several small files per session, archived logs
+live in a few large append-only segment files. Every hand of every log stream
+(the game log and each player log) is compressed on its own, and an index maps
+(session, stream, seq) to the segment and byte range holding it, so reading a
+single hand is one index lookup and one seek.
+
+Records of a stream are numbered by seq in the order they were archived. The
+round number of a hand is only an attribute of its record: the same number
+can appear more than once (a restarted hand, a session resumed after its logs
+were archived) and every copy is kept.
+
+Segment record layout:
+    MAGIC (4 bytes) | data length (uint32) | key length (uint16) | key | data
+where key is "<session>/<stream>/<seq>" and data is the zlib-compressed text.
+"""
+import os
+import re
+import shutil
+import hashlib
+import sqlite3
+import struct
+import threading
+import zlib
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+from django.conf import settings
+
+from .engine import GAME_LOG_FILENAME
+from .session_log import close_session_log
+
+ARCHIVE_DIRNAME = 'game_log_archive'
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024  # Start a new segment after 256MB
+SEGMENT_NAME = 'segment-{:06d}.log'
+INDEX_FILENAME = 'index.sqlite3'
+RECORD_MAGIC = b'IPL1'
+RECORD_HEADER = struct.Struct('>4sIH')
+COMPRESSION_LEVEL = 6
+
+# Preset dictionary shared by every record; hands are only a few hundred bytes,
+# so priming zlib with the log vocabulary is what makes per-hand compression pay.
+# Changing it requires a new RECORD_MAGIC.
+ARCHIVE_ZDICT = (
+    b' posts the blind of 1\n posts the blind of 2\n dealt [ shows [ awarded '
+    b' folds\n calls\n checks\n bets  raises to \nFlop [\nTurn [\nRiver [\n'
+    b'Hand dealt: [\nFlop: [\nTurn: [\nRiver: [\nHand result:  awarded '
+    b'\nStarting Round # with bankroll: \nRound #, Player (, Bot ('
+)
+
+# A new hand starts at a "Round #N" line in the game log and at
+# "Starting Round #N" in player logs
+HAND_START_PATTERN = re.compile(r'^(?:Starting )?Round #(\d+)', re.MULTILINE)
+
+logger = logging.getLogger(__name__)
+
+
+def split_hands(text):
+    """
+    Split a log into hands
+
+    Args:
+        text: Full text of a game or player log
+
+    Returns:
+        list: (hand_no, text) pairs; anything before the first round marker
+        (the game log header) is returned as hand 0
+    """
+    hands = []
+    matches = list(HAND_START_PATTERN.finditer(text))
+    preamble_end = matches[0].start() if matches else len(text)
+    if text[:preamble_end]:
+        hands.append((0, text[:preamble_end]))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        hands.append((int(match.group(1)), text[match.start():end]))
+    return hands
+
+
+class LogArchive:
+    """
+    Reader and writer for a segmented log archive directory
+    """
+    def __init__(self, root=None, segment_max_bytes=SEGMENT_MAX_BYTES):
+        self.root = root or os.path.join(settings.MEDIA_ROOT, ARCHIVE_DIRNAME)
+        self.segment_max_bytes = segment_max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+        self.db = sqlite3.connect(os.path.join(self.root, INDEX_FILENAME), check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS records ('
+            ' session TEXT NOT NULL, stream TEXT NOT NULL, seq INTEGER NOT NULL, hand INTEGER NOT NULL,'
+            ' segment INTEGER NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL,'
+            ' PRIMARY KEY (session, stream, seq)'
+            ') WITHOUT ROWID'
+        )
+        self.db.execute('CREATE INDEX IF NOT EXISTS records_hand ON records (session, stream, hand)')
+        # How much of each source log file is archived, so archiving it again only adds what is new
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS sources ('
+            ' session TEXT NOT NULL, stream TEXT NOT NULL, bytes INTEGER NOT NULL, digest TEXT NOT NULL,'
+            ' PRIMARY KEY (session, stream)'
+            ') WITHOUT ROWID'
+        )
+        self.db.commit()
+
+    # Reading
+
+    def streams(self, session_id):
+        """Names of the log streams archived for a session"""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT DISTINCT stream FROM records WHERE session = ? ORDER BY stream',
+                (str(session_id),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def hands(self, session_id, stream=GAME_LOG_FILENAME):
+        """Hand numbers of a session's stream in log order; repeated numbers appear once per copy"""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT hand FROM records WHERE session = ? AND stream = ? ORDER BY seq',
+                (str(session_id), stream)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def has_session(self, session_id):
+        with self.lock:
+            row = self.db.execute(
+                'SELECT 1 FROM records WHERE session = ? LIMIT 1', (str(session_id),)
+            ).fetchone()
+        return row is not None
+
+    def read_hand(self, session_id, hand_no, stream=GAME_LOG_FILENAME):
+        """
+        Read one hand of a session's log; the latest copy if the number repeats
+
+        Returns:
+            str or None if the hand is not archived
+        """
+        with self.lock:
+            row = self.db.execute(
+                'SELECT seq, segment, offset, length FROM records WHERE session = ? AND stream = ? AND hand = ?'
+                ' ORDER BY seq DESC LIMIT 1',
+                (str(session_id), stream, hand_no)
+            ).fetchone()
+        if row is None:
+            return None
+        seq, segment, offset, length = row
+        return self._read_record(segment, offset, length, key=self._key(session_id, stream, seq))
+
+    def tail(self, session_id, count, stream=GAME_LOG_FILENAME):
+        """Text of the last ``count`` records of a session's stream"""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT seq, segment, offset, length FROM records WHERE session = ? AND stream = ?'
+                ' ORDER BY seq DESC LIMIT ?',
+                (str(session_id), stream, count)
+            ).fetchall()
+        return ''.join(
+            self._read_record(segment, offset, length, key=self._key(session_id, stream, seq))
+            for seq, segment, offset, length in reversed(rows)
+        )
+
+    def read_stream(self, session_id, stream=GAME_LOG_FILENAME):
+        """Read a session's whole log stream back as text"""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT seq, segment, offset, length FROM records WHERE session = ? AND stream = ? ORDER BY seq',
+                (str(session_id), stream)
+            ).fetchall()
+        return ''.join(
+            self._read_record(segment, offset, length, key=self._key(session_id, stream, seq))
+            for seq, segment, offset, length in rows
+        )
+
+    def record_count(self, session_id, stream):
+        with self.lock:
+            return self._record_count(session_id, stream)
+
+    def _record_count(self, session_id, stream):
+        row = self.db.execute(
+            'SELECT COUNT(*) FROM records WHERE session = ? AND stream = ?', (str(session_id), stream)
+        ).fetchone()
+        return row[0]
+
+    def _read_record(self, segment, offset, length, key):
+        with open(self._segment_path(segment), 'rb') as segment_file:
+            segment_file.seek(offset)
+            record = segment_file.read(length)
+
+        magic, data_length, key_length = RECORD_HEADER.unpack_from(record)
+        stored_key = record[RECORD_HEADER.size:RECORD_HEADER.size + key_length].decode()
+        if magic != RECORD_MAGIC or stored_key != key:
+            raise ValueError(f"Corrupt log archive record for {key} in segment {segment}")
+
+        data = record[RECORD_HEADER.size + key_length:RECORD_HEADER.size + key_length + data_length]
+        decompressor = zlib.decompressobj(zdict=ARCHIVE_ZDICT)
+        return (decompressor.decompress(data) + decompressor.flush()).decode()
+
+    # Writing
+
+    def append_session(self, session_id, streams):
+        """
+        Archive the logs of a session, after any records it already has
+
+        Args:
+            session_id: Session the logs belong to
+            streams: dict mapping stream name (e.g. 'gamelog') to log text
+
+        Returns:
+            int: number of hand records written
+        """
+        with self.lock, self._writer_lock():
+            written = self._append(session_id, streams)
+            self.db.commit()
+        return written
+
+    def _append(self, session_id, streams):
+        """Write records for the hands of ``streams``; the caller holds both locks and commits"""
+        records = []
+        for stream, text in streams.items():
+            seq = self.db.execute(
+                'SELECT COALESCE(MAX(seq) + 1, 0) FROM records WHERE session = ? AND stream = ?',
+                (str(session_id), stream)
+            ).fetchone()[0]
+            for hand_no, hand_text in split_hands(text):
+                encoded_key = self._key(session_id, stream, seq).encode()
+                compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=ARCHIVE_ZDICT)
+                data = compressor.compress(hand_text.encode()) + compressor.flush()
+                records.append((
+                    stream, seq, hand_no,
+                    RECORD_HEADER.pack(RECORD_MAGIC, len(data), len(encoded_key)) + encoded_key + data
+                ))
+                seq += 1
+        if not records:
+            return 0
+
+        segment, segment_path = self._current_segment()
+        index_rows = []
+        with open(segment_path, 'ab') as segment_file:
+            offset = segment_file.tell()
+            for stream, seq, hand_no, record in records:
+                segment_file.write(record)
+                index_rows.append((str(session_id), stream, seq, hand_no, segment, offset, len(record)))
+                offset += len(record)
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+
+        # Index only after the data is durable so the index never points past a segment's end.
+        # Records are never replaced: a repeated hand number gets a record of its own.
+        self.db.executemany('INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?)', index_rows)
+        return len(records)
+
+    def archive_directory(self, session_dir, session_id=None, remove=False):
+        """
+        Archive a game_logs/<session> directory
+
+        Only what was added to each log since it was last archived is written,
+        so archiving a directory again (or one that is still growing) doesn't
+        duplicate hands.
+
+        Args:
+            session_dir: Directory holding gamelog.txt and the player logs
+            session_id: Defaults to the directory name
+            remove: Delete the directory once the archive is checked to hold
+                every hand of it
+
+        Returns:
+            int: number of hand records written
+
+        Raises:
+            ValueError: The archive doesn't hold the expected number of records
+                afterwards; the directory is left in place
+        """
+        session_id = str(session_id or os.path.basename(os.path.normpath(session_dir)))
+        with self.lock, self._writer_lock():
+            streams = {}
+            sources = {}
+            for filename in sorted(os.listdir(session_dir)):
+                stream, extension = os.path.splitext(filename)
+                if extension != '.txt':
+                    continue
+                with open(os.path.join(session_dir, filename), 'rb') as log_file:
+                    data = log_file.read()
+                row = self.db.execute(
+                    'SELECT bytes, digest FROM sources WHERE session = ? AND stream = ?', (session_id, stream)
+                ).fetchone()
+                archived = 0
+                if row is not None and len(data) >= row[0] and hashlib.sha256(data[:row[0]]).hexdigest() == row[1]:
+                    archived = row[0]  # Same file as last time; only its new end is added
+                streams[stream] = data[archived:].decode(errors='replace')
+                sources[stream] = (len(data), hashlib.sha256(data).hexdigest())
+
+            expected = {
+                stream: self._record_count(session_id, stream) + len(split_hands(text))
+                for stream, text in streams.items()
+            }
+            written = self._append(session_id, streams)
+            self.db.executemany(
+                'INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)',
+                [(session_id, stream, size, digest) for stream, (size, digest) in sources.items()]
+            )
+            self.db.commit()
+
+            for stream, count in expected.items():
+                archived_count = self._record_count(session_id, stream)
+                if archived_count != count:
+                    raise ValueError(
+                        f"Archive holds {archived_count} records of {session_id}/{stream}, expected {count}"
+                    )
+
+            if remove:
+                shutil.rmtree(session_dir)
+                # A directory created later for the same session is a new set of files
+                self.db.execute('DELETE FROM sources WHERE session = ?', (session_id,))
+                self.db.commit()
+        return written
+
+    def _key(self, session_id, stream, seq):
+        return f"{session_id}/{stream}/{seq}"
+
+    def _segment_path(self, segment):
+        return os.path.join(self.root, SEGMENT_NAME.format(segment))
+
+    def _current_segment(self):
+        segments = sorted(
+            int(name[len('segment-'):-len('.log')])
+            for name in os.listdir(self.root)
+            if name.startswith('segment-') and name.endswith('.log')
+        )
+        segment = segments[-1] if segments else 1
+        if os.path.exists(self._segment_path(segment)) and os.path.getsize(self._segment_path(segment)) >= self.segment_max_bytes:
+            segment += 1
+        return segment, self._segment_path(segment)
+
+    def _writer_lock(self):
+        return _FileLock(os.path.join(self.root, '.lock'))
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class _FileLock:
+    """Exclusive lock across processes writing to the same archive"""
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        if fcntl:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
+        self.file = None
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_log_archive():
+    """Process-wide LogArchive rooted at MEDIA_ROOT/game_log_archive"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = LogArchive()
+        return _archive
+
+
+def archive_session_logs(session_id, log_dir):
+    """
+    Move the logs of a finished session into the archive and remove its directory
+
+    Returns:
+        int: number of hand records written, or None if this process is still
+        writing to the session's logs (they are left for archive_game_logs)
+    """
+    if not close_session_log(session_id):
+        return None
+    if not os.path.isdir(log_dir):
+        return 0
+    return get_log_archive().archive_directory(log_dir, session_id, remove=True)
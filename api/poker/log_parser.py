@@ -0,0 +1,283 @@
+"""
+Streaming parser for the gamelog.txt format written by engine.Game and
+PokerGameManager, plus a sidecar offset index for random access to hands.
+
+    Round #12, Player (40), Bot (-40)
+    Player posts the blind of 1
+    Bot posts the blind of 2
+    Player dealt [As Kd]
+    Bot dealt [7c 2h]
+    Player raises to 6
+    Bot calls
+    Flop [Ah 7d 2c], Player (6), Bot (6)
+    ...
+    Player awarded 6
+    Bot awarded -6
+
+The index (``<log>.idx``) is a small header followed by fixed-size
+(hand number, byte offset) entries, so finding a hand is a seek into the index
+plus a seek into the log. It is extended incrementally as the log grows, and
+also works for player logs, whose hands start at "Starting Round #N".
+"""
+import os
+import re
+import struct
+from collections import namedtuple
+
+HandRecord = namedtuple('HandRecord', [
+    'number',     # Round number from the "Round #N" line (0 if the hand had none)
+    'offset',     # Byte offset of the hand's first line in the log
+    'bankrolls',  # {name: bankroll} at the start of the hand
+    'blinds',     # {name: blind posted}
+    'hands',      # {name: [cards]} dealt
+    'boards',     # {street name: [cards]} in order of appearance
+    'actions',    # [(street, name, action, amount)] with action in fold/call/check/bet/raise
+    'shows',      # {name: [cards]} shown at showdown
+    'awards',     # {name: delta}
+])
+
+STREETS = ('Preflop', 'Flop', 'Turn', 'River')
+
+ROUND_LINE = re.compile(r'^Round #(\d+)(.*)$')
+# Hand boundaries for the index: "Round #N" in game logs, "Starting Round #N" in player logs
+INDEX_LINE = re.compile(rb'^(?:Starting )?Round #(\d+)')
+FINAL_LINE = re.compile(r'^Final(.*)$')
+STATUS_VALUE = re.compile(r', (.+?) \((-?\d+)\)')
+BOARD_LINE = re.compile(r'^(Flop|Turn|River|Street \d+) \[([^\]]*)\]')
+BLIND_LINE = re.compile(r'^(.+) posts the blind of (\d+)$')
+DEALT_LINE = re.compile(r'^(.+) dealt \[([^\]]*)\]$')
+SHOWS_LINE = re.compile(r'^(.+) shows \[([^\]]*)\]$')
+AWARDED_LINE = re.compile(r'^(.+) awarded (-?\d+)$')
+ACTION_LINE = re.compile(r'^(.+) (folds|calls|checks|bets (\d+)|raises to (\d+))$')
+
+INDEX_MAGIC = b'IPLX'
+INDEX_HEADER = struct.Struct('<4sQ')  # magic, log bytes indexed so far
+INDEX_ENTRY = struct.Struct('<QQ')  # hand number, byte offset
+INDEX_SUFFIX = '.idx'
+
+
+def _new_hand(number, offset, status=''):
+    return {
+        'number': number,
+        'offset': offset,
+        'bankrolls': {name: int(value) for name, value in STATUS_VALUE.findall(status)},
+        'blinds': {},
+        'hands': {},
+        'boards': {},
+        'actions': [],
+        'shows': {},
+        'awards': {},
+        'street': STREETS[0],
+    }
+
+
+def _finish_hand(hand):
+    hand.pop('street')
+    return HandRecord(**hand)
+
+
+def _parse_line(hand, line):
+    """Apply one log line to the hand being built"""
+    match = BOARD_LINE.match(line)
+    if match:
+        hand['street'] = match.group(1)
+        hand['boards'][match.group(1)] = match.group(2).split()
+        return
+    match = BLIND_LINE.match(line)
+    if match:
+        hand['blinds'][match.group(1)] = int(match.group(2))
+        return
+    match = DEALT_LINE.match(line)
+    if match:
+        hand['hands'][match.group(1)] = match.group(2).split()
+        return
+    match = SHOWS_LINE.match(line)
+    if match:
+        hand['shows'][match.group(1)] = match.group(2).split()
+        return
+    match = AWARDED_LINE.match(line)
+    if match:
+        hand['awards'][match.group(1)] = int(match.group(2))
+        return
+    match = ACTION_LINE.match(line)
+    if match:
+        verb = match.group(2).split()[0]
+        action = {'folds': 'fold', 'calls': 'call', 'checks': 'check', 'bets': 'bet', 'raises': 'raise'}[verb]
+        amount = int(match.group(3) or match.group(4) or 0)
+        hand['actions'].append((hand['street'], match.group(1), action, amount))
+
+
+def iter_hands(lines, start_offset=0):
+    """
+    Parse a game log lazily, one hand at a time
+
+    Args:
+        lines: Iterable of log lines, bytes (for accurate offsets) or str
+        start_offset: Byte offset of the first line in the underlying file
+
+    Yields:
+        HandRecord for every hand in the log
+    """
+    hand = None
+    offset = start_offset
+    for raw in lines:
+        line_offset = offset
+        offset += len(raw) if isinstance(raw, bytes) else len(raw.encode())
+        line = (raw.decode(errors='replace') if isinstance(raw, bytes) else raw).rstrip('\r\n')
+        if not line:
+            continue
+
+        match = ROUND_LINE.match(line)
+        if match:
+            if hand is not None:
+                yield _finish_hand(hand)
+            hand = _new_hand(int(match.group(1)), line_offset, match.group(2))
+            continue
+        if FINAL_LINE.match(line):
+            break
+
+        if hand is None:
+            # Older manager logs have no round line for the first hand
+            if not (BLIND_LINE.match(line) or DEALT_LINE.match(line)):
+                continue
+            hand = _new_hand(0, line_offset)
+        _parse_line(hand, line)
+
+    if hand is not None:
+        yield _finish_hand(hand)
+
+
+def parse_hand_text(text, start_offset=0):
+    """Parse the text of a single hand (e.g. from the log archive)"""
+    return next(iter_hands(text.splitlines(keepends=True), start_offset), None)
+
+
+def parse_game_log(path):
+    """Generator over the hands of a game log file"""
+    with open(path, 'rb') as log_file:
+        yield from iter_hands(log_file)
+
+
+# Offset index
+
+def index_path(log_path):
+    return log_path + INDEX_SUFFIX
+
+
+def update_index(log_path):
+    """
+    Create or extend the sidecar index of a game or player log
+
+    Only the part of the log written since the last update is scanned.
+
+    Returns:
+        int: number of hands in the index
+    """
+    path = index_path(log_path)
+    log_size = os.path.getsize(log_path)
+
+    indexed_size = 0
+    if os.path.exists(path):
+        with open(path, 'rb') as index_file:
+            header = index_file.read(INDEX_HEADER.size)
+        if len(header) == INDEX_HEADER.size:
+            magic, indexed_size = INDEX_HEADER.unpack(header)
+            if magic != INDEX_MAGIC or indexed_size > log_size:
+                indexed_size = 0  # Unknown format or the log was rewritten
+
+    mode = 'r+b' if indexed_size else 'w+b'
+    with open(path, mode) as index_file, open(log_path, 'rb') as log_file:
+        if not indexed_size:
+            index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, 0))
+        if log_size > indexed_size:
+            log_file.seek(indexed_size)
+            index_file.seek(0, os.SEEK_END)
+            offset = indexed_size
+            for raw in log_file:
+                # Stop before a partially written last line; it is picked up next time
+                if not raw.endswith(b'\n'):
+                    break
+                match = INDEX_LINE.match(raw)
+                if match:
+                    index_file.write(INDEX_ENTRY.pack(int(match.group(1)), offset))
+                offset += len(raw)
+            index_file.seek(0)
+            index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, offset))
+        index_file.seek(0, os.SEEK_END)
+        return (index_file.tell() - INDEX_HEADER.size) // INDEX_ENTRY.size
+
+
+def _read_entry(index_file, position):
+    index_file.seek(INDEX_HEADER.size + position * INDEX_ENTRY.size)
+    return INDEX_ENTRY.unpack(index_file.read(INDEX_ENTRY.size))
+
+
+def hand_offsets(log_path, hand_no):
+    """
+    Look up where a hand starts (and where the next one starts) in a game log
+
+    Round numbers start again at 1 when a session deals a fresh game, so a
+    number can occur several times in one log; the last hand with it wins.
+
+    Returns:
+        (start, end) byte offsets, end is None for the last hand;
+        None if the hand is not in the log
+    """
+    count = update_index(log_path)
+    if not count:
+        return None
+
+    with open(index_path(log_path), 'rb') as index_file:
+        first_number, _ = _read_entry(index_file, 0)
+        last_number, _ = _read_entry(index_file, count - 1)
+
+        if last_number - first_number == count - 1:
+            # Numbered consecutively without restarts, so the entry is at a fixed slot
+            position = hand_no - first_number
+            if not 0 <= position < count:
+                return None
+        else:
+            index_file.seek(INDEX_HEADER.size)
+            numbers = [number for number, _ in INDEX_ENTRY.iter_unpack(index_file.read(count * INDEX_ENTRY.size))]
+            position = next((p for p in range(count - 1, -1, -1) if numbers[p] == hand_no), None)
+            if position is None:
+                return None
+
+        _, start = _read_entry(index_file, position)
+        end = _read_entry(index_file, position + 1)[1] if position + 1 < count else None
+    return start, end
+
+
+def _read_range(log_path, start, end):
+    with open(log_path, 'rb') as log_file:
+        log_file.seek(start)
+        data = log_file.read(end - start) if end is not None else log_file.read()
+    text = data.decode(errors='replace')
+    final = re.search(r'^Final', text, re.MULTILINE)
+    return text[:final.start()] if final else text
+
+
+def read_hand_text(log_path, hand_no):
+    """Read the raw lines of one hand without scanning the rest of the log"""
+    offsets = hand_offsets(log_path, hand_no)
+    return _read_range(log_path, *offsets) if offsets is not None else None
+
+
+def read_hand(log_path, hand_no):
+    """Parse one hand of a game log by its round number"""
+    offsets = hand_offsets(log_path, hand_no)
+    if offsets is None:
+        return None
+    return parse_hand_text(_read_range(log_path, *offsets), start_offset=offsets[0])
+
+
+def tail_offset(log_path, count):
+    """
+    Byte offset where the last ``count`` hands of a game log start, by position
+    in the index (round numbers may repeat); None if the log has no hands
+    """
+    total = update_index(log_path)
+    if not total or count <= 0:
+        return None
+    with open(index_path(log_path), 'rb') as index_file:
+        return _read_entry(index_file, max(0, total - count))[1]
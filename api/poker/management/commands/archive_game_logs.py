@@ -0,0 +1,52 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from poker.log_archive import LogArchive
+
+
+class Command(BaseCommand):
+    help = 'Copy per-session game_logs/<session> directories into the segmented log archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', help='Archive only this session id')
+        parser.add_argument('--min-age-minutes', type=int, default=60,
+                            help='Skip sessions whose logs changed more recently than this')
+        parser.add_argument('--remove', action='store_true',
+                            help='Delete each directory once the archive is checked to hold all of its hands')
+        parser.add_argument('--archive-dir', help='Archive location (default: MEDIA_ROOT/game_log_archive)')
+
+    def handle(self, *args, **options):
+        logs_root = os.path.join(settings.MEDIA_ROOT, 'game_logs')
+        if not os.path.isdir(logs_root):
+            self.stdout.write(self.style.WARNING(f'No game logs directory at {logs_root}'))
+            return
+
+        archive = LogArchive(root=options.get('archive_dir'))
+        cutoff = time.time() - options['min_age_minutes'] * 60
+
+        session_ids = [options['session']] if options.get('session') else sorted(os.listdir(logs_root))
+        archived = skipped = records = 0
+
+        for session_id in session_ids:
+            session_dir = os.path.join(logs_root, session_id)
+            if not os.path.isdir(session_dir):
+                continue
+
+            last_modified = max(
+                [os.path.getmtime(os.path.join(session_dir, name)) for name in os.listdir(session_dir)] or [0]
+            )
+            if last_modified > cutoff:
+                skipped += 1
+                continue
+
+            try:
+                records += archive.archive_directory(session_dir, session_id, remove=options['remove'])
+                archived += 1
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Failed to archive {session_id}: {str(e)}'))
+
+        archive.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} sessions ({records} hand records), skipped {skipped} recently active'
+        ))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from poker.benchmarks import DEFAULT_THRESHOLD, load_results, compare
+
+
+def print_comparison(command, rows):
+    """Print a comparison table; returns the number of regressions"""
+    regressions = 0
+    for name, base, current, change, status in rows:
+        if status == 'missing':
+            command.stdout.write(command.style.WARNING(f'{name:<36}{base:>14,.1f}{"-":>14}   missing'))
+            continue
+        line = f'{name:<36}{base:>14,.1f}{current:>14,.1f}{change:>+9.1%}   {status}'
+        if status == 'regression':
+            regressions += 1
+            command.stdout.write(command.style.ERROR(line))
+        elif status == 'improvement':
+            command.stdout.write(command.style.SUCCESS(line))
+        else:
+            command.stdout.write(line)
+    return regressions
+
+
+class Command(BaseCommand):
+    help = 'Compare two benchmark result files and flag regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline')
+        parser.add_argument('current')
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='Relative ops/sec drop reported as a regression (default 0.10)')
+
+    def handle(self, *args, **options):
+        try:
+            baseline = load_results(options['baseline'])
+            current = load_results(options['current'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'benchmark':<36}{'baseline':>14}{'current':>14}{'change':>9}")
+        regressions = print_comparison(self, compare(baseline, current, options['threshold']))
+        if regressions:
+            raise CommandError(f'{regressions} benchmark(s) regressed by more than {options["threshold"]:.0%}')
+        self.stdout.write(self.style.SUCCESS('No regressions'))
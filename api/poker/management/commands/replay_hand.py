@@ -0,0 +1,40 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from poker.log_parser import read_hand, read_hand_text, update_index
+
+
+class Command(BaseCommand):
+    help = 'Print one hand of a session game log using the sidecar offset index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('session_id')
+        parser.add_argument('hand_no', type=int)
+        parser.add_argument('--raw', action='store_true', help='Print the log lines instead of the parsed hand')
+
+    def handle(self, *args, **options):
+        log_path = os.path.join(settings.MEDIA_ROOT, 'game_logs', options['session_id'], 'gamelog.txt')
+        if not os.path.exists(log_path):
+            raise CommandError(f'Game log not found: {log_path}')
+
+        hands_indexed = update_index(log_path)
+        if options['raw']:
+            text = read_hand_text(log_path, options['hand_no'])
+            if text is None:
+                raise CommandError(f"Hand {options['hand_no']} not found ({hands_indexed} hands indexed)")
+            self.stdout.write(text)
+            return
+
+        hand = read_hand(log_path, options['hand_no'])
+        if hand is None:
+            raise CommandError(f"Hand {options['hand_no']} not found ({hands_indexed} hands indexed)")
+
+        self.stdout.write(self.style.SUCCESS(f'Round #{hand.number} (byte offset {hand.offset})'))
+        for name, cards in hand.hands.items():
+            self.stdout.write(f"  {name}: {' '.join(cards)}")
+        for street, name, action, amount in hand.actions:
+            self.stdout.write(f"  [{street}] {name} {action}{f' {amount}' if amount else ''}")
+        for street, cards in hand.boards.items():
+            self.stdout.write(f"  {street}: {' '.join(cards)}")
+        for name, delta in hand.awards.items():
+            self.stdout.write(f'  {name} awarded {delta}')
@@ -0,0 +1,50 @@
+import json
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from poker.benchmarks import BENCHMARKS, DEFAULT_REPEAT, DEFAULT_THRESHOLD, run_suite, load_results, compare
+from poker.management.commands.compare_benchmarks import print_comparison
+
+
+class Command(BaseCommand):
+    help = 'Run the engine benchmark suite and write the results as a JSON baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='Run only these benchmarks')
+        parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiply every benchmark size')
+        parser.add_argument('--compare', help='Baseline JSON to compare the results against')
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    def handle(self, *args, **options):
+        # Manager and simulator benchmarks write sessions and hands; only run
+        # them against the throwaway database of settings_benchmark
+        in_memory = connection.vendor == 'sqlite' and 'mode=memory' in str(connection.settings_dict['NAME'])
+        if in_memory:
+            call_command('migrate', run_syncdb=True, verbosity=0)
+        else:
+            self.stdout.write(self.style.WARNING(
+                'Skipping database benchmarks; run with --settings=poker_backend.settings_benchmark to include them'
+            ))
+
+        def report(name, result):
+            self.stdout.write(f"{name:<36}{result['ops_per_sec']:>14,.1f} {result['unit']}/s"
+                              f"  (best {result['best_ops_per_sec']:,.1f}, n={result['size']})")
+
+        results = run_suite(
+            names=options['only'], repeat=options['repeat'], scale=options['scale'],
+            include_db=in_memory, on_result=report
+        )
+        for name, reason in results['skipped'].items():
+            self.stdout.write(self.style.WARNING(f'{name}: skipped ({reason})'))
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            rows = compare(load_results(options['compare']), results, options['threshold'])
+            if print_comparison(self, rows):
+                raise CommandError('Performance regressions detected')
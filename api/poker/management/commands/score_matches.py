@@ -0,0 +1,37 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from poker.log_parser import parse_game_log
+from poker.scoring import score_session, score_bot, score_hands, hand_from_log
+
+
+class Command(BaseCommand):
+    help = 'Report raw, all-in EV and luck-corrected (AIVAT-style) results for a session, a bot or a game log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', help='Score the HandHistory of this session (from the player seat)')
+        parser.add_argument('--bot', help='Score every recorded hand of this bot')
+        parser.add_argument('--opponent', help='With --bot, only hands against this bot')
+        parser.add_argument('--log', help='Score a gamelog.txt file (from the first seat dealt)')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['session']:
+            report = score_session(options['session'])
+        elif options['bot']:
+            report = score_bot(options['bot'], options.get('opponent'))
+        elif options['log']:
+            report = score_hands(hand_from_log(record) for record in parse_game_log(options['log']) if len(record.hands) == 2)
+        else:
+            raise CommandError('Specify --session, --bot or --log')
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"{report['hands']} hands"))
+        self.stdout.write(f"{'':<10}{'total':>12}{'bb/100':>10}{'stderr':>10}{'var. red.':>11}")
+        for name in ('raw', 'allin_ev', 'aivat'):
+            row = report[name]
+            self.stdout.write(
+                f"{name:<10}{row['total']:>12}{row['bb_per_100']:>10}{row['stderr']:>10}{row['variance_reduction']:>11.1%}"
+            )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from poker.engine import BIG_BLIND
+from poker.vector_sim import ThresholdBot, VectorSimpleBot, simulate
+
+
+class Command(BaseCommand):
+    help = 'Evaluate a parametric threshold bot with the lockstep multi-table simulator'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--raise-threshold', type=float, default=0.7)
+        parser.add_argument('--call-threshold', type=float, default=0.4)
+        parser.add_argument('--raise-fraction', type=float, default=0.25,
+                            help='Raise size between the minimum (0) and all in (1)')
+        parser.add_argument('--opponent', default='simple',
+                            help="'simple', or raise,call,fraction for a threshold opponent")
+        parser.add_argument('--tables', type=int, default=4096)
+        parser.add_argument('--rounds', type=int, default=10, help='Hands per table')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        bot = ThresholdBot(options['raise_threshold'], options['call_threshold'], options['raise_fraction'])
+        if options['opponent'] == 'simple':
+            opponent = VectorSimpleBot()
+        else:
+            opponent = ThresholdBot(*(float(value) for value in options['opponent'].split(',')))
+
+        result = simulate(bot, opponent, tables=options['tables'], rounds=options['rounds'], seed=options['seed'])
+        bb_per_100 = 100 * result.mean / BIG_BLIND
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.hands} hands: {result.total} chips, {bb_per_100:.2f} bb/100 "
+            f"(± {100 * result.stderr / BIG_BLIND:.2f})"
+        ))
@@ -1,34 +1,45 @@
 import os
-import sys
-import importlib.util
-import zipfile
-import tempfile
-import shutil
 import threading
 import time
 import logging
 import traceback
-from pathlib import Path
+import weakref
 from django.conf import settings
-from django.db import connection
-from queue import Queue
+from django.db import connection, transaction
 
 from .engine import (
-    RoundState, FoldAction, CallAction, CheckAction, RaiseAction, TerminalState,
-    SMALL_BLIND, BIG_BLIND, STARTING_STACK, PokerSettings
+    RoundState, FoldAction, CallAction, CheckAction, RaiseAction, TerminalState, PokerSettings,
+    GameLogWriter, PlayerMessages, action_code, action_phrase, street_name
+)
+from .events import EventHooks, went_to_showdown
+from .session_log import open_session_log, release_session_log, sync_session_log
+from .log_archive import archive_session_logs
+from .hud_stats import HudStatsBuffer, player_key
+from .early_stopping import SequentialTest
+from .decks import DeckSource, SESSION_DECK_BLOCK_SIZE, new_seed
+from .tracing import trace, span
+from .profiling import BotProfiler, save_bot_profile
+from .bot_loader import load_bot, release_bot, loaded_bot_count
+from .memory import MemoryReport, memory_report_enabled
+from .metrics import (
+    gauge, HANDS_PLAYED, DB_WRITES, LOG_BYTES, BOT_DECISION_SECONDS, BOT_ERRORS, BOT_LOADS,
+    SIMULATIONS, SIMULATION_STEP_ERRORS
 )
-import eval7
 
-CCARDS = lambda cards: ','.join(map(str, cards))
 PCARDS = lambda cards: '[{}]'.format(' '.join(map(str, cards)))
 PVALUE = lambda name, value: ', {} ({})'.format(name, value)
 STATUS = lambda players: ''.join([PVALUE(p.name, p.bankroll) for p in players])
-STREET_NAMES = ['Flop', 'Turn', 'River']
 PLAYER_LOG_SIZE_LIMIT = 1024 * 1024  # 1MB log size limit
+HAND_HISTORY_BATCH_SIZE = 200  # Hands buffered before a bulk insert in simulations
+HAND_HISTORY_SEATS = ['a', 'b']
+HAND_HISTORY_STREETS = {0: 'preflop', 3: 'flop', 4: 'turn', 5: 'river'}
 logger = logging.getLogger(__name__)
 
 # Dictionary to keep track of running bot simulations
 RUNNING_SIMULATIONS = {}
+SIMULATIONS_RUNNING = gauge(
+    'poker_simulations_running', 'Bot vs bot simulations currently running', function=lambda: len(RUNNING_SIMULATIONS)
+)
 
 
 class SimpleBot:
@@ -52,17 +63,21 @@ class BotInterface:
     """
     Interface for bot interaction. Handles loading and communicating with bots.
     """
-    def __init__(self, bot_repository=None, bot_instance=None):
+    def __init__(self, bot_repository=None, bot_instance=None, profile=False):
         """
         Initialize a bot interface either from a repository or a direct instance
         
         Args:
             bot_repository: BotRepository model instance
             bot_instance: Already initialized bot instance
+            profile: Run every decision under cProfile (see save_profile)
         """
         self.bot_repository = bot_repository
         self.bot_instance = bot_instance
-        self.temp_dir = None
+        self.bot_dir = None  # Directory of the loaded player.py
+        self.cache_hit = False  # Whether the bot module came from the loader cache
+        self._release = None  # Gives the loaded module back to the loader; also run when collected
+        self.profiler = BotProfiler() if profile else None
         
         # Import action types once at init time
         from .engine import FoldAction, CallAction, CheckAction, RaiseAction
@@ -73,8 +88,18 @@ class BotInterface:
         
         if bot_repository and not bot_instance:
             self.bot_instance = self._load_bot_from_repository(bot_repository)
+            if bot_repository.name.lower() == 'simple':
+                BOT_LOADS.inc(result='builtin')
+            else:
+                if isinstance(self.bot_instance, SimpleBot):
+                    BOT_LOADS.inc(result='fallback')
+                else:
+                    BOT_LOADS.inc(result='cache_hit' if self.cache_hit else 'loaded')
         elif not bot_instance:
             self.bot_instance = SimpleBot()  # Default fallback
+
+        # Label of this bot in metrics
+        self.metric_label = bot_repository.name if bot_repository else type(self.bot_instance).__name__
     
     def _load_bot_from_repository(self, bot_repository):
         """
@@ -146,79 +171,22 @@ class BotInterface:
         if not os.path.exists(bot_path):
             raise FileNotFoundError(f"Bot path does not exist: {bot_path}")
         
-        # Handle zip files
-        if bot_path.endswith('.zip'):
-            # Create a temporary directory
-            self.temp_dir = tempfile.mkdtemp(prefix='poker_bot_')
-            
-            # Extract the zip
-            with zipfile.ZipFile(bot_path, 'r') as zip_ref:
-                zip_ref.extractall(self.temp_dir)
-            
-            # Find the player.py file
-            player_files = list(Path(self.temp_dir).glob('**/player.py'))
-            if not player_files:
-                raise FileNotFoundError(f"No player.py found in {bot_path}")
-            
-            module_path = str(player_files[0])
-            module_dir = os.path.dirname(module_path)
-            
-            # Add the module directory to sys.path to resolve imports
-            if module_dir not in sys.path:
-                sys.path.insert(0, module_dir)
-                
-            # Add project skeletons directory to sys.path if exists
-            project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-            skeleton_dir = os.path.join(project_dir, 'skeletons')
-            if os.path.exists(skeleton_dir) and skeleton_dir not in sys.path:
-                sys.path.insert(0, skeleton_dir)
-        else:
-            # It's already a directory or direct file path
-            if os.path.isdir(bot_path):
-                module_path = os.path.join(bot_path, 'player.py')
-                if not os.path.exists(module_path):
-                    raise FileNotFoundError(f"No player.py found in {bot_path}")
-            else:
-                module_path = bot_path
-            
-            # Add the directory to sys.path
-            module_dir = os.path.dirname(module_path)
-            if module_dir not in sys.path:
-                sys.path.insert(0, module_dir)
-            
-            # Add skeleton directory for bot imports
-            skeleton_dir = os.path.join(module_dir, 'skeleton')
-            if os.path.exists(skeleton_dir) and skeleton_dir not in sys.path:
-                sys.path.insert(0, skeleton_dir)
+        # Import action types to make them available to the bot
+        from .engine import FoldAction, CallAction, CheckAction, RaiseAction
+        action_types = {
+            'FoldAction': FoldAction,
+            'CallAction': CallAction,
+            'CheckAction': CheckAction,
+            'RaiseAction': RaiseAction,
+        }
         
-        # Load the module
         try:
-            # Import action types to make them available to the bot
-            from .engine import FoldAction, CallAction, CheckAction, RaiseAction
-            
-            module_name = f'user_bot_module_{id(self)}'  # Use unique module name to avoid conflicts
-            spec = importlib.util.spec_from_file_location(module_name, module_path)
-            if spec is None:
-                raise ImportError(f"Could not load module from {module_path}")
-            
-            module = importlib.util.module_from_spec(spec)
-            
-            # Inject action types into the module namespace
-            module.FoldAction = FoldAction
-            module.CallAction = CallAction
-            module.CheckAction = CheckAction
-            module.RaiseAction = RaiseAction
-            
-            sys.modules[module_name] = module
-            spec.loader.exec_module(module)
-            
-            # Look for a class with get_action method
-            bot_class = None
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                if hasattr(attr, 'get_action') and callable(getattr(attr, 'get_action')):
-                    bot_class = attr
-                    break
+            # The module is shared by every interface of this bot file; instances are not
+            loaded, self.cache_hit = load_bot(bot_path, extra_globals=action_types)
+            self._release = weakref.finalize(self, release_bot, loaded)
+            self.bot_dir = loaded.bot_dir
+            module = loaded.module
+            bot_class = loaded.bot_class
             
             if not bot_class and hasattr(module, 'get_action') and callable(module.get_action):
                 # The module itself has get_action directly as a function
@@ -228,13 +196,11 @@ class BotInterface:
                 return DirectFunctionBot()
             
             if not bot_class:
-                raise ValueError(f"No bot class with get_action method found in {module_path}")
+                raise ValueError(f"No bot class with get_action method found in {bot_path}")
             
             # Also make action types available in the bot class
-            bot_class.FoldAction = FoldAction
-            bot_class.CallAction = CallAction
-            bot_class.CheckAction = CheckAction
-            bot_class.RaiseAction = RaiseAction
+            for name, action_type in action_types.items():
+                setattr(bot_class, name, action_type)
             
             # Try to instantiate the bot
             try:
@@ -249,9 +215,27 @@ class BotInterface:
                         raise ValueError(f"Could not instantiate bot class: {e}")
         except Exception as e:
             logger.error(f"Error loading bot module: {str(e)}")
+            self.release()
             raise
+
+    def release(self):
+        """Let the loader unload this bot's module once it is evicted; the bot must not play afterwards"""
+        if self._release is not None:
+            self._release()
     
     def get_action(self, game_state, round_state, active):
+        """
+        Get an action from the bot, timing the decision
+        """
+        start = time.perf_counter()
+        try:
+            if self.profiler is not None:
+                return self.profiler.run(self._get_action, game_state, round_state, active)
+            return self._get_action(game_state, round_state, active)
+        finally:
+            BOT_DECISION_SECONDS.observe(time.perf_counter() - start, bot=self.metric_label)
+
+    def _get_action(self, game_state, round_state, active):
         """
         Get an action from the bot
         
@@ -322,6 +306,7 @@ class BotInterface:
             
         except Exception as e:
             logger.error(f"Error getting bot action: {str(e)}")
+            BOT_ERRORS.inc(bot=self.metric_label)
             # Basic error handling - get a legal action
             if hasattr(round_state, 'legal_actions'):
                 legal_actions = round_state.legal_actions()
@@ -330,13 +315,49 @@ class BotInterface:
                 return FoldAction()
             return FoldAction()
     
-    def __del__(self):
-        """Clean up temporary directory if it exists"""
-        if self.temp_dir and os.path.exists(self.temp_dir):
-            try:
-                shutil.rmtree(self.temp_dir)
-            except:
-                pass
+    def save_profile(self):
+        """
+        Merge the profile of the decisions made so far into the bot's BotProfile
+
+        Returns:
+            The BotProfile, or None when nothing was profiled
+        """
+        if self.profiler is None or not self.profiler.decisions or self.bot_repository is None:
+            return None
+        profile = save_bot_profile(self.bot_repository, self.profiler.stats(self.bot_dir), self.profiler.decisions)
+        self.profiler = BotProfiler()  # Saved decisions must not be merged twice
+        return profile
+
+
+class PlayerLogWriter:
+    """
+    Event subscriber writing what each seat sees to its player log
+    """
+    def __init__(self, write, names):
+        self.write = write  # write(seat, message)
+        self.names = names
+
+    def on_hand_start(self, event):
+        self.write(0, f"Hand dealt: {PCARDS(event.hands[0])}\n")
+        self.write(1, f"Hand dealt: {PCARDS(event.hands[1])}\n")
+
+    def on_street(self, event):
+        message = f"{street_name(event.street)}: {PCARDS(event.board)}\n"
+        self.write(0, message)
+        self.write(1, message)
+
+    def on_action(self, event):
+        message = f"{self.names[event.seat]}{action_phrase(event.action, event.bet)}\n"
+        self.write(0, message)
+        self.write(1, message)
+
+    def on_showdown(self, event):
+        self.write(0, f"{self.names[1]} shows {PCARDS(event.hands[1])}\n")
+        self.write(1, f"{self.names[0]} shows {PCARDS(event.hands[0])}\n")
+
+    def on_terminal(self, event):
+        self.write(0, f"Hand result: {self.names[0]} awarded {event.deltas[0]}\n")
+        self.write(1, f"Hand result: {self.names[1]} awarded {event.deltas[1]}\n")
 
 
 class PokerGameManager:
@@ -348,16 +369,20 @@ class PokerGameManager:
         """Initialize the game manager with a session"""
         self.session = session
         self.player = session.player
-        self.deck = eval7.Deck()  # Initial deck
+        # Hands are dealt from the session's replayable deck sequence, one deck at a time
+        stored_state = session.game_state or {}
+        self.deck_seed = stored_state['deck_seed'] if stored_state.get('deck_seed') is not None else new_seed()
+        self.deck_index = stored_state.get('deck_index')
+        self.deck_source = DeckSource(self.deck_seed, block_size=SESSION_DECK_BLOCK_SIZE)
         self.settings = PokerSettings()
         
         # Game logging
-        self.log = [f'Poker Game - {session.player_bot.name if hasattr(session, "player_bot") and session.player_bot else "Human"} vs {session.opponent_bot.name if hasattr(session, "opponent_bot") and session.opponent_bot else "Bot"}']
-        self.player_messages = [[], []]  # Messages for each player
+        self.log_header = f'Poker Game - {session.player_bot.name if hasattr(session, "player_bot") and session.player_bot else "Human"} vs {session.opponent_bot.name if hasattr(session, "opponent_bot") and session.opponent_bot else "Bot"}'
         self.log_dir = os.path.join(settings.MEDIA_ROOT, 'game_logs', str(session.session_id))
         
-        # Ensure log directory exists
-        os.makedirs(self.log_dir, exist_ok=True)
+        # Game and player logs are appended to disk as the session is saved;
+        # lines wait in pending_log_lines until the state they describe is stored
+        self.pending_log_lines = []  # (player log name or None for the game log, message)
         
         # Determine game mode
         self.is_bot_vs_bot = hasattr(session, 'play_mode') and session.play_mode == 'bot'
@@ -374,201 +399,222 @@ class PokerGameManager:
         self.player_bot = None
         if self.is_bot_vs_bot and hasattr(session, 'player_bot') and session.player_bot:
             logger.info(f"Loading player bot from repository: {session.player_bot.name}")
-            self.player_bot = BotInterface(bot_repository=session.player_bot)
+            self.player_bot = BotInterface(bot_repository=session.player_bot, profile=session.profile_bots)
             logger.info(f"Player bot loaded: {self.player_bot is not None}")
         
         # Initialize opponent bot
         self.opponent_bot = self.simple_bot  # Default is SimpleBot
         if hasattr(session, 'opponent_bot') and session.opponent_bot:
             logger.info(f"Loading opponent bot from repository: {session.opponent_bot.name}")
-            self.opponent_bot = BotInterface(bot_repository=session.opponent_bot)
+            self.opponent_bot = BotInterface(bot_repository=session.opponent_bot, profile=session.profile_bots)
             logger.info(f"Opponent bot loaded: {self.opponent_bot is not None}")
         
         self.buy_in_amount = getattr(session, 'current_coins', 200)
         
-        # Player loggers
-        self.player_a_logs = Queue()  # For player/player_bot outputs
-        self.player_b_logs = Queue()  # For opponent_bot outputs
+        # Player log names (player/player_bot and opponent_bot outputs)
+        self.player_log_names = [
+            "player_a" if not (self.is_bot_vs_bot and session.player_bot) else session.player_bot.name.replace(' ', '_').lower(),
+            "player_b" if not session.opponent_bot else session.opponent_bot.name.replace(' ', '_').lower()
+        ]
+
+        # Hand history: compact actions of the current hand travel with the
+        # serialized game state, completed hands are bulk inserted
+        self.hand_actions = (session.game_state or {}).get('actions', '')
+        self.pending_hands = []
+        self.hand_history_batch_size = 1
+        self.last_hand_delta = 0  # Player's chips won in the last completed hand
+        self.last_trace = None  # Trace of the last process_player_action, when tracing
+
+        # HUD counters, keyed by who sits in each seat
+        self.hud_stats = HudStatsBuffer()
+        self.hud_subjects = [
+            player_key(bot=session.player_bot) if self.is_bot_vs_bot else player_key(user=session.player),
+            player_key(bot=session.opponent_bot)
+        ]
+
+        # Game log, player logs, player messages, hand history and HUD counters
+        # all follow the hand through event hooks
+        self.seat_names = [
+            session.player_bot.name if self.is_bot_vs_bot and session.player_bot else "Player",
+            session.opponent_bot.name if session.opponent_bot else "Bot"
+        ]
+        self.message_writer = PlayerMessages()
+        self.player_messages = self.message_writer.messages  # Messages for each player
+        self.hooks = EventHooks(
+            GameLogWriter(self.log_message, self.seat_names),
+            PlayerLogWriter(self.log_player_message, self.seat_names),
+            self.message_writer,
+            self
+        )
 
     def log_message(self, message):
-        """Add a message to the game log"""
-        self.log.append(message)
+        """Add a message to the game log; it is written out by the next session save"""
+        self.pending_log_lines.append((None, message))
         logger.info(f"Game log: {message}")
 
     def log_player_message(self, player_idx, message):
-        """Add a message to a player's log"""
-        if isinstance(message, str):
-            message = message.encode()
-            
-        if player_idx == 0:
-            self.player_a_logs.put(message)
-        else:
-            self.player_b_logs.put(message)
+        """Add a message to a player's log; it is written out by the next session save"""
+        self.pending_log_lines.append((self.player_log_names[player_idx], message))
 
-    def log_round_state(self, round_state):
+    def _write_pending_logs(self):
+        """Append the log lines of the state that was just saved"""
+        pending, self.pending_log_lines = self.pending_log_lines, []
+        if not pending:
+            return
+        # Held only while writing, so an idle log can be closed between requests
+        session_log = open_session_log(self.session.session_id, self.log_dir, header=self.log_header)
+        try:
+            for name, message in pending:
+                if name is None:
+                    LOG_BYTES.inc(session_log.write_game(message), log='game')
+                else:
+                    LOG_BYTES.inc(session_log.write_player(name, message), log='player')
+        finally:
+            release_session_log(session_log)
+
+    def on_action(self, event):
         """
-        Log the current state of the round
+        Event handler appending an action to the compact action string of the current hand
         """
-        player_name = self.session.player_bot.name if self.is_bot_vs_bot and hasattr(self.session, 'player_bot') and self.session.player_bot else "Player"
-        bot_name = self.session.opponent_bot.name if hasattr(self.session, 'opponent_bot') and self.session.opponent_bot else "Bot"
-        
-        players = [player_name, bot_name]
-        
-        if round_state.street == 0 and round_state.button == 0:
-            # Log blinds
-            self.log_message(f'{players[0]} posts the blind of {SMALL_BLIND}')
-            self.log_message(f'{players[1]} posts the blind of {BIG_BLIND}')
-            
-            # Log dealt cards
-            self.log_message(f'{players[0]} dealt {PCARDS(round_state.hands[0])}')
-            self.log_message(f'{players[1]} dealt {PCARDS(round_state.hands[1])}')
-            
-            # Create player messages
-            self.player_messages[0] = ['T0.', 'P0', 'H' + CCARDS(round_state.hands[0])]
-            self.player_messages[1] = ['T0.', 'P1', 'H' + CCARDS(round_state.hands[1])]
-            
-            # Add messages to player logs
-            self.log_player_message(0, f"Hand dealt: {PCARDS(round_state.hands[0])}\n")
-            self.log_player_message(1, f"Hand dealt: {PCARDS(round_state.hands[1])}\n")
-            
-        elif round_state.street > 0 and round_state.button == 1:
-            # For simplicity, we're using the first n cards from the deck
-            board = round_state.deck[:round_state.street]
-            street_name = STREET_NAMES[round_state.street - 3] if round_state.street <= 5 else f'Street {round_state.street}'
-            
-            # Log board cards and player stacks
-            stack_info = f"{PVALUE(players[0], STARTING_STACK - round_state.stacks[0])}" + \
-                         f"{PVALUE(players[1], STARTING_STACK - round_state.stacks[1])}"
-            self.log_message(f"{street_name} {PCARDS(board)}{stack_info}")
-            
-            # Create board message for players
-            compressed_board = 'B' + CCARDS(board)
-            self.player_messages[0].append(compressed_board)
-            self.player_messages[1].append(compressed_board)
-            
-            # Add board message to player logs
-            self.log_player_message(0, f"{street_name}: {PCARDS(board)}\n")
-            self.log_player_message(1, f"{street_name}: {PCARDS(board)}\n")
+        street = event.round_state.street
+        street_index = list(HAND_HISTORY_STREETS).index(street) if street in HAND_HISTORY_STREETS else 0
+        separators = street_index - self.hand_actions.count('/')
+        if separators > 0:
+            self.hand_actions += '/' * separators
+        self.hand_actions += HAND_HISTORY_SEATS[event.seat] + action_code(event.action)
 
-    def log_action(self, player_idx, action, bet_override=False):
+    def on_terminal(self, event):
         """
-        Log a player's action
+        Event handler updating HUD counters from the finished hand
         """
-        player_name = self.session.player_bot.name if player_idx == 0 and self.is_bot_vs_bot and hasattr(self.session, 'player_bot') and self.session.player_bot else "Player" if player_idx == 0 else self.session.opponent_bot.name if hasattr(self.session, 'opponent_bot') and self.session.opponent_bot else "Bot"
-        
-        if isinstance(action, FoldAction):
-            phrasing = ' folds'
-            code = 'F'
-        elif isinstance(action, CallAction):
-            phrasing = ' calls'
-            code = 'C'
-        elif isinstance(action, CheckAction):
-            phrasing = ' checks'
-            code = 'K'
-        else:  # isinstance(action, RaiseAction)
-            phrasing = (' bets ' if bet_override else ' raises to ') + str(action.amount)
-            code = f'R{action.amount}'
-        
-        # Log the action
-        self.log_message(player_name + phrasing)
-        
-        # Add action to player messages
-        self.player_messages[0].append(code)
-        self.player_messages[1].append(code)
-        
-        # Add to player logs
-        self.log_player_message(0, f"{player_name}{phrasing}\n")
-        self.log_player_message(1, f"{player_name}{phrasing}\n")
+        self.hud_stats.add_hand(
+            self.hud_subjects,
+            self.hand_actions,
+            saw_flop=event.saw_flop,
+            showdown=event.showdown,
+            deltas=event.deltas
+        )
 
-    def log_terminal_state(self, round_state):
+    def record_hand_history(self, terminal_state):
         """
-        Log the end state of a round
+        Queue a HandHistory row for a completed hand, flushing when the batch is full
         """
-        player_name = self.session.player_bot.name if self.is_bot_vs_bot and hasattr(self.session, 'player_bot') and self.session.player_bot else "Player"
-        bot_name = self.session.opponent_bot.name if hasattr(self.session, 'opponent_bot') and self.session.opponent_bot else "Bot"
-        
-        players = [player_name, bot_name]
-        
-        previous_state = round_state.previous_state
-        if previous_state and FoldAction not in previous_state.legal_actions():
-            # Log showdown
-            self.log_message(f'{players[0]} shows {PCARDS(previous_state.hands[0])}')
-            self.log_message(f'{players[1]} shows {PCARDS(previous_state.hands[1])}')
-            
-            # Add to player messages
-            self.player_messages[0].append('O' + CCARDS(previous_state.hands[1]))
-            self.player_messages[1].append('O' + CCARDS(previous_state.hands[0]))
-            
-            # Add to player logs
-            self.log_player_message(0, f"{players[1]} shows {PCARDS(previous_state.hands[1])}\n")
-            self.log_player_message(1, f"{players[0]} shows {PCARDS(previous_state.hands[0])}\n")
-        
-        # Log results
-        self.log_message(f'{players[0]} awarded {round_state.deltas[0]}')
-        self.log_message(f'{players[1]} awarded {round_state.deltas[1]}')
-        
-        # Add to player messages
-        self.player_messages[0].append('D' + str(round_state.deltas[0]))
-        self.player_messages[1].append('D' + str(round_state.deltas[1]))
-        
-        # Add to player logs
-        self.log_player_message(0, f"Hand result: {players[0]} awarded {round_state.deltas[0]}\n")
-        self.log_player_message(1, f"Hand result: {players[1]} awarded {round_state.deltas[1]}\n")
+        from .models import HandHistory
 
-    def save_logs(self):
+        previous_state = terminal_state.previous_state
+        street = previous_state.street if previous_state else 0
+        hands = previous_state.hands if previous_state else [self.session.player_cards, []]
+        board = previous_state.deck[:street] if previous_state and street > 0 else []
+        showdown = went_to_showdown(terminal_state)
+        self.last_hand_delta = terminal_state.deltas[0]
+
+        self.pending_hands.append(HandHistory(
+            session_id=self.session.session_id,
+            hand_no=self.session.hands_played,
+            player_bot_id=self.session.player_bot_id,
+            opponent_bot_id=self.session.opponent_bot_id,
+            player_cards=''.join(str(c) for c in hands[0]),
+            opponent_cards=''.join(str(c) for c in hands[1]),
+            board_cards=''.join(str(c) for c in board),
+            actions=self.hand_actions,
+            player_delta=terminal_state.deltas[0],
+            opponent_delta=terminal_state.deltas[1],
+            pot=self.session.pot,
+            street_reached=HAND_HISTORY_STREETS.get(street, 'river'),
+            showdown=showdown,
+            deck_seed=self.deck_seed,
+            deck_index=self.deck_index
+        ))
+
+        if len(self.pending_hands) >= self.hand_history_batch_size:
+            self.flush_hand_history()
+
+    def flush_hand_history(self):
         """
-        Save all logs to files
+        Bulk insert all queued HandHistory rows and apply pending HUD counters
         """
-        # Save game log
-        game_log_path = os.path.join(self.log_dir, 'gamelog.txt')
+        from .models import HandHistory
+
+        if self.hud_stats.flush():
+            DB_WRITES.inc(kind='hud_stats')
+        if not self.pending_hands:
+            return 0
+        pending, self.pending_hands = self.pending_hands, []
         try:
-            with open(game_log_path, 'w') as log_file:
-                log_file.write('\n'.join(self.log))
-                log_file.flush()
-                os.fsync(log_file.fileno())  # Ensure it's written to disk
-            logger.info(f"Game log saved to: {os.path.abspath(game_log_path)}")
+            # A hand already stored by another worker keeps its original row
+            with transaction.atomic():
+                HandHistory.objects.bulk_create(pending, batch_size=HAND_HISTORY_BATCH_SIZE, ignore_conflicts=True)
+            DB_WRITES.inc(kind='hand_history')
+            return len(pending)
         except Exception as e:
-            logger.error(f"Error writing game log: {str(e)}")
-        
-        # Save player A log
-        player_a_name = "player_a" if not (self.is_bot_vs_bot and hasattr(self.session, 'player_bot') and self.session.player_bot) else self.session.player_bot.name.replace(' ', '_').lower()
-        player_a_log_path = os.path.join(self.log_dir, f"{player_a_name}.txt")
+            logger.error(f"Error writing hand history batch, inserting hands one by one: {str(e)}")
+
+        # One bad row must not cost the rest of the batch
+        written = 0
+        for hand in pending:
+            try:
+                with transaction.atomic():
+                    HandHistory.objects.bulk_create([hand], ignore_conflicts=True)
+                DB_WRITES.inc(kind='hand_history')
+                written += 1
+            except Exception as e:
+                logger.error(f"Error writing hand {hand.hand_no} of session {hand.session_id}: {str(e)}")
+        return written
+
+    def save_bot_profiles(self):
+        """Store the profiles of bots running with profiling enabled"""
+        for bot in (self.player_bot, self.opponent_bot):
+            if bot is None:
+                continue
+            try:
+                bot.save_profile()
+            except Exception as e:
+                logger.error(f"Error saving bot profile: {str(e)}")
+
+    def release_bots(self):
+        """Release the loaded bot modules once this manager's bots are done playing"""
+        for bot in (self.player_bot, self.opponent_bot):
+            if bot is not None:
+                bot.release()
+
+    def _save_session(self):
+        """Save the session, counting the write, then append the log lines leading up to it"""
         try:
-            with open(player_a_log_path, 'wb') as log_file:
-                bytes_written = 0
-                for output in self.player_a_logs.queue:
-                    try:
-                        bytes_written += log_file.write(output)
-                        if bytes_written >= PLAYER_LOG_SIZE_LIMIT:
-                            log_file.write(b"\n--- Log truncated due to size limit ---")
-                            break
-                    except TypeError:
-                        pass
-                log_file.flush()
-                os.fsync(log_file.fileno())  # Ensure it's written to disk
-            logger.info(f"Player A log saved to: {os.path.abspath(player_a_log_path)}")
+            self.session.save()
+        except Exception:
+            # The state was not stored (e.g. another request won the version
+            # check), so the actions logged for it never happened
+            self.pending_log_lines = []
+            raise
+        DB_WRITES.inc(kind='session')
+        self._write_pending_logs()
+
+    def save_logs(self):
+        """
+        Make sure all logs written so far are on disk
+        """
+        try:
+            sync_session_log(self.session.session_id)
+            logger.info(f"Logs synced to: {os.path.abspath(self.log_dir)}")
         except Exception as e:
-            logger.error(f"Error writing player A log: {str(e)}")
-        
-        # Save player B log
-        player_b_name = "player_b" if not (hasattr(self.session, 'opponent_bot') and self.session.opponent_bot) else self.session.opponent_bot.name.replace(' ', '_').lower()
-        player_b_log_path = os.path.join(self.log_dir, f"{player_b_name}.txt")
+            logger.error(f"Error syncing logs: {str(e)}")
+
+    def archive_logs(self):
+        """
+        Move the logs of the finished session into the segmented archive, so
+        its game_logs directory doesn't outlive it
+
+        Returns:
+            Number of hand records archived, or None if nothing was archived
+        """
+        if not getattr(settings, 'POKER_ARCHIVE_SESSION_LOGS', True):
+            return None
         try:
-            with open(player_b_log_path, 'wb') as log_file:
-                bytes_written = 0
-                for output in self.player_b_logs.queue:
-                    try:
-                        bytes_written += log_file.write(output)
-                        if bytes_written >= PLAYER_LOG_SIZE_LIMIT:
-                            log_file.write(b"\n--- Log truncated due to size limit ---")
-                            break
-                    except TypeError:
-                        pass
-                log_file.flush()
-                os.fsync(log_file.fileno())  # Ensure it's written to disk
-            logger.info(f"Player B log saved to: {os.path.abspath(player_b_log_path)}")
+            return archive_session_logs(self.session.session_id, self.log_dir)
         except Exception as e:
-            logger.error(f"Error writing player B log: {str(e)}")
+            # The directory is kept, so archive_game_logs can still pick it up
+            logger.error(f"Error archiving logs of session {self.session.session_id}: {str(e)}")
+            return None
 
     def _get_min_raise_amount(self, round_state):
         """Get the minimum raise amount from the round state"""
@@ -623,25 +669,24 @@ class PokerGameManager:
         logger.info(f"Starting new hand. Continue session: {continue_session}")
         logger.info(f"Current player stack: {self.session.player_stack}, bot stack: {self.session.bot_stack}")
         
-        # Create a fresh deck for this hand
-        self.deck = eval7.Deck()
+        self.hand_actions = ''
+        self.pending_log_lines = []  # Lines of a step that failed before saving
         
-        # Add round separator to logs
-        if continue_session:
-            round_num = self.session.hands_played + 1
-            self.log_message("")
-            self.log_message(f"Round #{round_num}{STATUS([type('Player', (), {'name': 'Player', 'bankroll': self.session.player_stack}), type('Bot', (), {'name': 'Bot', 'bankroll': self.session.bot_stack})])}")
-            
-            # Add round info to player logs
-            self.log_player_message(0, f"\nStarting Round #{round_num} with bankroll: {self.session.player_stack}\n")
-            self.log_player_message(1, f"\nStarting Round #{round_num} with bankroll: {self.session.bot_stack}\n")
-            
-        self.deck.shuffle()
-        player_cards = self.deck.deal(2)
-        bot_cards = self.deck.deal(2)
+        # Add round separator to logs (every hand, so logs split cleanly into hands)
+        round_num = self.session.hands_played + 1 if continue_session else 1
+        self.log_message("")
+        self.log_message(f"Round #{round_num}{STATUS([type('Player', (), {'name': 'Player', 'bankroll': self.session.player_stack}), type('Bot', (), {'name': 'Bot', 'bankroll': self.session.bot_stack})])}")
         
-        player_cards = [str(c) for c in player_cards]
-        bot_cards = [str(c) for c in bot_cards]
+        # Add round info to player logs
+        self.log_player_message(0, f"\nStarting Round #{round_num} with bankroll: {self.session.player_stack}\n")
+        self.log_player_message(1, f"\nStarting Round #{round_num} with bankroll: {self.session.bot_stack}\n")
+        
+        # Every hand takes the next deck of the session's sequence (never reused,
+        # even for a hand that was restarted), so any hand can be replayed
+        self.deck_index = 0 if self.deck_index is None else self.deck_index + 1
+        cards = self.deck_source.deck(self.deck_index)
+        player_cards = cards[0:2]
+        bot_cards = cards[2:4]
         
         # If continuing session, use existing stacks
         if continue_session:
@@ -689,12 +734,12 @@ class PokerGameManager:
             pips=pips,
             stacks=stacks,
             hands=[player_cards, bot_cards],
-            deck=[str(c) for c in self.deck.cards],
+            deck=cards[4:],
             previous_state=None
         )
         
         # Log the initial round state
-        self.log_round_state(round_state)
+        self.hooks.hand_start(round_state)
 
         # Update session - FIX: Properly track stacks
         self.session.player_cards = player_cards
@@ -704,7 +749,7 @@ class PokerGameManager:
         self.session.bot_stack = stacks[1]     # Update bot stack
         self.session.current_street = 'preflop'
         self.session.game_state = self._serialize_game_state(round_state)
-        self.session.save()
+        self._save_session()
         
         # FIXED: Correct turn determination
         # In the engine, button tracks turn order and active = button % 2
@@ -751,38 +796,29 @@ class PokerGameManager:
         }
 
     def process_player_action(self, action_type, amount=0):
-        """Process a player's action and get the bot's response"""
-        print(f"\n=== STARTING PLAYER ACTION ===")
-        print(f"Action: {action_type}, Amount: {amount}")
-        
-        # Import action types to ensure they're available
-        from .engine import FoldAction, CallAction, CheckAction, RaiseAction
+        """
+        Process a player's action and get the bot's response
+
+        With tracing enabled the phases of the request are timed; the trace
+        is kept on self.last_trace (None otherwise).
+        """
+        self.pending_log_lines = []  # Lines of a step that failed before saving
+        with trace('make_move') as self.last_trace:
+            return self._process_player_action(action_type, amount)
+
+    def _process_player_action(self, action_type, amount):
+        logger.debug(f"Processing player action: {action_type}, amount: {amount}")
         
-        round_state = self._deserialize_game_state(self.session.game_state)
-        print(f"Round state street: {round_state.street if round_state else 'None'}")
-        print(f"Round state button: {round_state.button if round_state else 'None'}")
-        print(f"Round state pips: {round_state.pips if round_state else 'None'}")
+        with span('deserialize'):
+            round_state = self._deserialize_game_state(self.session.game_state)
         
         if round_state is None:  # Terminal state
-            print("Terminal state detected at start")
             return self._create_terminal_response()
         
-        # Store current state for tracking changes
-        initial_state = {
-            'player_stack': self.session.player_stack,
-            'bot_stack': self.session.bot_stack,
-            'pot': self.session.pot,
-            'pips': round_state.pips.copy() if hasattr(round_state, 'pips') else [0, 0],
-            'street': round_state.street if hasattr(round_state, 'street') else 0
-        }
-        print(f"Initial state: {initial_state}")
-        
         # In bot vs bot mode, get player bot's action instead of using the provided action
         if self.is_bot_vs_bot and self.player_bot:
-            print("Getting action from player bot")
-            bot_action = self.player_bot.get_action(None, round_state, 0)
-            action_name = self._action_to_string(bot_action)
-            print(f"Player bot action: {action_name}")
+            with span('player_decision'):
+                bot_action = self.player_bot.get_action(None, round_state, 0)
             
             # Update action_type and amount based on bot's action
             action_type = self._convert_action_to_string(type(bot_action))
@@ -794,66 +830,38 @@ class PokerGameManager:
         else:
             # Human player's action
             action = self._create_action(action_type, amount, round_state)
-            print(f"Human player action: {self._action_to_string(action)}")
         
         # Log the player action
-        bet_override = (round_state.pips == [0, 0])
-        self.log_action(0, action, bet_override)
+        with span('log'):
+            self.hooks.action(0, action, round_state)
         
         # Apply the action to advance the game state
-        print(f"\n=== APPLYING PLAYER ACTION ===")
-        print(f"Before proceed - Street: {round_state.street}, Pips: {round_state.pips}")
-        next_state = round_state.proceed(action)
-        print(f"After proceed - Next state type: {type(next_state).__name__}")
-        
-        if not isinstance(next_state, TerminalState):
-            print(f"After proceed - Street: {next_state.street}, Pips: {next_state.pips}")
-            print(f"After proceed - Button: {next_state.button}")
-            
-            # Check if street changed
-            if hasattr(next_state, 'street') and initial_state['street'] != next_state.street:
-                print(f"*** STREET CHANGED from {initial_state['street']} to {next_state.street} ***")
-                print(f"Board cards: {next_state.deck[:next_state.street] if next_state.street > 0 else 'None'}")
-        else:
-            print("Next state is TERMINAL")
+        with span('proceed'):
+            next_state = round_state.proceed(action)
+        if isinstance(next_state, RoundState) and next_state.street != round_state.street:
+            with span('log'):
+                self.hooks.street(next_state)
         
         # Handle bot response - use opponent_bot if in bot vs bot mode, otherwise use simple_bot
         bot_action_msg = ""
         if not isinstance(next_state, TerminalState):
-            print(f"\n=== BOT RESPONSE PHASE ===")
-            print(f"Turn calc - Button: {next_state.button}, Button % 2: {next_state.button % 2}")
-            
             dummy_game_state = None
             
             # Choose which bot to use for the opponent
             bot_to_use = self.opponent_bot if self.is_bot_vs_bot else self.simple_bot
-            print(f"Using bot: {type(bot_to_use.bot_instance).__name__}")
-            if hasattr(self.session, 'opponent_bot') and self.session.opponent_bot:
-                print(f"Opponent bot name: {self.session.opponent_bot.name}")
-            else:
-                print("Using default SimpleBot")
-            
-            print(f"Getting action from opponent bot")
-            bot_action = bot_to_use.get_action(dummy_game_state, next_state, 1)
-            print(f"Opponent bot action: {self._action_to_string(bot_action)}")
+            with span('opponent_decision'):
+                bot_action = bot_to_use.get_action(dummy_game_state, next_state, 1)
             
             # Log the bot action
-            self.log_action(1, bot_action, False)
+            with span('log'):
+                self.hooks.action(1, bot_action, next_state)
             
             previous_state = next_state
-            print(f"Before bot proceed - Street: {previous_state.street}, Pips: {previous_state.pips}")
-            next_state = next_state.proceed(bot_action)
-            print(f"After bot proceed - Next state type: {type(next_state).__name__}")
-            
-            if not isinstance(next_state, TerminalState):
-                print(f"After bot proceed - Street: {next_state.street}, Pips: {next_state.pips}")
-                print(f"After bot proceed - Button: {next_state.button}")
-                
-                # Check if street changed after bot action
-                if hasattr(next_state, 'street') and previous_state.street != next_state.street:
-                    print(f"*** STREET CHANGED AFTER BOT from {previous_state.street} to {next_state.street} ***")
-            else:
-                print("Next state is TERMINAL after bot action")
+            with span('proceed'):
+                next_state = next_state.proceed(bot_action)
+            if isinstance(next_state, RoundState) and next_state.street != previous_state.street:
+                with span('log'):
+                    self.hooks.street(next_state)
             
             # Create appropriate message based on game mode
             if self.is_bot_vs_bot:
@@ -863,24 +871,24 @@ class PokerGameManager:
                 bot_action_msg = f"Bot {self._action_to_string(bot_action)}"
         else:
             bot_action_msg = "Hand complete!"
-            print("Hand complete after player action")
         
         # Update session from round state - FIX: Properly update stacks and pot
-        print(f"\n=== UPDATING SESSION ===")
-        self._update_session_from_round_state(next_state)
+        with span('session_update'):
+            self._update_session_from_round_state(next_state)
         
         # FIXED: Determine whose turn it is next
         if isinstance(next_state, TerminalState):
             # Log terminal state for showdown info
-            self.log_terminal_state(next_state)
+            with span('log'):
+                self.hooks.terminal(next_state)
+                # The hand was saved above; its result lines follow it into the log
+                self._write_pending_logs()
             
             # Check if we need showdown (both players didn't fold)
-            is_showdown = (next_state.previous_state and 
-                          FoldAction not in next_state.previous_state.legal_actions())
+            is_showdown = went_to_showdown(next_state)
             
             is_player_turn = False  # No one's turn, hand is complete
             current_player = None
-            print("Terminal state - no player turn")
             
             # Determine winner
             if next_state.deltas[0] > 0:
@@ -890,9 +898,8 @@ class PokerGameManager:
             else:
                 winner = 'tie'
                 
-            # Update hands played count
-            self.session.hands_played += 1
-            self.session.save()
+            HANDS_PLAYED.inc(mode='bot' if self.is_bot_vs_bot else 'human')
+            self.record_hand_history(next_state)
         else:
             # Correct turn logic for heads-up poker
             if next_state.street == 0:  # Preflop
@@ -903,51 +910,40 @@ class PokerGameManager:
                 is_player_turn = (next_state.button % 2) != 0
             
             current_player = 'player' if is_player_turn else 'bot'
-            print(f"\n=== TURN DETERMINATION ===")
-            print(f"Street: {next_state.street} ({'preflop' if next_state.street == 0 else 'post-flop'})")
-            print(f"Button: {next_state.button}, Button % 2: {next_state.button % 2}")
-            print(f"Is player turn: {is_player_turn}, Current player: {current_player}")
             is_showdown = False
             winner = None
         
-        # Get betting information for ongoing hands
-        if not isinstance(next_state, TerminalState):
-            current_bet, call_amount, min_raise = self._get_current_bet_info(next_state)
-            print(f"Betting info - Current bet: {current_bet}, Call amount: {call_amount}, Min raise: {min_raise}")
-        else:
-            current_bet, call_amount, min_raise = 0, 0, 0
-        
-        print(f"\n=== RESPONSE PREPARATION ===")
-        print(f"Hand complete: {isinstance(next_state, TerminalState)}")
-        print(f"Is player turn: {is_player_turn}")
-        print(f"Final street: {getattr(next_state, 'street', 'terminal')}")
-        
-        # Prepare response data
-        response_data = {
-            'pot': self.session.pot,
-            'player_stack': self.session.player_stack,
-            'bot_stack': self.session.bot_stack,
-            'player_cards': self.convert_cards_to_display(self.session.player_cards),
-            'board_cards': self.convert_cards_to_display(self.session.board_cards),
-            'current_bet': current_bet,
-            'call_amount': call_amount,
-            'min_raise': min_raise,
-            'player_current_bet': next_state.pips[0] if not isinstance(next_state, TerminalState) else 0,
-            'legal_actions': [] if self.is_bot_vs_bot else self._get_legal_actions(next_state) if is_player_turn else [],
-            'hand_complete': isinstance(next_state, TerminalState),
-            'game_message': self._get_game_message(next_state, bot_action_msg),
-            'is_bot_vs_bot': self.is_bot_vs_bot,
-            'current_player': current_player,
-            'is_player_turn': is_player_turn,
-            'hands_played': self.session.hands_played if self.is_bot_vs_bot else 0,
-            'hands_to_play': self.session.hands_to_play if self.is_bot_vs_bot else 0,
-            'game_complete': self.session.hands_played >= self.session.hands_to_play if self.is_bot_vs_bot else False,
-            'showdown': isinstance(next_state, TerminalState) and is_showdown,
-            'showdown_cards': self._get_showdown_cards(next_state) if isinstance(next_state, TerminalState) and is_showdown else {},
-            'winner': winner if isinstance(next_state, TerminalState) else None
-        }
-        
-        print(f"=== END PLAYER ACTION ===\n")
+        with span('response'):
+            # Get betting information for ongoing hands
+            if not isinstance(next_state, TerminalState):
+                current_bet, call_amount, min_raise = self._get_current_bet_info(next_state)
+            else:
+                current_bet, call_amount, min_raise = 0, 0, 0
+            
+            # Prepare response data
+            response_data = {
+                'pot': self.session.pot,
+                'player_stack': self.session.player_stack,
+                'bot_stack': self.session.bot_stack,
+                'player_cards': self.convert_cards_to_display(self.session.player_cards),
+                'board_cards': self.convert_cards_to_display(self.session.board_cards),
+                'current_bet': current_bet,
+                'call_amount': call_amount,
+                'min_raise': min_raise,
+                'player_current_bet': next_state.pips[0] if not isinstance(next_state, TerminalState) else 0,
+                'legal_actions': [] if self.is_bot_vs_bot else self._get_legal_actions(next_state) if is_player_turn else [],
+                'hand_complete': isinstance(next_state, TerminalState),
+                'game_message': self._get_game_message(next_state, bot_action_msg),
+                'is_bot_vs_bot': self.is_bot_vs_bot,
+                'current_player': current_player,
+                'is_player_turn': is_player_turn,
+                'hands_played': self.session.hands_played if self.is_bot_vs_bot else 0,
+                'hands_to_play': self.session.hands_to_play if self.is_bot_vs_bot else 0,
+                'game_complete': self.session.hands_played >= self.session.hands_to_play if self.is_bot_vs_bot else False,
+                'showdown': isinstance(next_state, TerminalState) and is_showdown,
+                'showdown_cards': self._get_showdown_cards(next_state) if isinstance(next_state, TerminalState) and is_showdown else {},
+                'winner': winner if isinstance(next_state, TerminalState) else None
+            }
         
         return response_data
     
@@ -967,23 +963,41 @@ class PokerGameManager:
             # Get remaining stack
             remaining_stack = self.session.player_stack
             if remaining_stack > 0:
-                # Add coins back to player's account
-                self.player.add_coins(remaining_stack)
-                
-                # Update session
-                self.session.current_coins = 0
-                self.session.player_stack = 0
-                self.session.save()
+                # Clear the session first so a concurrent cashout loses the
+                # version check instead of crediting the same stack twice
+                with transaction.atomic():
+                    self.session.current_coins = 0
+                    self.session.player_stack = 0
+                    self._save_session()
+
+                    # Add coins back to player's account
+                    self.player.add_coins(remaining_stack)
                 
                 # Save logs before exiting
                 self.save_logs()
+                self.record_match_result()
+                self.archive_logs()
                 
                 return remaining_stack
+            self.record_match_result()
+            self.archive_logs()
             return 0
         except Exception as e:
             logger.error(f"Error in process_exit_game: {str(e)}")
             raise e
 
+    def record_match_result(self):
+        """Update leaderboard ratings with the result of the finished session"""
+        from leaderboard.ratings import record_session_result
+
+        try:
+            self.flush_hand_history()
+            return record_session_result(self.session)
+        except Exception as e:
+            # Ratings are derived data; never fail the game over them
+            logger.error(f"Error recording match result for session {self.session.session_id}: {str(e)}")
+            return None
+
     # Keep all other methods unchanged
     def _convert_action_to_string(self, action_type):
         """Convert action class to string representation"""
@@ -1013,7 +1027,7 @@ class PokerGameManager:
             self.player.remove_coins(self.buy_in_amount)
             self.player.save()
             self.session.current_coins = self.buy_in_amount
-            self.session.save()
+            self._save_session()
             return True, "Buy-in successful"
         except ValueError as e:
             return False, str(e)
@@ -1111,6 +1125,9 @@ class PokerGameManager:
                 street = round_state.previous_state.street
                 visible_cards = round_state.previous_state.deck[:street]
                 self.session.board_cards = visible_cards
+
+            # Counted in the same save as the result, so a hand commits in one version check
+            self.session.hands_played += 1
         else:
             # Update stacks from current round state
             self.session.player_stack = round_state.stacks[0]
@@ -1130,7 +1147,8 @@ class PokerGameManager:
             self.session.current_street = street_names.get(round_state.street, self.session.current_street)
         
         self.session.game_state = self._serialize_game_state(round_state)
-        self.session.save()
+        with span('db_save'):
+            self._save_session()
             
     def _is_hand_complete(self, round_state):
         """Check if the hand is complete"""
@@ -1168,6 +1186,9 @@ class PokerGameManager:
                 'terminal': True,
                 'deltas': round_state.deltas if hasattr(round_state, 'deltas') else None,
                 'button': round_state.previous_state.button if round_state.previous_state else 0,
+                'actions': self.hand_actions,
+                'deck_seed': self.deck_seed,
+                'deck_index': self.deck_index,
             }
         return {
             'terminal': False,
@@ -1178,6 +1199,9 @@ class PokerGameManager:
             'stacks': round_state.stacks,
             'hands': [[str(c) for c in h] for h in round_state.hands],
             'deck': [str(c) for c in round_state.deck],
+            'actions': self.hand_actions,
+            'deck_seed': self.deck_seed,
+            'deck_index': self.deck_index,
         }
 
     def _deserialize_game_state(self, state_dict):
@@ -1198,9 +1222,6 @@ class PokerGameManager:
             )
         except Exception as e:
             logger.error(f"Error deserializing game state: {str(e)}")
-            # Create a fresh deck and start over if there's an error
-            self.deck = eval7.Deck()
-            self.deck.shuffle()
             return None
 
     def _create_terminal_response(self):
@@ -1234,6 +1255,7 @@ class BotGameSimulator(threading.Thread):
     """
     Thread class for running bot vs bot simulations in the background
     """
+    step_delay = 0.05  # Seconds slept between steps
     
     def __init__(self, session_id):
         """Initialize the simulator with a session ID"""
@@ -1242,6 +1264,7 @@ class BotGameSimulator(threading.Thread):
         self.stop_event = threading.Event()
         self.hands_played = 0
         self.error = None
+        self.sequential_test = None
         
         # Import action types once at init time
         from .engine import FoldAction, CallAction, CheckAction, RaiseAction
@@ -1256,7 +1279,7 @@ class BotGameSimulator(threading.Thread):
     
     def run(self):
         """Main thread execution - runs the bot vs bot game"""
-        from .models import GameSession
+        from .models import GameSession, GameSessionConflict
         # Import action types to ensure they are available
         from .engine import FoldAction, CallAction, CheckAction, RaiseAction
         
@@ -1269,6 +1292,8 @@ class BotGameSimulator(threading.Thread):
         builtins.RaiseAction = RaiseAction
         
         logger.info(f"Starting bot game simulation for session {self.session_id}")
+        game_manager = None
+        memory_report = MemoryReport().start() if memory_report_enabled() else None
         
         try:
             # Close the connection to avoid issues with connection sharing
@@ -1281,12 +1306,16 @@ class BotGameSimulator(threading.Thread):
             
             # Initialize game manager
             game_manager = PokerGameManager(session)
+            game_manager.hand_history_batch_size = HAND_HISTORY_BATCH_SIZE
             
             # Get total hands to play
             hands_to_play = session.hands_to_play
             hands_played = session.hands_played
             
             logger.info(f"Bot game: starting with {hands_played}/{hands_to_play} hands played")
+
+            if session.early_stopping:
+                self.sequential_test = SequentialTest(session.early_stopping, hands_to_play=hands_to_play)
             
             # Start a new hand if needed
             if hands_played == 0 or session.pot == 0:
@@ -1309,6 +1338,10 @@ class BotGameSimulator(threading.Thread):
                         self.hands_played = hands_played
                         
                         logger.info(f"Bot game: completed hand {hands_played}/{hands_to_play}")
+
+                        if self.sequential_test is not None and self.sequential_test.add(game_manager.last_hand_delta):
+                            logger.info(f"Bot game decided early after {hands_played} hands: {self.sequential_test.report()}")
+                            break
                         
                         # Check if we've played all hands
                         if hands_played >= hands_to_play:
@@ -1317,7 +1350,14 @@ class BotGameSimulator(threading.Thread):
                         
                         # Start a new hand
                         game_manager.start_new_hand(continue_session=True)
+                except GameSessionConflict:
+                    # Another worker advanced the session; pick up its state and keep going
+                    logger.warning(f"Bot game: session {self.session_id} changed concurrently, reloading")
+                    session.refresh_from_db()
+                    hands_played = session.hands_played
+                    self.hands_played = hands_played
                 except Exception as step_error:
+                    SIMULATION_STEP_ERRORS.inc()
                     logger.error(f"Error in game step: {str(step_error)}")
                     logger.error(traceback.format_exc())
                     # Continue to next hand if possible
@@ -1334,7 +1374,7 @@ class BotGameSimulator(threading.Thread):
                         break
                 
                 # Small sleep to avoid thrashing the database
-                time.sleep(0.05)
+                time.sleep(self.step_delay)
                 
                 # Check if we should stop
                 if self.stop_event.is_set():
@@ -1346,6 +1386,12 @@ class BotGameSimulator(threading.Thread):
             # Update session when done
             session = GameSession.objects.get(session_id=self.session_id)
             session.simulation_running = False
+            report = self.sequential_test.report() if self.sequential_test is not None else {}
+            if memory_report is not None:
+                report['memory'] = memory_report.stop()
+                report['memory']['loaded_bots'] = loaded_bot_count()
+            if report:
+                session.simulation_report = report
             session.save()
             
         except Exception as e:
@@ -1362,6 +1408,25 @@ class BotGameSimulator(threading.Thread):
                 pass
                 
         finally:
+            # Write out any hands still waiting for a bulk insert and sync logs
+            if game_manager is not None:
+                game_manager.flush_hand_history()
+                game_manager.save_logs()
+                game_manager.save_bot_profiles()
+                game_manager.release_bots()
+                # Only a match played to the end (or decided early) counts towards the leaderboard
+                decided = self.sequential_test is not None and self.sequential_test.decided
+                completed = game_manager.session.hands_played >= game_manager.session.hands_to_play
+                if self.error is None and (decided or completed):
+                    game_manager.record_match_result()
+                    game_manager.archive_logs()
+                if self.error is None:
+                    SIMULATIONS.inc(outcome='decided' if decided else 'completed' if completed else 'stopped')
+            if self.error is not None:
+                SIMULATIONS.inc(outcome='error')
+            if memory_report is not None:
+                memory_report.stop()  # No-op unless the simulation failed before reporting
+
             # Remove this simulation from the running dict
             if self.session_id in RUNNING_SIMULATIONS:
                 del RUNNING_SIMULATIONS[self.session_id]
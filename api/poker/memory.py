@@ -0,0 +1,88 @@
+"""
+Memory reports for bot simulations.
+
+With the POKER_MEMORY_REPORT setting on, a simulation runs under tracemalloc
+and stores the allocation growth it saw (grouped by file), its peak, and how
+sys.modules and sys.path changed in its report. tracemalloc is process-wide:
+simulations running at the same time see each other's allocations, and
+tracing slows Python code down noticeably, so this is meant for diagnosing
+leaks rather than for normal operation.
+"""
+import sys
+import threading
+import tracemalloc
+
+from django.conf import settings
+
+TOP_ALLOCATIONS = 10
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>', '<unknown>')
+
+_lock = threading.Lock()
+_active = 0  # Reports currently running
+_started = False  # Whether tracemalloc was started by a report, and so is stopped by the last one
+
+
+def memory_report_enabled():
+    return getattr(settings, 'POKER_MEMORY_REPORT', False)
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, filename) for filename in IGNORED_FILES]
+    )
+
+
+class MemoryReport:
+    """
+    Memory growth between start() and stop()
+    """
+    def __init__(self, limit=TOP_ALLOCATIONS):
+        self.limit = limit
+        self.snapshot = None
+        self.modules = 0
+        self.path = 0
+
+    def start(self):
+        global _active, _started
+        with _lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started = True
+            elif _active == 0:
+                tracemalloc.reset_peak()
+            _active += 1
+        self.snapshot = _snapshot()
+        self.modules = len(sys.modules)
+        self.path = len(sys.path)
+        return self
+
+    def stop(self):
+        """
+        Returns:
+            The report as a JSON-serializable dict, or None if it isn't running
+        """
+        global _active, _started
+        if self.snapshot is None:
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        top = _snapshot().compare_to(self.snapshot, 'filename')[:self.limit]
+        self.snapshot = None
+        with _lock:
+            _active -= 1
+            if _started and _active == 0:
+                tracemalloc.stop()
+                _started = False
+        return {
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'top_growth': [
+                {
+                    'file': str(stat.traceback[0].filename),
+                    'size_diff_bytes': stat.size_diff,
+                    'count_diff': stat.count_diff,
+                }
+                for stat in top
+            ],
+            'sys_modules': {'before': self.modules, 'after': len(sys.modules)},
+            'sys_path': {'before': self.path, 'after': len(sys.path)},
+        }
@@ -0,0 +1,195 @@
+"""
+Process-wide metrics registry.
+
+Counters, gauges and histograms are registered once at import time and
+rendered in the Prometheus text exposition format by the metrics view.
+Values live in the memory of the process that recorded them, so every web
+worker or league node is scraped separately.
+
+    HANDS = counter('poker_hands_total', 'Hands played', ['mode'])
+    HANDS.inc(mode='bot')
+"""
+import math
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: a named family of samples keyed by label values"""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """Yields (suffix, label text, value)"""
+        with self.lock:
+            items = sorted(self.values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        for key, value in items:
+            yield '', _format_labels(self.labelnames, key), value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down, or is read from a function at scrape time
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.function is not None:
+            yield '', '', self.function()
+            return
+        yield from super().samples()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield '_bucket', _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"'), cumulative
+            yield '_sum', _format_labels(self.labelnames, key), total
+            yield '_count', _format_labels(self.labelnames, key), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text format"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=(), function=None):
+    return REGISTRY.register(Gauge(name, documentation, labelnames, function))
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Game metrics
+HANDS_PLAYED = counter('poker_hands_total', 'Hands played to completion', ['mode'])
+DB_WRITES = counter('poker_db_writes_total', 'Database writes made by the game manager', ['kind'])
+LOG_BYTES = counter('poker_log_bytes_total', 'Bytes appended to game and player logs', ['log'])
+
+# Bot metrics
+BOT_DECISION_SECONDS = histogram('poker_bot_decision_seconds', 'Time taken by BotInterface.get_action', ['bot'])
+BOT_ERRORS = counter('poker_bot_errors_total', 'Bot get_action calls that raised', ['bot'])
+BOT_LOADS = counter('poker_bot_loads_total', 'Bots loaded by BotInterface', ['result'])
+
+# Simulator metrics
+SIMULATIONS = counter('poker_simulations_total', 'Bot vs bot simulations finished', ['outcome'])
+SIMULATION_STEP_ERRORS = counter('poker_simulation_step_errors_total', 'Simulation steps that raised')
+
+# Sandbox metrics
+SANDBOX_RUNS = counter('poker_sandbox_runs_total', 'User code runs in the sandbox', ['result'])
+SANDBOX_CACHE = counter('poker_sandbox_cache_total', 'Result cache lookups for deterministic sandbox runs', ['result'])
+SANDBOX_SECONDS = histogram(
+    'poker_sandbox_run_seconds', 'Time taken by sandbox runs, including waiting for a worker',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+# User file metrics
+USER_FILE_CACHE = counter('poker_user_file_cache_total', 'Loads of user files answered from the local disk copy', ['result'])
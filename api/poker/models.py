@@ -3,6 +3,14 @@ import uuid
 from django.core.exceptions import ValidationError
 from users.models import CustomUser
 
+
+class GameSessionConflict(Exception):
+    """Raised when a GameSession was modified by another request since it was loaded"""
+    def __init__(self, session_id, expected_version):
+        self.session_id = session_id
+        self.expected_version = expected_version
+        super().__init__(f"Game session {session_id} was modified concurrently (expected version {expected_version})")
+
 class BotRepository(models.Model):
     """Model for storing bot information and metadata"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
@@ -121,10 +129,46 @@ class GameSession(models.Model):
     bot_initial_stack = models.IntegerField(default=0)
     player_max_rebuys = models.IntegerField(default=0)
     simulation_running = models.BooleanField(default=False)
+    early_stopping = models.CharField(max_length=8, blank=True, default='')  # '', 'sprt' or 'bound'
+    simulation_report = models.JSONField(default=dict, blank=True)  # Early stopping outcome
+    profile_bots = models.BooleanField(default=False)  # Run bot decisions under cProfile
+
+    # Optimistic concurrency: bumped on every save, compared before writing
+    version = models.PositiveIntegerField(default=0)
 
     class Meta:
         db_table = 'game_sessions'
-    
+
+    def save(self, *args, **kwargs):
+        """
+        Save the session with a compare-and-swap on ``version``.
+
+        New rows are inserted normally. Existing rows are only updated if the
+        stored version still matches the one this instance was loaded with,
+        otherwise GameSessionConflict is raised and nothing is written.
+        """
+        if self._state.adding or kwargs.get('force_insert'):
+            return super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        values = {}
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.name == 'version':
+                continue
+            if update_fields is not None and field.name not in update_fields:
+                continue
+            values[field.attname] = field.pre_save(self, add=False)
+
+        expected_version = self.version
+        updated = GameSession.objects.filter(
+            pk=self.pk,
+            version=expected_version
+        ).update(version=expected_version + 1, **values)
+
+        if not updated:
+            raise GameSessionConflict(self.pk, expected_version)
+        self.version = expected_version + 1
+
     def __str__(self):
         if self.play_mode == 'human':
             return f"Human session: {self.player.username} vs Bot"
@@ -134,6 +178,140 @@ class GameSession(models.Model):
             return f"Bot session: {p_bot} vs {o_bot}"
 
 
+class HandHistory(models.Model):
+    """
+    One completed hand of a game session.
+
+    Actions are stored as a compact string: streets are separated by '/', and
+    each action is the seat letter ('a' for the player or player bot, 'b' for
+    the opponent) followed by the engine code (F, C, K or R<amount>),
+    e.g. 'aCbK/bKaR6bC/bKaK/bR20aF'.
+    """
+    STREETS = (
+        ('preflop', 'Preflop'),
+        ('flop', 'Flop'),
+        ('turn', 'Turn'),
+        ('river', 'River'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='hands')
+    hand_no = models.PositiveIntegerField()
+
+    # Denormalized from the session so per-bot queries don't need a join
+    player_bot = models.ForeignKey(
+        BotRepository,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='player_hands'
+    )
+    opponent_bot = models.ForeignKey(
+        BotRepository,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='opponent_hands'
+    )
+
+    player_cards = models.CharField(max_length=4)
+    opponent_cards = models.CharField(max_length=4)
+    board_cards = models.CharField(max_length=10, blank=True)
+    actions = models.CharField(max_length=512, blank=True)
+
+    player_delta = models.IntegerField()
+    opponent_delta = models.IntegerField()
+    pot = models.IntegerField(default=0)
+    street_reached = models.CharField(max_length=7, choices=STREETS, default='preflop')
+    showdown = models.BooleanField(default=False)
+
+    # The deck is decks.replay_deck(deck_seed, deck_index, decks.SESSION_DECK_BLOCK_SIZE)
+    deck_seed = models.BigIntegerField(null=True, blank=True)
+    deck_index = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'hand_history'
+        ordering = ['session', 'hand_no']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['session', 'hand_no'],
+                name='unique_hand_no_per_session'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['player_bot', 'created_at'], name='hand_hist_player_bot_idx'),
+            models.Index(fields=['opponent_bot', 'created_at'], name='hand_hist_opp_bot_idx'),
+        ]
+
+    def __str__(self):
+        return f"Hand #{self.hand_no} of session {self.session_id}"
+
+
+class HudStats(models.Model):
+    """
+    Running HUD counters for one player against one opponent.
+
+    Players are identified by key: 'bot:<uuid>' for a bot, 'user:<id>' for a
+    human seat and 'house' for the default SimpleBot. Counters are only ever
+    incremented, one completed hand at a time.
+    """
+    subject = models.CharField(max_length=64)
+    opponent = models.CharField(max_length=64)
+
+    hands = models.PositiveIntegerField(default=0)
+    vpip = models.PositiveIntegerField(default=0)  # Hands with a voluntary preflop call or raise
+    pfr = models.PositiveIntegerField(default=0)  # Hands with a preflop raise
+    three_bet_chances = models.PositiveIntegerField(default=0)  # Faced a preflop open raise
+    three_bets = models.PositiveIntegerField(default=0)
+    postflop_aggressive = models.PositiveIntegerField(default=0)  # Postflop bets and raises
+    postflop_calls = models.PositiveIntegerField(default=0)
+    saw_flop = models.PositiveIntegerField(default=0)
+    showdowns = models.PositiveIntegerField(default=0)
+    showdown_wins = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'hud_stats'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['subject', 'opponent'],
+                name='unique_hud_stats_pair'
+            )
+        ]
+
+    def __str__(self):
+        return f"HUD {self.subject} vs {self.opponent} ({self.hands} hands)"
+
+
+class BotProfile(models.Model):
+    """
+    cProfile data of one bot version, aggregated over every profiled match.
+
+    The version is the bot's updated_at when the matches were played; stats
+    holds the marshalled pstats dictionary (the .pstats file format).
+    """
+    bot = models.ForeignKey(BotRepository, on_delete=models.CASCADE, related_name='profiles')
+    bot_version = models.DateTimeField()
+    decisions = models.PositiveIntegerField(default=0)
+    total_time = models.FloatField(default=0)  # Seconds spent inside the bot's decisions
+    stats = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'bot_profiles'
+        ordering = ['-updated_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bot', 'bot_version'],
+                name='unique_profile_per_bot_version'
+            )
+        ]
+
+    def __str__(self):
+        return f"Profile of {self.bot.name} ({self.bot_version:%Y-%m-%d %H:%M}, {self.decisions} decisions)"
+
+
 class UserCode(models.Model):
     """User-saved code snippets"""
     user = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE)
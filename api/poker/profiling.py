@@ -0,0 +1,195 @@
+"""
+Opt-in profiling of bot decisions.
+
+When a match is started with profiling, BotInterface runs every get_action
+call of the bot under cProfile. At the end of the match the profile is merged
+into the BotProfile row of the bot's current version (BotRepository.updated_at),
+so repeated matches build up one aggregate per version. Aggregates can be
+downloaded as a pstats file or as collapsed stacks for flamegraph tools.
+"""
+import os
+import io
+import marshal
+import pstats
+import cProfile
+from collections import defaultdict
+
+from django.db import transaction
+
+BOT_FILE_PREFIX = 'bot'  # Bot source files are stored relative to the bot directory
+MIN_STACK_SECONDS = 1e-6  # Paths carrying less time are left out of collapsed stacks
+MAX_STACK_DEPTH = 64
+
+
+class BotProfiler:
+    """
+    cProfile for the decisions of one bot
+
+    Only the calls made through run() are profiled, so the rest of the match
+    (engine, logging, database) stays out of the bot's profile.
+    """
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.decisions = 0
+        self.skipped = 0
+
+    def run(self, function, *args):
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Another profiler is active in this thread; don't profile this call
+            self.skipped += 1
+            return function(*args)
+        try:
+            return function(*args)
+        finally:
+            self.profile.disable()
+            self.decisions += 1
+
+    def stats(self, bot_dir=None):
+        """pstats.Stats of the calls profiled so far, bot files relative to bot_dir"""
+        stats = pstats.Stats(self.profile)
+        if bot_dir:
+            stats.stats = _relabel(stats.stats, bot_dir)
+        return stats
+
+
+def _relabel_function(function, bot_dir):
+    filename, line, name = function
+    if filename.startswith(bot_dir + os.sep):
+        filename = os.path.join(BOT_FILE_PREFIX, os.path.relpath(filename, bot_dir))
+    return filename, line, name
+
+
+def _relabel(entries, bot_dir):
+    """
+    Make bot file names independent of where the bot was extracted
+
+    Bots from zips are unpacked to a new temporary directory on every load,
+    which would otherwise split one function into many entries.
+    """
+    relabeled = {}
+    for function, (cc, nc, tt, ct, callers) in entries.items():
+        callers = {_relabel_function(caller, bot_dir): edge for caller, edge in callers.items()}
+        relabeled[_relabel_function(function, bot_dir)] = (cc, nc, tt, ct, callers)
+    return relabeled
+
+
+class _StoredStats:
+    """Adapter letting pstats.Stats load a stats dict kept in the database"""
+    def __init__(self, data):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
+
+
+def load_stats(data):
+    """pstats.Stats from the bytes stored in BotProfile.stats"""
+    return pstats.Stats(_StoredStats(bytes(data)))
+
+
+def dump_stats(stats):
+    """
+    Serialize stats in the format of pstats.Stats.dump_stats
+
+    The result can be saved as a .pstats file and opened with pstats,
+    snakeviz and similar tools.
+    """
+    return marshal.dumps(stats.stats)
+
+
+def total_time(stats):
+    return sum(entry[2] for entry in stats.stats.values())
+
+
+def save_bot_profile(bot_repository, stats, decisions):
+    """
+    Merge a match's stats into the aggregate profile of the bot's current version
+
+    Returns:
+        The updated BotProfile
+    """
+    from .models import BotProfile
+
+    with transaction.atomic():
+        profile, _ = BotProfile.objects.select_for_update().get_or_create(
+            bot=bot_repository,
+            bot_version=bot_repository.updated_at,
+            defaults={'stats': b''}
+        )
+        if profile.decisions:
+            merged = load_stats(profile.stats)
+            merged.add(stats)
+        else:
+            merged = stats
+        profile.stats = dump_stats(merged)
+        profile.decisions += decisions
+        profile.total_time = total_time(merged)
+        profile.save()
+    return profile
+
+
+def _frame_label(function):
+    filename, line, name = function
+    if filename == '~':  # Built-in
+        label = name
+    else:
+        label = f'{filename}:{line}({name})'
+    return label.replace(';', ',')
+
+
+def collapsed_stacks(stats):
+    """
+    Collapsed-stack text for flamegraph.pl, speedscope and similar tools
+
+    One ``frame;frame;frame <microseconds>`` line per stack. cProfile only
+    records caller -> callee edges, not whole stacks, so a function's time is
+    split between the paths leading to it in proportion to the time it spent
+    under each caller.
+    """
+    entries = stats.stats
+    callees = defaultdict(dict)
+    for function, (cc, nc, tt, ct, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees[caller][function] = edge[3]  # Cumulative time under this caller
+
+    weights = defaultdict(float)
+
+    def walk(function, stack, on_stack, share):
+        cc, nc, tt, ct, callers = entries[function]
+        stack = stack + (_frame_label(function),)
+        if tt * share > 0:
+            weights[stack] += tt * share
+        if len(stack) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_time in callees[function].items():
+            callee_time = entries[callee][3] if callee in entries else 0
+            if callee in on_stack or callee_time <= 0 or edge_time * share < MIN_STACK_SECONDS:
+                continue
+            walk(callee, stack, on_stack | {callee}, share * edge_time / callee_time)
+
+    for function, entry in entries.items():
+        if not entry[4]:  # No callers: an entry point of the profiled calls
+            walk(function, (), frozenset([function]), 1.0)
+
+    output = io.StringIO()
+    for stack, seconds in sorted(weights.items()):
+        microseconds = int(round(seconds * 1e6))
+        if microseconds:
+            output.write(f"{';'.join(stack)} {microseconds}\n")
+    return output.getvalue()
+
+
+def top_functions(stats, limit=20):
+    """The functions with the most cumulative time, for a JSON summary"""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            'function': _frame_label(function),
+            'calls': nc,
+            'total_time': round(tt, 6),
+            'cumulative_time': round(ct, 6),
+        }
+        for function, (cc, nc, tt, ct, callers) in rows
+    ]
@@ -0,0 +1,48 @@
+"""
+Reference opponents for testing bots.
+
+Plain bots with fixed, easy to reason about strategies. They only use the
+engine, so they also run inside the sandbox.
+"""
+from .engine import FoldAction, CallAction, CheckAction, RaiseAction
+
+
+class PassiveBot:
+    """Checks when possible, otherwise calls"""
+    def get_action(self, game_state, round_state, active):
+        legal_actions = round_state.legal_actions()
+        if CheckAction in legal_actions:
+            return CheckAction()
+        return CallAction()
+
+
+class AggressiveBot:
+    """Makes the minimum raise whenever it can, otherwise calls"""
+    def get_action(self, game_state, round_state, active):
+        legal_actions = round_state.legal_actions()
+        if RaiseAction in legal_actions:
+            min_raise, max_raise = round_state.raise_bounds()
+            return RaiseAction(min_raise)
+        if CallAction in legal_actions:
+            return CallAction()
+        return CheckAction()
+
+
+class TightBot:
+    """Checks when possible; only calls with a pocket pair or an ace or king"""
+    def get_action(self, game_state, round_state, active):
+        legal_actions = round_state.legal_actions()
+        if CheckAction in legal_actions:
+            return CheckAction()
+        ranks = [card[0] for card in round_state.hands[active]]
+        if ranks[0] == ranks[1] or 'A' in ranks or 'K' in ranks:
+            return CallAction()
+        return FoldAction()
+
+
+# Test scenario name -> opponent
+REFERENCE_BOTS = {
+    'basic': PassiveBot,
+    'aggressive': AggressiveBot,
+    'conservative': TightBot,
+}
@@ -0,0 +1,74 @@
+"""
+Cache of sandbox run results.
+
+A run whose output only depends on its input (the code, the game state and
+a seed) gives the same result every time, so repeated runs of the same code
+can be answered from memory instead of the sandbox. Entries are keyed by a
+hash of the run's input and the sandbox runtime, expire after a TTL, and the
+least recently used ones are evicted once the cache holds too many entries
+or too many bytes of output. Each web process has its own cache.
+"""
+import time
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+_Entry = namedtuple('_Entry', ['value', 'size', 'expires'])
+
+
+def cache_key(*parts):
+    """Hash of the parts of a run's input"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode('utf-8') if isinstance(part, str) else repr(part).encode('utf-8')
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache with a TTL, bounded by entry count and total size
+    """
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """The cached value, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry.value
+
+    def set(self, key, value, size):
+        """Cache a value taking ``size`` bytes; values larger than the cache are not kept"""
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = _Entry(value, size, time.monotonic() + self.ttl)
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        self.size -= self.entries.pop(key).size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,435 @@
+"""
+Pool of warm Python interpreters for running user code.
+
+Starting python3 and importing eval7 for every IDE command costs far more
+than running the command. Instead each web process keeps up to
+POKER_SANDBOX_POOL_SIZE worker processes (see sandbox_worker.py) that have
+eval7, the bot skeleton and the engine imported already; a job runs in a
+child forked from a worker, so no state carries over between runs.
+
+    result = run_python(source, timeout=5)
+    result.stdout, result.stderr, result.timed_out
+
+    for name, data in stream_python(source, timeout=5):
+        ...  # ('stdout', text), ('stderr', text), ..., ('result', SandboxResult)
+
+With a pool size of 0 every run starts (and then stops) its own worker,
+which behaves like the old one-interpreter-per-run approach.
+
+Each run is limited in CPU time, address space, processes and output (see
+sandbox_limits); the POKER_SANDBOX_* settings set the limits. The process
+limit is per user, so when the sandbox runs as the same user as the web
+server it counts the server's processes and threads too, and it does not
+apply to root at all; the process group kill still cleans up after a run.
+
+Deterministic runs can be answered from a result cache (see result_cache.py)
+with run_python(..., cache=True).
+"""
+import os
+import sys
+import json
+import math
+import time
+import queue
+import select
+import logging
+import threading
+import subprocess
+from collections import namedtuple
+
+from django.conf import settings
+
+from .metrics import SANDBOX_RUNS, SANDBOX_SECONDS, SANDBOX_CACHE
+from .result_cache import ResultCache, cache_key
+
+POKER_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_SCRIPT = os.path.join(POKER_DIR, 'sandbox_worker.py')
+SKELETON_PATH = os.path.join(POKER_DIR, 'example_bots', 'player_monte_carlo')
+PROJECT_PATH = os.path.dirname(POKER_DIR)  # For the engine and the bot test harness
+PRELOAD_MODULES = ('eval7', 'skeleton.actions', 'skeleton.states', 'skeleton.bot', 'poker.bot_harness')
+STARTUP_TIMEOUT = 30  # Seconds a new worker may take to import the preloaded modules
+RESPONSE_GRACE = 5  # Seconds a worker may take beyond a job's timeout before it is replaced
+READ_SIZE = 65536
+logger = logging.getLogger(__name__)
+
+SandboxResult = namedtuple('SandboxResult', [
+    'stdout',
+    'stderr',
+    'returncode',
+    'timed_out',
+    'duration',  # Seconds, as measured by the worker
+    'limit_exceeded',  # None, 'timeout', 'cpu' or 'output'
+    'resources',  # CPU seconds, peak RSS and output bytes used by the run
+    'cached',  # Whether the result came from the result cache
+], defaults=(False,))
+
+LIMIT_MESSAGES = {
+    'timeout': 'Timed out',
+    'cpu': 'CPU time limit exceeded',
+    'output': 'Output limit exceeded, output truncated',
+}
+
+
+def sandbox_limits(timeout):
+    """Resource limits for a run with the given timeout"""
+    return {
+        'cpu_seconds': math.ceil(timeout),
+        'memory_bytes': getattr(settings, 'POKER_SANDBOX_MEMORY_MB', 512) * 1024 * 1024,
+        'processes': getattr(settings, 'POKER_SANDBOX_MAX_PROCESSES', 64),
+        'output_bytes': getattr(settings, 'POKER_SANDBOX_MAX_OUTPUT', 256 * 1024),
+    }
+
+
+def limit_message(result):
+    """What to tell the user about a limit the run hit, or None"""
+    return LIMIT_MESSAGES.get(result.limit_exceeded)
+
+
+class SandboxError(Exception):
+    """A worker failed (crashed, hung or couldn't start), as opposed to the code it ran"""
+
+
+class SandboxBusy(SandboxError):
+    """No worker became free in time"""
+
+
+class SandboxWorker:
+    """
+    One worker process and the line-based JSON protocol to it
+    """
+    def __init__(self, python, paths=(), preload=()):
+        command = [python, WORKER_SCRIPT]
+        for path in paths:
+            command += ['--path', path]
+        for name in preload:
+            command += ['--preload', name]
+        # A fixed hash seed keeps set and dict ordering, and so output, the same across workers
+        env = dict(os.environ, PYTHONHASHSEED='0')
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+        self.buffer = b''
+        try:
+            ready = self._receive(STARTUP_TIMEOUT)
+        except SandboxError:
+            self.close()
+            raise
+        self.preloaded = ready.get('preloaded', [])
+        self.runtime = json.dumps(ready.get('runtime'), sort_keys=True)  # Interpreter and preloaded module versions
+
+    def _receive(self, timeout):
+        deadline = time.monotonic() + timeout
+        fd = self.process.stdout.fileno()
+        while b'\n' not in self.buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SandboxError("Sandbox worker did not respond")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, READ_SIZE)
+            if not chunk:
+                raise SandboxError(f"Sandbox worker exited with code {self.process.poll()}")
+            self.buffer += chunk
+        line, self.buffer = self.buffer.split(b'\n', 1)
+        return json.loads(line)
+
+    def _send(self, job):
+        try:
+            self.process.stdin.write(json.dumps(job).encode('utf-8') + b'\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise SandboxError(f"Sandbox worker is gone: {e}")
+
+    def run(self, source, timeout, limits=None):
+        self._send({'source': source, 'timeout': timeout, 'limits': limits or {}})
+        return SandboxResult(**self._receive(timeout + RESPONSE_GRACE))
+
+    def stream(self, source, timeout, limits=None):
+        """
+        Yields:
+            ('stdout' | 'stderr', text) as output arrives, then ('result', SandboxResult)
+            with empty stdout and stderr
+        """
+        self._send({'source': source, 'timeout': timeout, 'limits': limits or {}, 'stream': True})
+        deadline = time.monotonic() + timeout + RESPONSE_GRACE
+        while True:
+            message = self._receive(deadline - time.monotonic())
+            if 'stream' in message:
+                yield message['stream'], message['data']
+            else:
+                yield 'result', SandboxResult(**message)
+                return
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        """Stop the worker; closing stdin ends its job loop"""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=1)
+        except Exception:
+            self.process.kill()
+            self.process.wait()
+
+
+class SandboxPool:
+    """
+    Up to ``size`` workers, started on first use and reused across runs
+
+    A worker that fails is discarded and replaced on a later run.
+    """
+    def __init__(self, size, python=None, paths=(SKELETON_PATH, PROJECT_PATH), preload=PRELOAD_MODULES):
+        self.size = size
+        self.python = python or sys.executable
+        self.paths = tuple(paths)
+        self.preload = tuple(preload)
+        self.idle = queue.LifoQueue()
+        self.workers = 0
+        self.lock = threading.Lock()
+        self.runtime = None
+
+    def _new_worker(self):
+        worker = SandboxWorker(self.python, self.paths, self.preload)
+        self.runtime = worker.runtime
+        return worker
+
+    def runtime_version(self):
+        """Interpreter and preloaded module versions of the workers, starting one if needed"""
+        if self.runtime is None:
+            self._checkin(self._checkout(STARTUP_TIMEOUT))
+        return self.runtime
+
+    def _acquire(self, timeout):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            spawn = self.workers < self.size
+            if spawn:
+                self.workers += 1
+        if spawn:
+            try:
+                return self._new_worker()
+            except Exception:
+                with self.lock:
+                    self.workers -= 1
+                raise
+        try:
+            return self.idle.get(timeout=timeout)
+        except queue.Empty:
+            raise SandboxBusy("All sandbox workers are busy")
+
+    def _discard(self, worker):
+        worker.close()
+        with self.lock:
+            self.workers -= 1
+
+    def warm(self):
+        """Start the workers not started yet"""
+        started = []
+        while True:
+            with self.lock:
+                if self.workers >= self.size:
+                    break
+                self.workers += 1
+            try:
+                started.append(self._new_worker())
+            except Exception:
+                with self.lock:
+                    self.workers -= 1
+                raise
+        for worker in started:
+            self.idle.put(worker)
+
+    def _checkout(self, wait):
+        if self.size <= 0:
+            return self._new_worker()
+        worker = self._acquire(wait)
+        if not worker.alive():
+            self._discard(worker)
+            raise SandboxError("Sandbox worker exited")
+        return worker
+
+    def _checkin(self, worker, failed=False):
+        if self.size <= 0:
+            worker.close()
+        elif failed:
+            self._discard(worker)
+        else:
+            self.idle.put(worker)
+
+    def run(self, source, timeout, limits=None, wait=None):
+        """
+        Run Python source in a fresh child of a warm worker
+
+        Args:
+            timeout: Seconds the code may run before it is killed
+            limits: Resource limits, see sandbox_limits
+            wait: Seconds to wait for a free worker (defaults to timeout)
+
+        Returns:
+            SandboxResult
+        """
+        worker = self._checkout(timeout if wait is None else wait)
+        try:
+            result = worker.run(source, timeout, limits)
+        except Exception:
+            self._checkin(worker, failed=True)
+            raise
+        self._checkin(worker)
+        return result
+
+    def stream(self, source, timeout, limits=None, wait=None, on_result=None):
+        """
+        Like run, but the output is passed on as it arrives
+
+        The worker is taken before returning, so SandboxBusy is raised here
+        rather than while iterating.
+
+        Returns:
+            SandboxStream
+        """
+        worker = self._checkout(timeout if wait is None else wait)
+        return SandboxStream(self, worker, worker.stream(source, timeout, limits), on_result)
+
+    def close(self):
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(worker)
+
+
+class SandboxStream:
+    """
+    Iterator over a streaming run: ('stdout' | 'stderr', text) pairs, then
+    ('result', SandboxResult)
+
+    The worker goes back to the pool when the run finishes or the stream is
+    closed; a worker closed mid-run is replaced, since it is still busy.
+    Nothing is buffered here, so a slow reader slows the run down instead
+    of using memory.
+    """
+    def __init__(self, pool, worker, events, on_result=None):
+        self.pool = pool
+        self.worker = worker
+        self.events = events
+        self.on_result = on_result
+        self.finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.worker is None:
+            raise StopIteration
+        try:
+            event = next(self.events)
+        except Exception:  # Including StopIteration at the end
+            self.close()
+            raise
+        if event[0] == 'result':
+            self.finished = True
+            if self.on_result is not None:
+                self.on_result(event[1])
+        return event
+
+    def close(self):
+        if self.worker is not None:
+            worker, self.worker = self.worker, None
+            self.pool._checkin(worker, failed=not self.finished)
+
+    __del__ = close
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_result_cache = None
+
+
+def get_sandbox_pool():
+    """The sandbox pool of this process, configured from settings"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool(
+                getattr(settings, 'POKER_SANDBOX_POOL_SIZE', 2),
+                python=getattr(settings, 'POKER_SANDBOX_PYTHON', None),
+            )
+        return _pool
+
+
+def get_result_cache():
+    """The sandbox result cache of this process, configured from settings"""
+    global _result_cache
+    with _pool_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache(
+                getattr(settings, 'POKER_SANDBOX_CACHE_ENTRIES', 512),
+                getattr(settings, 'POKER_SANDBOX_CACHE_BYTES', 32 * 1024 * 1024),
+                getattr(settings, 'POKER_SANDBOX_CACHE_TTL', 3600),
+            )
+        return _result_cache
+
+
+def _record_run(result, start):
+    SANDBOX_SECONDS.observe(time.perf_counter() - start)
+    if result.limit_exceeded:
+        SANDBOX_RUNS.inc(result=result.limit_exceeded)
+    else:
+        SANDBOX_RUNS.inc(result='ok' if result.returncode == 0 else 'error')
+
+
+def run_python(source, timeout, limits=None, cache=False):
+    """
+    Run Python source in the sandbox pool, recording metrics
+
+    Args:
+        limits: Resource limits (defaults to sandbox_limits(timeout))
+        cache: The run is deterministic (e.g. seeded), so its result may be
+               served from and stored in the result cache
+
+    Returns:
+        SandboxResult
+    """
+    limits = limits or sandbox_limits(timeout)
+    pool = get_sandbox_pool()
+    key = None
+    if cache:
+        key = cache_key(source, sorted(limits.items()), pool.runtime_version())
+        result = get_result_cache().get(key)
+        SANDBOX_CACHE.inc(result='miss' if result is None else 'hit')
+        if result is not None:
+            return result
+
+    start = time.perf_counter()
+    try:
+        result = pool.run(source, timeout, limits)
+    except SandboxError:
+        SANDBOX_RUNS.inc(result='sandbox_error')
+        raise
+    _record_run(result, start)
+
+    # Timeouts and CPU limits depend on the machine's load, not just the input
+    if key is not None and result.limit_exceeded in (None, 'output'):
+        get_result_cache().set(key, result._replace(cached=True), len(result.stdout) + len(result.stderr))
+    return result
+
+
+def stream_python(source, timeout, limits=None):
+    """
+    Run Python source in the sandbox pool, passing its output on as it arrives
+
+    Returns:
+        SandboxStream
+    """
+    start = time.perf_counter()
+    try:
+        return get_sandbox_pool().stream(
+            source, timeout, limits or sandbox_limits(timeout), on_result=lambda result: _record_run(result, start)
+        )
+    except SandboxError:
+        SANDBOX_RUNS.inc(result='sandbox_error')
+        raise
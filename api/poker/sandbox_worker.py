@@ -0,0 +1,251 @@
+"""
+Sandbox worker process, started by poker.sandbox.
+
+The worker imports the preloaded modules (eval7, the skeleton, ...) once and
+then serves jobs read from stdin, one JSON object per line. Every job runs
+in a child forked from the worker, so it starts with the imports already
+done and whatever it changes (globals, sys.modules, open files) is thrown
+away with the child. Results are written to stdout as one JSON line.
+
+Jobs with "stream" set send their output as it arrives, as
+{"stream": "stdout" | "stderr", "data": ...} lines before the result,
+instead of collecting it into the result.
+
+The child gets its own process group and the job's resource limits (CPU
+seconds, address space, processes). The worker kills the whole group when
+the job times out, writes too much output, or exits leaving processes
+behind, and reports the child's resource usage with the result.
+
+This file runs outside Django and must only use the standard library.
+"""
+import os
+import sys
+import json
+import time
+import select
+import signal
+import codecs
+import argparse
+import resource
+import importlib
+import tempfile
+import traceback
+
+READ_SIZE = 65536
+POLL_INTERVAL = 0.05  # Seconds between checks whether the child has exited
+DRAIN_GRACE = 0.1  # Seconds to keep reading output left in pipes after the child exited
+LIMITS = {
+    'cpu_seconds': resource.RLIMIT_CPU,
+    'memory_bytes': resource.RLIMIT_AS,
+    'processes': resource.RLIMIT_NPROC,
+}
+
+
+def _exit_code(exit):
+    """Process exit code for a SystemExit raised by user code"""
+    if exit.code is None:
+        return 0
+    if isinstance(exit.code, int):
+        return exit.code
+    print(exit.code, file=sys.stderr)
+    return 1
+
+
+def _set_limit(name, value):
+    """Lower a resource limit; a value of 0 or None leaves it alone"""
+    if not value:
+        return
+    limit = LIMITS[name]
+    _, hard = resource.getrlimit(limit)
+    if name == 'cpu_seconds':
+        # SIGXCPU at the soft limit, SIGKILL a second later if it's caught
+        value, new_hard = int(value), int(value) + 1
+    else:
+        value, new_hard = int(value), int(value)
+    if hard != resource.RLIM_INFINITY:
+        value, new_hard = min(value, hard), min(new_hard, hard)
+    resource.setrlimit(limit, (value, new_hard))
+
+
+def _run_child(source, stdout_fd, stderr_fd, protocol_fds, limits, stream):
+    """Run a job in the forked child; never returns"""
+    code = 1
+    try:
+        os.setsid()  # Own process group, so everything the job starts can be killed together
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        for fd in protocol_fds:
+            os.close(fd)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        os.close(stdout_fd)
+        os.close(stderr_fd)
+        if stream:
+            sys.stdout.reconfigure(line_buffering=True)  # A pipe would otherwise hold back prints
+        os.chdir(tempfile.gettempdir())
+        try:
+            for name, value in limits.items():
+                _set_limit(name, value)
+            exec(compile(source, '<sandbox>', 'exec'), {'__name__': '__main__', '__builtins__': __builtins__})
+            code = 0
+        except SystemExit as exit:
+            code = _exit_code(exit)
+        except BaseException:
+            traceback.print_exc()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code)
+
+
+def _kill_group(pid):
+    """Kill a child and its process group (which it may not have created yet)"""
+    for kill in (os.killpg, os.kill):
+        try:
+            kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def _usage(rusage, output_bytes):
+    return {
+        'cpu_user_seconds': round(rusage.ru_utime, 6),
+        'cpu_system_seconds': round(rusage.ru_stime, 6),
+        'max_rss_kb': rusage.ru_maxrss,  # Includes pages inherited from the worker
+        'output_bytes': output_bytes,
+    }
+
+
+def run_job(job, protocol_fds, send):
+    """
+    Run one job in a forked child, collecting (or streaming) its output until
+    it exits or hits a limit
+    """
+    limits = job.get('limits') or {}
+    max_output = limits.pop('output_bytes', None)
+    stream = job.get('stream', False)
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    started = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        os.close(stdout_r)
+        os.close(stderr_r)
+        _run_child(job['source'], stdout_w, stderr_w, protocol_fds, limits, stream)
+    os.close(stdout_w)
+    os.close(stderr_w)
+
+    names = {stdout_r: 'stdout', stderr_r: 'stderr'}
+    output = {stdout_r: [], stderr_r: []}
+    decoders = {fd: codecs.getincrementaldecoder('utf-8')(errors='replace') for fd in names}
+    output_bytes = 0
+    open_fds = [stdout_r, stderr_r]
+    deadline = started + job['timeout']
+    exceeded = None
+    exited = False
+
+    def emit(fd, text):
+        if not text:
+            return
+        if stream:
+            send({'stream': names[fd], 'data': text})
+        else:
+            output[fd].append(text)
+
+    while True:
+        if not exited and os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None:
+            # Not reaped yet, so the group can't be gone and its id can't be reused
+            exited = True
+            _kill_group(pid)  # Processes the job left behind
+            deadline = min(deadline, time.monotonic() + DRAIN_GRACE)
+        if not open_fds and exited:
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if not exited:
+                exceeded = 'timeout'
+            break
+        ready, _, _ = select.select(open_fds, [], [], min(remaining, POLL_INTERVAL))
+        for fd in ready:
+            chunk = os.read(fd, READ_SIZE)
+            if not chunk:
+                open_fds.remove(fd)
+                continue
+            if max_output and output_bytes + len(chunk) > max_output:
+                chunk = chunk[:max_output - output_bytes]
+                exceeded = 'output'
+            output_bytes += len(chunk)
+            emit(fd, decoders[fd].decode(chunk))
+            if exceeded:
+                break
+        if exceeded:
+            break
+
+    for fd, decoder in decoders.items():
+        emit(fd, decoder.decode(b'', final=True))
+    if not exited:
+        _kill_group(pid)
+    _, status, rusage = os.wait4(pid, 0)
+    os.close(stdout_r)
+    os.close(stderr_r)
+
+    returncode = os.waitstatus_to_exitcode(status)
+    if exceeded is None and returncode in (-signal.SIGXCPU, -signal.SIGKILL) and limits.get('cpu_seconds'):
+        if rusage.ru_utime + rusage.ru_stime >= limits['cpu_seconds']:
+            exceeded = 'cpu'
+    return {
+        'stdout': ''.join(output[stdout_r]),
+        'stderr': ''.join(output[stderr_r]),
+        'returncode': returncode,
+        'timed_out': exceeded == 'timeout',
+        'duration': round(time.monotonic() - started, 6),
+        'limit_exceeded': exceeded,
+        'resources': _usage(rusage, output_bytes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sandbox worker')
+    parser.add_argument('--path', action='append', default=[], help='Directory to put on sys.path')
+    parser.add_argument('--preload', action='append', default=[], help='Module to import up front')
+    args = parser.parse_args()
+
+    # Ctrl-C in a development server's terminal is for the server; the worker ends when stdin closes
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    sys.path[:0] = args.path
+    preloaded = []
+    for name in args.preload:
+        try:
+            importlib.import_module(name)
+            preloaded.append(name)
+        except Exception as e:
+            print(f"Sandbox worker could not preload {name}: {e}", file=sys.stderr)
+
+    # Keep the protocol off fds 0 and 1 so jobs can't read or write it
+    protocol_in = os.dup(0)
+    protocol_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    os.dup2(2, 1)
+    jobs = os.fdopen(protocol_in, 'r', encoding='utf-8')
+    results = os.fdopen(protocol_out, 'w', encoding='utf-8')
+
+    def send(message):
+        results.write(json.dumps(message) + '\n')
+        results.flush()
+
+    runtime = {
+        'python': sys.version,
+        'modules': {name: getattr(sys.modules[name], '__version__', None) for name in preloaded},
+    }
+    send({'ready': True, 'preloaded': preloaded, 'runtime': runtime})
+    for line in jobs:
+        if line.strip():
+            send(run_job(json.loads(line), (protocol_in, protocol_out), send))
+
+
+if __name__ == '__main__':
+    main()
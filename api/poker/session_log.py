@@ -0,0 +1,283 @@
+"""
+Append-only session logs.
+
+Game and player logs are appended to as lines are produced instead of being
+rewritten from memory when a session ends. Appends only touch a buffered file
+handle. Releasing a held log writes its buffers out to the file, so lines
+from requests served by different processes land in the order the requests
+finished; a single shared background thread fsyncs dirty files as a group,
+so the cost of a request is proportional to the lines it added.
+"""
+import os
+import threading
+import time
+import logging
+
+from .engine import GAME_LOG_FILENAME, PLAYER_LOG_SIZE_LIMIT
+
+FLUSH_INTERVAL = 0.5  # Seconds between group commits
+IDLE_CLOSE_SECONDS = 60  # Close file handles of sessions that stopped logging
+TRUNCATION_MARKER = b"\n--- Log truncated due to size limit ---"
+
+logger = logging.getLogger(__name__)
+
+
+class AppendOnlyLog:
+    """
+    A single append-only log file with an optional size limit
+    """
+    def __init__(self, path, size_limit=None):
+        self.path = path
+        self.size_limit = size_limit
+        self.lock = threading.Lock()
+        self.file = open(path, 'ab')
+        self.size = self.file.tell()
+        self.truncated = size_limit is not None and self.size >= size_limit
+        self.buffered = 0  # Bytes written since the last flush, not yet in the file
+        self.dirty = False
+        self.last_write = time.monotonic()
+
+    def append(self, data):
+        """
+        Append bytes (or text) to the log, returning the number of bytes written
+        """
+        if isinstance(data, str):
+            data = data.encode()
+
+        with self.lock:
+            if self.truncated:
+                return 0
+            if self.file is None:
+                # Closed while idle; O_APPEND keeps concurrent handles safe
+                self.file = open(self.path, 'ab')
+                self.size = self.file.tell()
+            if self.size_limit is not None:
+                # Other processes append to the same file, so this handle's count alone undercounts
+                self.size = os.fstat(self.file.fileno()).st_size + self.buffered
+                if self.size >= self.size_limit:
+                    self.truncated = True
+                    return 0
+            written = self.file.write(data)
+            if self.size_limit is not None and self.size + written >= self.size_limit:
+                written += self.file.write(TRUNCATION_MARKER)
+                self.truncated = True
+            self.size += written
+            self.buffered += written
+            self.dirty = True
+            self.last_write = time.monotonic()
+
+        _flusher.mark_dirty(self)
+        return written
+
+    def flush(self):
+        """
+        Write buffered data to the file without waiting for the disk
+        """
+        with self.lock:
+            if self.file is None or not self.buffered:
+                return
+            self.file.flush()
+            self.buffered = 0
+
+    def sync(self):
+        """
+        Flush buffered data and fsync it to disk
+        """
+        with self.lock:
+            if self.file is None or not self.dirty:
+                return
+            self.file.flush()
+            self.buffered = 0
+            os.fsync(self.file.fileno())
+            self.dirty = False
+
+    def close(self):
+        """Sync and close the underlying file"""
+        self.sync()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class SessionLog:
+    """
+    The game log and per-player logs of one session directory
+    """
+    def __init__(self, log_dir, header=None):
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
+        self.game = AppendOnlyLog(os.path.join(log_dir, f"{GAME_LOG_FILENAME}.txt"))
+        self.players = {}
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.holders = 0  # Writers using the log right now; held logs are never closed
+
+        if header and self.game.size == 0:
+            self.game.append(header + '\n')
+
+    def write_game(self, line):
+        """Append one line to the game log"""
+        self.last_used = time.monotonic()
+        return self.game.append(line + '\n')
+
+    def write_player(self, name, message):
+        """Append a message to the named player's log"""
+        self.last_used = time.monotonic()
+        return self.player(name).append(message)
+
+    def player(self, name):
+        """Get (opening if needed) the log of the named player"""
+        with self.lock:
+            player_log = self.players.get(name)
+            if player_log is None:
+                player_log = AppendOnlyLog(
+                    os.path.join(self.log_dir, f"{name}.txt"),
+                    size_limit=PLAYER_LOG_SIZE_LIMIT
+                )
+                self.players[name] = player_log
+            return player_log
+
+    def files(self):
+        with self.lock:
+            return [self.game] + list(self.players.values())
+
+    def flush(self):
+        """Write every file's buffered lines out; the flusher fsyncs them later"""
+        for log_file in self.files():
+            log_file.flush()
+
+    def sync(self):
+        """Flush and fsync every file of the session now"""
+        for log_file in self.files():
+            log_file.sync()
+
+    def close(self):
+        for log_file in self.files():
+            log_file.close()
+
+
+class LogFlusher(threading.Thread):
+    """
+    Shared background thread that group-commits dirty log files
+    """
+    def __init__(self, interval=FLUSH_INTERVAL):
+        super().__init__(daemon=True, name='session-log-flusher')
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.dirty = set()
+
+    def mark_dirty(self, log_file):
+        with self.lock:
+            self.dirty.add(log_file)
+
+    def flush_all(self):
+        """Flush and fsync everything written since the last commit"""
+        with self.lock:
+            pending, self.dirty = self.dirty, set()
+        for log_file in pending:
+            try:
+                log_file.sync()
+            except Exception as e:
+                logger.error(f"Error flushing log {log_file.path}: {str(e)}")
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush_all()
+            close_idle_session_logs()
+
+
+_flusher = LogFlusher()
+_flusher_started = False
+_SESSION_LOGS = {}
+_SESSION_LOGS_LOCK = threading.Lock()
+
+
+def open_session_log(session_id, log_dir, header=None):
+    """
+    Get the shared SessionLog of a session, opening it on first use
+
+    The caller holds the log until it calls release_session_log, and a held
+    log is never closed, so a handle can't be closed under a writer (which
+    would reopen its files outside the shared registry). Hold it only while
+    writing.
+
+    Args:
+        session_id: Key the log is cached under
+        log_dir: Directory holding the session's log files
+        header: First line of the game log, written only to a new file
+
+    Returns:
+        SessionLog
+    """
+    global _flusher_started
+    key = str(session_id)
+    with _SESSION_LOGS_LOCK:
+        if not _flusher_started:
+            _flusher.start()
+            _flusher_started = True
+        session_log = _SESSION_LOGS.get(key)
+        if session_log is None:
+            session_log = SessionLog(log_dir, header=header)
+            _SESSION_LOGS[key] = session_log
+        session_log.holders += 1
+        session_log.last_used = time.monotonic()
+        return session_log
+
+
+def release_session_log(session_log):
+    """
+    Give up a log returned by open_session_log
+
+    The lines written while holding it are flushed to the files first, so
+    other processes appending to or reading the same session see them.
+    """
+    try:
+        session_log.flush()
+    finally:
+        with _SESSION_LOGS_LOCK:
+            session_log.holders -= 1
+            session_log.last_used = time.monotonic()
+
+
+def close_idle_session_logs(max_idle=IDLE_CLOSE_SECONDS):
+    """Close and forget session logs nobody holds or has written to recently"""
+    now = time.monotonic()
+    with _SESSION_LOGS_LOCK:
+        idle = [
+            key for key, session_log in _SESSION_LOGS.items()
+            if session_log.holders <= 0 and now - session_log.last_used > max_idle
+        ]
+        closing = [_SESSION_LOGS.pop(key) for key in idle]
+    for session_log in closing:
+        try:
+            session_log.close()
+        except Exception as e:
+            logger.error(f"Error closing session log {session_log.log_dir}: {str(e)}")
+
+
+def close_session_log(session_id):
+    """
+    Close and forget a session's log now, e.g. before its files are moved
+
+    Returns:
+        bool: False if the log is being written to and was left open
+    """
+    with _SESSION_LOGS_LOCK:
+        session_log = _SESSION_LOGS.get(str(session_id))
+        if session_log is None:
+            return True
+        if session_log.holders > 0:
+            return False
+        del _SESSION_LOGS[str(session_id)]
+    session_log.close()
+    return True
+
+
+def sync_session_log(session_id):
+    """Flush a session's logs if this process has them open, so readers see every line"""
+    with _SESSION_LOGS_LOCK:
+        session_log = _SESSION_LOGS.get(str(session_id))
+    if session_log is not None:
+        session_log.sync()
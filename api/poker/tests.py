@@ -1,3 +1,95 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+from . import user_files
+from .metrics import USER_FILE_CACHE
+
+
+class UserFileViewsTests(TestCase):
+    """The IDE file views against the filesystem stand-in for the bucket"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='poker_user_files_')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(
+            POKER_USER_FILES_STORAGE='filesystem',
+            POKER_USER_FILES_ROOT=os.path.join(self.root, 'bucket'),
+            POKER_USER_FILES_CACHE_DIR=os.path.join(self.root, 'cache'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # The store is built from settings once per process
+        user_files._store = None
+        self.addCleanup(setattr, user_files, '_store', None)
+
+        self.user = CustomUser.objects.create(username='files', email='files@example.com')
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.force_authenticate(user=self.user)
+
+    def _cache_loads(self, result):
+        return USER_FILE_CACHE.values.get((result,), 0)
+
+    def _bucket_path(self, filename):
+        return os.path.join(self.root, 'bucket', 'files', str(self.user.id), filename)
+
+    def test_create_and_list(self):
+        response = self.client.post('/api/poker/create-file/', {'filename': 'player.py'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['key'], f'files/{self.user.id}/player.py')
+        self.client.post('/api/poker/create-file/', {'filename': 'lib/helpers.py'}, format='json')
+
+        response = self.client.get('/api/poker/list-files/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'folders': ['lib'], 'files': ['player.py']})
+
+    def test_upload_then_load(self):
+        upload = tempfile.NamedTemporaryFile(suffix='.py', dir=self.root, delete=False)
+        upload.write(b'print("hi")\n')
+        upload.close()
+        with open(upload.name, 'rb') as f:
+            response = self.client.post('/api/poker/upload-file/', {'file': f}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        filename = os.path.basename(upload.name)
+
+        response = self.client.get(f'/api/poker/load-file/{filename}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['content'], 'print("hi")\n')
+
+    def test_load_after_save_is_cache_hit(self):
+        response = self.client.post('/api/poker/save-file/', {'filename': 'player.py', 'content': 'v1'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        hits = self._cache_loads('hit')
+        response = self.client.get('/api/poker/load-file/player.py/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['content'], 'v1')
+        self.assertEqual(self._cache_loads('hit'), hits + 1)
+
+    def test_load_after_change_underneath_is_miss(self):
+        self.client.post('/api/poker/save-file/', {'filename': 'player.py', 'content': 'v1'}, format='json')
+        with open(self._bucket_path('player.py'), 'w') as f:
+            f.write('v2')
+
+        misses = self._cache_loads('miss')
+        response = self.client.get('/api/poker/load-file/player.py/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['content'], 'v2')
+        self.assertEqual(self._cache_loads('miss'), misses + 1)
+
+    def test_load_missing_file(self):
+        response = self.client.get('/api/poker/load-file/missing.py/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_dot_dot_keys_rejected(self):
+        response = self.client.post('/api/poker/save-file/', {'filename': '../999/player.py', 'content': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/poker/create-file/', {'filename': '..'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/poker/load-file/../')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'bucket', 'files', '999')))
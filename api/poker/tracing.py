@@ -0,0 +1,174 @@
+"""
+Opt-in request tracing.
+
+A trace times the phases of one unit of work (e.g. a make-move request) as
+named spans. Finished traces are exported as a Server-Timing header by the
+view that started them and folded into a rolling per-span histogram, served
+by the timings endpoint.
+
+Tracing is off unless the POKER_TRACING setting is true or it is switched
+on at runtime with set_tracing_enabled. While it is off, trace() yields None
+and span() returns a shared no-op context manager, so instrumented code
+pays for one context-variable lookup per span.
+"""
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+ROLLING_WINDOW = 1000  # Samples kept per span
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_enabled = getattr(settings, 'POKER_TRACING', False)
+_current_trace = contextvars.ContextVar('poker_trace', default=None)
+
+
+def tracing_enabled():
+    return _enabled
+
+
+def set_tracing_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """
+    Span durations of one traced unit of work
+
+    A span entered more than once accumulates; spans may nest, in which case
+    the outer span includes the inner one.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.durations = {}  # span name -> seconds, in order of first use
+        self.started = time.perf_counter()
+        self.total = None
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        return self
+
+    def timings_ms(self):
+        timings = {name: round(seconds * 1000, 3) for name, seconds in self.durations.items()}
+        if self.total is not None:
+            timings['total'] = round(self.total * 1000, 3)
+        return timings
+
+    def server_timing(self):
+        """Value for a Server-Timing response header"""
+        return ', '.join(f'{name};dur={duration}' for name, duration in self.timings_ms().items())
+
+
+class RollingHistogram:
+    """Durations of the last ``window`` samples of one span"""
+    def __init__(self, window=ROLLING_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.samples.append(seconds * 1000)
+
+    def summary(self):
+        with self.lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return {'count': 0}
+        count = len(samples)
+        buckets = [0] * (len(BUCKETS_MS) + 1)
+        for sample in samples:
+            buckets[bisect_left(BUCKETS_MS, sample)] += 1
+        labels = [f'le_{bound}ms' for bound in BUCKETS_MS] + ['inf']
+        return {
+            'count': count,
+            'mean_ms': round(sum(samples) / count, 3),
+            'p50_ms': round(samples[int(0.50 * (count - 1))], 3),
+            'p90_ms': round(samples[int(0.90 * (count - 1))], 3),
+            'p99_ms': round(samples[int(0.99 * (count - 1))], 3),
+            'max_ms': round(samples[-1], 3),
+            'buckets': dict(zip(labels, buckets)),
+        }
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def _histogram(key):
+    with _histograms_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = RollingHistogram()
+        return histogram
+
+
+def record_trace(trace):
+    """Add a finished trace's spans to the rolling histograms"""
+    for name, seconds in trace.durations.items():
+        _histogram(f'{trace.name}.{name}').add(seconds)
+    if trace.total is not None:
+        _histogram(f'{trace.name}.total').add(trace.total)
+
+
+@contextmanager
+def trace(name):
+    """
+    Trace the enclosed block when tracing is enabled
+
+    Yields:
+        The Trace (finished and recorded on exit), or None when tracing is off
+    """
+    if not _enabled:
+        yield None
+        return
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        record_trace(current.finish())
+
+
+def span(name):
+    """Time the enclosed block as a span of the current trace, if any"""
+    current = _current_trace.get()
+    if current is None:
+        return NULL_SPAN
+    return current.span(name)
+
+
+def timing_report():
+    """Rolling histogram summary of every span seen so far"""
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    return {key: histogram.summary() for key, histogram in sorted(histograms.items())}
+
+
+def reset_timings():
+    with _histograms_lock:
+        _histograms.clear()
@@ -10,6 +10,8 @@ urlpatterns = [
     path('initialize-game/', views.initialize_game, name='initialize_game'),
     path('join-game/', views.join_game, name='join_game'),
     path('make-move/', views.make_move, name='make_move'),
+    path('timings/', views.move_timings, name='move_timings'),
+    path('metrics/', views.metrics, name='metrics'),
     path('start-hand/', views.start_hand, name='start_hand'),
     path('buy-in/', views.buy_in, name='buy_in'),
     path('exit-game/', views.exit_game, name='exit_game'),
@@ -19,6 +21,17 @@ urlpatterns = [
     path('bot-game/start/', views.start_bot_game_simulation, name='start_bot_game'),
     path('bot-game/pause/', views.pause_bot_game_simulation, name='pause_bot_game'),
     path('bot-game/status/', views.get_bot_game_progress, name='bot_game_status'),
+
+    # HUD statistics
+    path('hud-stats/', views.get_hud_stats, name='hud_stats'),
+
+    # Bot decision profiles
+    path('bot-profiles/', views.list_bot_profiles, name='list_bot_profiles'),
+    path('bot-profiles/<uuid:bot_id>/', views.get_bot_profile, name='get_bot_profile'),
+
+    # Game and player logs
+    path('logs/<uuid:session_id>/', views.list_session_logs, name='list_session_logs'),
+    path('logs/<uuid:session_id>/<str:stream>/', views.get_session_log, name='get_session_log'),
     
     # Bot and game management
     path('post-bot/', views.post_bot, name='post_bot'),
@@ -35,6 +48,7 @@ urlpatterns = [
     # Development environment
     path('save-code/', views.save_code, name='save_code'),
     path('run-code/', views.run_code, name='run_code'),
+    path('run-code/stream/', views.stream_code, name='stream_code'),
     path('execute-command/', views.execute_command, name='execute_command'),
     path('skeleton-files/', views.get_skeleton_files, name='skeleton_files'),
     path('skeleton-files/<path:path>/', views.get_skeleton_file_content, name='skeleton_file_content'),
@@ -0,0 +1,294 @@
+"""
+Storage for the files users edit in the IDE.
+
+Files live in the S3/MinIO bucket under files/<user id>/. Every web process
+shares one S3 client, so requests reuse its pooled HTTP connections instead
+of opening a new one each time, and keeps a read-through copy of the files it
+has seen on local disk, keyed by the object's ETag. Loading a file sends a
+conditional GET; when the object hasn't changed the bucket answers 304 and
+the file is served from disk. Saving writes through to the disk copy, so the
+next load of a file saved by this process doesn't transfer it again.
+
+With POKER_USER_FILES_STORAGE = 'filesystem' the bucket is replaced by a
+directory (POKER_USER_FILES_ROOT) with the same keys and MD5 ETags, for
+running without MinIO.
+
+    store = get_user_file_store()
+    key = user_file_key(1, 'player.py')  # 'files/1/player.py'
+    etag = store.write(key, b'...')
+    content = store.read(key)
+"""
+import os
+import hashlib
+import tempfile
+import threading
+import logging
+
+from django.conf import settings
+
+from .metrics import USER_FILE_CACHE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class InvalidFileKey(ValueError):
+    """A file name that would step out of its user's folder"""
+
+
+def user_file_key(user_id, filename):
+    """
+    Object key of a user's file
+
+    Raises:
+        InvalidFileKey: The name has empty, '.' or '..' parts or backslashes
+    """
+    key = f"files/{user_id}/{filename}"
+    _key_parts(key)
+    return key
+
+
+def _key_parts(key):
+    # S3 keys are plain strings, so '..' must not reach another user's directory on either backend
+    parts = key.rstrip('/').split('/')
+    if any(part in ('', '.', '..') for part in parts) or '\\' in key:
+        raise InvalidFileKey(f"Invalid file key {key}")
+    return parts
+
+
+def _etag(body):
+    """ETag S3 gives an object uploaded in a single part"""
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+class S3FileBackend:
+    """The configured bucket, through one client shared by all threads"""
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS):
+        from botocore.config import Config
+        from botocore.exceptions import ClientError
+        from storages.backends.s3boto3 import S3Boto3Storage
+
+        storage = S3Boto3Storage()
+        storage.client_config = storage.client_config.merge(Config(max_pool_connections=max_connections))
+        # The storage keeps a resource per thread, but the client under it is thread-safe
+        self.client = storage.connection.meta.client
+        self.bucket = storage.bucket_name
+        self.client_error = ClientError
+
+    def list(self, prefix):
+        """(folder prefixes, object keys) directly under ``prefix``"""
+        response = self.client.list_objects_v2(Bucket=self.bucket, Prefix=prefix, Delimiter='/')
+        folders = [p['Prefix'] for p in response.get('CommonPrefixes', [])]
+        keys = [obj['Key'] for obj in response.get('Contents', [])]
+        return folders, keys
+
+    def get(self, key, etag=None):
+        """
+        (body, etag) of an object, or None if it still has ``etag``
+
+        Raises:
+            FileNotFoundError: No object with that key
+        """
+        kwargs = {'IfNoneMatch': etag} if etag else {}
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key, **kwargs)
+        except self.client_error as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code in ('304', 'NotModified'):
+                return None
+            if code in ('404', 'NoSuchKey'):
+                raise FileNotFoundError(key)
+            raise
+        return response['Body'].read(), response['ETag']
+
+    def put(self, key, body, content_type='text/plain'):
+        """Store an object and return its ETag"""
+        response = self.client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType=content_type)
+        return response['ETag']
+
+
+class FilesystemFileBackend:
+    """Stand-in for the bucket keeping objects as files under ``root``"""
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key):
+        return os.path.join(self.root, *_key_parts(key))
+
+    def list(self, prefix):
+        directory = self._path(prefix)
+        if not os.path.isdir(directory):
+            return [], []
+        folders, keys = [], []
+        for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+            if entry.is_dir():
+                folders.append(f"{prefix}{entry.name}/")
+            elif not entry.name.startswith('.'):
+                keys.append(prefix + entry.name)
+        return folders, keys
+
+    def get(self, key, etag=None):
+        try:
+            with open(self._path(key), 'rb') as f:
+                body = f.read()
+        except (IsADirectoryError, NotADirectoryError):
+            raise FileNotFoundError(key)
+        current = _etag(body)
+        if current == etag:
+            return None
+        return body, current
+
+    def put(self, key, body, content_type='text/plain'):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        os.replace(temp_path, path)
+        return _etag(body)
+
+
+class DiskCache:
+    """
+    Local copies of objects, each stored with the ETag it was read at
+
+    Entries are files named by a hash of the key, holding the ETag on the
+    first line and the body after it. Once the cache is over ``max_bytes``
+    the least recently used entries are removed.
+    """
+    def __init__(self, root, max_bytes=DEFAULT_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        """(body, etag) of the cached copy, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                etag = f.readline().rstrip(b'\n').decode('utf-8')
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass
+        return body, etag
+
+    def set(self, key, body, etag):
+        if len(body) > self.max_bytes:
+            self.discard(key)
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.entry-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(etag.encode('utf-8') + b'\n')
+            f.write(body)
+        os.replace(temp_path, self._path(key))
+        self._trim()
+
+    def discard(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _trim(self):
+        with self.lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.root):
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+
+class UserFileStore:
+    """A storage backend with a read-through, write-through DiskCache in front"""
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+
+    def list(self, prefix):
+        """(folder prefixes, object keys) directly under ``prefix``"""
+        return self.backend.list(prefix)
+
+    def read(self, key):
+        """
+        Body of an object, from the disk copy if the object hasn't changed
+
+        Raises:
+            FileNotFoundError: No object with that key
+        """
+        cached = self.cache.get(key)
+        try:
+            result = self.backend.get(key, etag=cached[1] if cached else None)
+        except FileNotFoundError:
+            if cached:
+                self.cache.discard(key)
+            raise
+        if result is None:
+            USER_FILE_CACHE.inc(result='hit')
+            return cached[0]
+        USER_FILE_CACHE.inc(result='miss')
+        body, etag = result
+        self._cache(key, body, etag)
+        return body
+
+    def write(self, key, body, content_type='text/plain'):
+        """Store an object, keeping the disk copy in step; returns its ETag"""
+        etag = self.backend.put(key, body, content_type)
+        self._cache(key, body, etag)
+        return etag
+
+    def _cache(self, key, body, etag):
+        try:
+            self.cache.set(key, body, etag)
+        except OSError as e:  # A full or read-only cache dir only costs the next load a GET
+            logger.warning(f"Could not cache {key}: {str(e)}")
+            self.cache.discard(key)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_user_file_store():
+    """The user file store of this process, configured from settings"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            kind = getattr(settings, 'POKER_USER_FILES_STORAGE', 's3')
+            if kind == 'filesystem':
+                backend = FilesystemFileBackend(settings.POKER_USER_FILES_ROOT)
+            elif kind == 's3':
+                backend = S3FileBackend(getattr(settings, 'POKER_USER_FILES_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS))
+            else:
+                raise ValueError(f"Unknown POKER_USER_FILES_STORAGE {kind}, expected 's3' or 'filesystem'")
+            cache_dir = getattr(settings, 'POKER_USER_FILES_CACHE_DIR', None) or os.path.join(
+                tempfile.gettempdir(), 'poker_user_files'
+            )
+            cache = DiskCache(cache_dir, getattr(settings, 'POKER_USER_FILES_CACHE_BYTES', DEFAULT_CACHE_BYTES))
+            _store = UserFileStore(backend, cache)
+        return _store
@@ -0,0 +1,269 @@
+"""
+Lockstep multi-table simulator for vectorizable bots.
+
+Thousands of heads-up tables advance together: buttons, streets, pips and
+stacks live in NumPy arrays and every step applies the rules of
+RoundState.proceed to all running tables at once. Bots implement a policy
+that looks at a TableView of arrays and returns one action per table, which
+makes rule-based bots (SimpleBot, threshold bots) orders of magnitude
+cheaper to evaluate than through the per-hand engine loop.
+
+Only showdowns leave NumPy: the tables that reach one in a step are scored
+with eval7.
+"""
+from collections import namedtuple
+
+import numpy as np
+import eval7
+
+from .engine import SMALL_BLIND, BIG_BLIND, STARTING_STACK
+from .decks import DECK_CARDS, generate_block, new_seed
+
+FOLD, CALL, CHECK, RAISE = 0, 1, 2, 3
+FINAL_STREET = 5
+MAX_STEPS_PER_HAND = 200  # Safety net; heads-up hands end long before this
+
+CARD_OBJECTS = [eval7.Card(card) for card in DECK_CARDS.tolist()]
+
+TableView = namedtuple('TableView', [
+    'tables',     # Indexes of the tables in this view
+    'seat',       # Seat (0 = small blind) the policy is acting for
+    'street',     # 0, 3, 4 or 5 board cards
+    'pips',       # Chips put in this street, own
+    'other_pips',
+    'stacks',     # Chips behind, own
+    'other_stacks',
+    'legal',      # (n, 4) bool mask indexed by FOLD, CALL, CHECK, RAISE
+    'min_raise',  # Raise-to bounds (valid where RAISE is legal)
+    'max_raise',
+    'strength',   # Preflop strength of the acting seat's hole cards, 0..1
+])
+
+VectorResult = namedtuple('VectorResult', [
+    'hands',    # Hands played
+    'total',    # Chips won by policy a
+    'mean',     # Per hand
+    'stderr',
+    'deltas',   # Per-hand chips won by policy a
+])
+
+
+def preflop_strength(hole):
+    """
+    Rough hole-card strength in [0, 1] for an (n, 2) array of card indexes
+
+    Pairs rank above unpaired hands, then high card, kicker and suitedness.
+    """
+    ranks = hole // 4
+    suits = hole % 4
+    high = ranks.max(axis=1)
+    low = ranks.min(axis=1)
+    paired = high == low
+    unpaired = (2 * high + low) / 36 * 0.45 + (suits[:, 0] == suits[:, 1]) * 0.05 + (high - low == 1) * 0.02
+    return np.where(paired, 0.55 + 0.45 * high / 12, unpaired)
+
+
+class VectorSimpleBot:
+    """SimpleBot for many tables: check when possible, call otherwise"""
+    def act(self, view):
+        actions = np.where(view.legal[:, CHECK], CHECK, CALL)
+        return actions, np.zeros(len(view.tables), dtype=np.int64)
+
+
+class ThresholdBot:
+    """
+    Parametric rule-based bot
+
+    Raises (to ``raise_fraction`` of the way between the raise bounds) with
+    hands at least ``raise_threshold`` strong, continues with hands at least
+    ``call_threshold`` strong, and checks or folds the rest.
+    """
+    def __init__(self, raise_threshold=0.7, call_threshold=0.4, raise_fraction=0.25):
+        self.raise_threshold = raise_threshold
+        self.call_threshold = call_threshold
+        self.raise_fraction = raise_fraction
+
+    def act(self, view):
+        passive = np.where(view.legal[:, CHECK], CHECK, FOLD)
+        continuing = np.where(view.legal[:, CHECK], CHECK, CALL)
+        actions = np.where(view.strength >= self.call_threshold, continuing, passive)
+        raising = (view.strength >= self.raise_threshold) & view.legal[:, RAISE]
+        actions = np.where(raising, RAISE, actions)
+        amounts = view.min_raise + np.round((view.max_raise - view.min_raise) * self.raise_fraction).astype(np.int64)
+        return actions, amounts
+
+
+class LockstepTables:
+    """State of n tables playing one hand each, seat 0 posting the small blind"""
+    def __init__(self, decks):
+        n = len(decks)
+        self.n = n
+        self.rows = np.arange(n)
+        self.decks = decks
+        self.strength = np.stack([preflop_strength(decks[:, 0:2]), preflop_strength(decks[:, 2:4])], axis=1)
+        self.button = np.zeros(n, dtype=np.int64)
+        self.street = np.zeros(n, dtype=np.int64)
+        self.pips = np.tile(np.array([SMALL_BLIND, BIG_BLIND], dtype=np.int64), (n, 1))
+        self.stacks = np.tile(np.array([STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND], dtype=np.int64), (n, 1))
+        self.running = np.ones(n, dtype=bool)
+        self.deltas = np.zeros(n, dtype=np.int64)  # Seat 0's result
+
+    def view(self):
+        """Legal actions and raise bounds of every table (RoundState.legal_actions/raise_bounds)"""
+        active = self.button % 2
+        own_pips = self.pips[self.rows, active]
+        other_pips = self.pips[self.rows, 1 - active]
+        own_stacks = self.stacks[self.rows, active]
+        other_stacks = self.stacks[self.rows, 1 - active]
+        cost = other_pips - own_pips
+
+        no_cost = cost == 0
+        bets_forbidden = (self.stacks[:, 0] == 0) | (self.stacks[:, 1] == 0)
+        raises_forbidden = (cost == own_stacks) | (other_stacks == 0)
+        legal = np.empty((self.n, 4), dtype=bool)
+        legal[:, FOLD] = ~no_cost
+        legal[:, CALL] = ~no_cost
+        legal[:, CHECK] = no_cost
+        legal[:, RAISE] = np.where(no_cost, ~bets_forbidden, ~raises_forbidden)
+
+        max_contribution = np.minimum(own_stacks, other_stacks + cost)
+        min_contribution = np.minimum(max_contribution, cost + np.maximum(cost, BIG_BLIND))
+        return active, TableView(
+            tables=self.rows,
+            seat=active,
+            street=self.street,
+            pips=own_pips,
+            other_pips=other_pips,
+            stacks=own_stacks,
+            other_stacks=other_stacks,
+            legal=legal,
+            min_raise=own_pips + min_contribution,
+            max_raise=own_pips + max_contribution,
+            strength=self.strength[self.rows, active],
+        )
+
+    def step(self, actions, amounts, view):
+        """Apply one action per running table (RoundState.proceed)"""
+        active = view.seat
+        running = self.running
+
+        # Illegal choices fall back to check, else fold, like the engine's bots
+        legal_choice = view.legal[self.rows, actions]
+        actions = np.where(legal_choice, actions, np.where(view.legal[:, CHECK], CHECK, FOLD))
+        amounts = np.clip(amounts, view.min_raise, view.max_raise)
+
+        fold = running & (actions == FOLD)
+        call = running & (actions == CALL)
+        check = running & (actions == CHECK)
+        raise_ = running & (actions == RAISE)
+
+        # Fold: the folder loses what it has put in
+        fold_delta = np.where(active == 0, self.stacks[:, 0] - STARTING_STACK, STARTING_STACK - self.stacks[:, 1])
+        self.deltas = np.where(fold, fold_delta, self.deltas)
+
+        # Small blind completes preflop: both in for the big blind, big blind to act
+        limp = call & (self.button == 0)
+        self.pips[limp] = BIG_BLIND
+        self.stacks[limp] = STARTING_STACK - BIG_BLIND
+
+        # Any other call closes the street
+        close = call & ~limp
+        contribution = np.where(close, view.other_pips - view.pips, 0)
+        self.stacks[self.rows, active] -= contribution
+        self.pips[self.rows, active] += contribution
+
+        # A check closes the street when it is the second action on it
+        check_closes = check & (((self.street == 0) & (self.button > 0)) | (self.button > 1))
+
+        raise_contribution = np.where(raise_, amounts - view.pips, 0)
+        self.stacks[self.rows, active] -= raise_contribution
+        self.pips[self.rows, active] += raise_contribution
+
+        self.button = np.where(limp, 1, np.where(close | raise_ | (check & ~check_closes), self.button + 1, self.button))
+        self.running = running & ~fold
+
+        street_over = close | check_closes
+        showdown = street_over & (self.street == FINAL_STREET)
+        advance = street_over & ~showdown
+        self.street = np.where(advance, np.where(self.street == 0, 3, self.street + 1), self.street)
+        self.button = np.where(advance, 1, self.button)
+        self.pips[advance] = 0
+
+        if showdown.any():
+            self._showdown(np.nonzero(showdown)[0])
+
+    def _showdown(self, tables):
+        for table in tables:
+            deck = self.decks[table]
+            board = [CARD_OBJECTS[card] for card in deck[4:9]]
+            score0 = eval7.evaluate(board + [CARD_OBJECTS[deck[0]], CARD_OBJECTS[deck[1]]])
+            score1 = eval7.evaluate(board + [CARD_OBJECTS[deck[2]], CARD_OBJECTS[deck[3]]])
+            stacks = self.stacks[table]
+            if score0 > score1:
+                delta = STARTING_STACK - stacks[1]
+            elif score0 < score1:
+                delta = stacks[0] - STARTING_STACK
+            else:
+                delta = (stacks[0] - stacks[1]) // 2
+            self.deltas[table] = delta
+        self.running[tables] = False
+
+
+def play_hands(policy_a, policy_b, a_in_seat0, decks):
+    """
+    Play one hand on every table
+
+    Args:
+        policy_a, policy_b: Vectorized policies
+        a_in_seat0: Bool per table, whether policy a posts the small blind there
+        decks: (n, 52) array of card indexes
+
+    Returns:
+        Seat 0's delta per table
+    """
+    tables = LockstepTables(decks)
+    for _ in range(MAX_STEPS_PER_HAND):
+        if not tables.running.any():
+            break
+        active, view = tables.view()
+        actions = np.full(tables.n, CHECK, dtype=np.int64)
+        amounts = np.zeros(tables.n, dtype=np.int64)
+        a_to_act = (active == 0) == a_in_seat0
+        for policy, mask in ((policy_a, a_to_act), (policy_b, ~a_to_act)):
+            rows = np.nonzero(tables.running & mask)[0]
+            if len(rows):
+                chosen, sizes = policy.act(TableView(*(field[rows] for field in view)))
+                actions[rows] = chosen
+                amounts[rows] = sizes
+        tables.step(actions, amounts, view)
+    return tables.deltas
+
+
+def simulate(policy_a, policy_b, tables=4096, rounds=1, seed=None):
+    """
+    Play ``tables * rounds`` hands between two vectorized policies
+
+    Each round deals a fresh block of decks (decks.generate_block) to every
+    table; policy a sits in the small blind on half the tables, alternating
+    every round.
+
+    Returns:
+        VectorResult from policy a's side
+    """
+    seed = new_seed() if seed is None else seed
+    results = []
+    for round_no in range(rounds):
+        decks = generate_block(seed, round_no, tables)
+        a_in_seat0 = (np.arange(tables) + round_no) % 2 == 0
+        seat0_deltas = play_hands(policy_a, policy_b, a_in_seat0, decks)
+        results.append(np.where(a_in_seat0, seat0_deltas, -seat0_deltas))
+
+    deltas = np.concatenate(results)
+    hands = len(deltas)
+    return VectorResult(
+        hands=hands,
+        total=int(deltas.sum()),
+        mean=float(deltas.mean()),
+        stderr=float(deltas.std(ddof=1) / np.sqrt(hands)) if hands > 1 else 0.0,
+        deltas=deltas,
+    )
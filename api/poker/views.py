@@ -1,9 +1,13 @@
 import json
 import os
+import re
+import gzip
 import uuid
 import logging
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods, require_POST, require_GET
 from django.contrib.auth.decorators import login_required
@@ -12,18 +16,48 @@ from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.utils.decorators import method_decorator
 from django.contrib.auth import get_user_model
-from storages.backends.s3boto3 import S3Boto3Storage
+from django.db import transaction
 from pathlib import Path
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
-from .models import GameSession, BotRepository
+from .models import GameSession, GameSessionConflict, BotRepository, BotProfile
 from .manager import PokerGameManager, BotInterface, start_bot_game, stop_bot_game, get_bot_game_status
+from .log_parser import update_index, tail_offset, read_hand_text
+from .log_archive import get_log_archive
+from .session_log import sync_session_log
+from .hud_stats import get_hud
+from .early_stopping import EARLY_STOPPING_METHODS
+from .metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .profiling import load_stats, dump_stats, collapsed_stacks, top_functions
+from .sandbox import run_python, stream_python, limit_message, SandboxError, SandboxBusy
+from .user_files import get_user_file_store, user_file_key, InvalidFileKey
+from .tracing import tracing_enabled, set_tracing_enabled, timing_report, reset_timings
 from users.models import CustomUser
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+def _session_conflict_response(error):
+    """Build the 409 response returned when another request updated the session first"""
+    logger.warning(str(error))
+    current_version = GameSession.objects.filter(
+        session_id=error.session_id
+    ).values_list('version', flat=True).first()
+    response = JsonResponse({
+        'error': 'Game session was updated by another request. Reload the game state and retry.',
+        'conflict': True,
+        'retry': True,
+        'version': current_version
+    }, status=409)
+    response['Retry-After'] = '0'
+    return response
+
+@require_GET
+def metrics(request):
+    """Metrics of this process in the Prometheus text format"""
+    return HttpResponse(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
 def home_view(request):
     return HttpResponse("Poker Home")
 
@@ -137,6 +171,8 @@ def join_game(request):
         
         return JsonResponse(game_state)
         
+    except GameSessionConflict as e:
+        return _session_conflict_response(e)
     except Exception as e:
         logger.error(f"Error joining game: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -212,14 +248,38 @@ def make_move(request):
         game_manager = PokerGameManager(session)
         
         # Process the action
-        response = game_manager.process_player_action(action_type, amount)
+        response = JsonResponse(game_manager.process_player_action(action_type, amount))
+        if game_manager.last_trace is not None:
+            response['Server-Timing'] = game_manager.last_trace.server_timing()
         
-        return JsonResponse(response)
+        return response
         
+    except GameSessionConflict as e:
+        return _session_conflict_response(e)
     except Exception as e:
         logger.error(f"Error processing move: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
 
+@api_view(['GET', 'POST'])
+@permission_classes([IsAdminUser])
+def move_timings(request):
+    """
+    Rolling per-span timings of traced requests
+
+    POST {"enabled": bool} switches tracing on or off for this process,
+    {"reset": true} clears the collected timings.
+    """
+    try:
+        if request.method == 'POST':
+            if 'enabled' in request.data:
+                set_tracing_enabled(request.data.get('enabled'))
+            if request.data.get('reset'):
+                reset_timings()
+        return JsonResponse({'enabled': tracing_enabled(), 'spans': timing_report()})
+    except Exception as e:
+        logger.error(f"Error getting move timings: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def start_hand(request):
@@ -240,6 +300,8 @@ def start_hand(request):
         
         return JsonResponse(game_state)
         
+    except GameSessionConflict as e:
+        return _session_conflict_response(e)
     except Exception as e:
         logger.error(f"Error starting hand: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -265,10 +327,11 @@ def buy_in(request):
         
         # Process rebuy
         try:
-            player.remove_coins(rebuy_amount)
-            session.player_stack += rebuy_amount
-            session.current_coins += rebuy_amount
-            session.save()
+            with transaction.atomic():
+                session.player_stack += rebuy_amount
+                session.current_coins += rebuy_amount
+                session.save()
+                player.remove_coins(rebuy_amount)
             
             logger.info(f"Player {player.username} rebuyed {rebuy_amount} coins. New stack: {session.player_stack}")
             
@@ -280,6 +343,8 @@ def buy_in(request):
         except ValueError as e:
             return JsonResponse({'error': str(e)}, status=400)
         
+    except GameSessionConflict as e:
+        return _session_conflict_response(e)
     except Exception as e:
         logger.error(f"Error processing rebuy: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -307,6 +372,8 @@ def exit_game(request):
             'new_coin_balance': request.user.coins
         })
         
+    except GameSessionConflict as e:
+        return _session_conflict_response(e)
     except Exception as e:
         logger.error(f"Error exiting game: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -352,25 +419,16 @@ def create_file(request):
             print("Filename not provided in request")
             return JsonResponse({'error': 'Filename is required'}, status=400)
 
-        object_key = f"files/{user_id}/{filename}"
+        object_key = user_file_key(user_id, filename)
         print(f"Object key for S3: {object_key}")
 
-        storage = S3Boto3Storage()
-        s3_client = storage.connection.meta.client
-        bucket_name = storage.bucket_name
-
-        print(f"Using bucket: {bucket_name}")
-
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=object_key,
-            Body="",
-            ContentType='text/plain'
-        )
+        get_user_file_store().write(object_key, b"")
         print(f"Successfully created file in S3 at key: {object_key}")
 
         return JsonResponse({'message': 'File created', 'key': object_key})
 
+    except InvalidFileKey as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         print(f"Exception occurred: {e}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -381,21 +439,11 @@ def list_user_files(request):
     user_id = request.user.id
     prefix = f"files/{user_id}/"
 
-    storage = S3Boto3Storage()
-    s3_client = storage.connection.meta.client
-
-    bucket_name = storage.bucket_name  
-
     try:
-        response = s3_client.list_objects_v2(
-            Bucket=bucket_name,
-            Prefix=prefix,
-            Delimiter='/'
-        )
-        
-       
-        folders = [p['Prefix'].replace(prefix, '').replace('/', '') for p in response.get('CommonPrefixes', [])]
-        files = [obj['Key'].replace(prefix, '') for obj in response.get('Contents', []) if obj['Key'] != prefix]
+        folder_prefixes, keys = get_user_file_store().list(prefix)
+
+        folders = [p.replace(prefix, '').replace('/', '') for p in folder_prefixes]
+        files = [key.replace(prefix, '') for key in keys if key != prefix]
 
         data = {
             'folders': folders,
@@ -430,18 +478,9 @@ def upload_file(request):
         # Save to S3/MinIO storage
         user_id = request.user.id
         print(user_id)
-        object_key = f"files/{user_id}/{uploaded_file.name}"
-        
-        storage = S3Boto3Storage()
-        s3_client = storage.connection.meta.client
-        bucket_name = storage.bucket_name
+        object_key = user_file_key(user_id, uploaded_file.name)
         
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=object_key,
-            Body=content.encode('utf-8'),
-            ContentType='text/plain'
-        )
+        get_user_file_store().write(object_key, content.encode('utf-8'))
         
         return JsonResponse({
             'message': 'File uploaded successfully',
@@ -449,6 +488,8 @@ def upload_file(request):
             'content': content
         })
         
+    except InvalidFileKey as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         logger.error(f"Error uploading file: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -460,23 +501,20 @@ def load_file(request, filename):
     """Load file content from storage"""
     try:
         user_id = request.user.id
-        object_key = f"files/{user_id}/{filename}"
+        object_key = user_file_key(user_id, filename)
         
-        storage = S3Boto3Storage()
-        s3_client = storage.connection.meta.client
-        bucket_name = storage.bucket_name
-        
-        # Get file from S3/MinIO
-        response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
-        content = response['Body'].read().decode('utf-8')
+        # Get file from S3/MinIO, or the local copy if it hasn't changed there
+        content = get_user_file_store().read(object_key).decode('utf-8')
         
         return JsonResponse({
             'content': content,
             'filename': filename
         })
         
-    except s3_client.exceptions.NoSuchKey:
+    except FileNotFoundError:
         return JsonResponse({'error': 'File not found'}, status=404)
+    except InvalidFileKey as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         logger.error(f"Error loading file: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -494,21 +532,14 @@ def save_file_to_storage(request):
             return JsonResponse({'error': 'Filename is required'}, status=400)
         
         user_id = request.user.id
-        object_key = f"files/{user_id}/{filename}"
-        
-        storage = S3Boto3Storage()
-        s3_client = storage.connection.meta.client
-        bucket_name = storage.bucket_name
+        object_key = user_file_key(user_id, filename)
         
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=object_key,
-            Body=content.encode('utf-8'),
-            ContentType='text/plain'
-        )
+        get_user_file_store().write(object_key, content.encode('utf-8'))
         
         return JsonResponse({'message': 'File saved successfully'})
         
+    except InvalidFileKey as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         logger.error(f"Error saving file to storage: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -633,6 +664,7 @@ def get_bot_game_progress(request):
             'hands_to_play': session.hands_to_play,
             'player_stack': session.player_stack,
             'bot_stack': session.bot_stack,
+            'report': session.simulation_report,
             'error': error
         })
         
@@ -640,6 +672,333 @@ def get_bot_game_progress(request):
         logger.error(f"Error getting bot game progress: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
 
+# Game and player log downloads
+LOG_STREAM_PATTERN = re.compile(r'^[\w\-]+$')
+RANGE_HEADER_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+LOG_GZIP_MIN_BYTES = 512
+LOG_MAX_TAIL_HANDS = 1000
+
+def _session_log_path(session_id, stream):
+    return os.path.join(settings.MEDIA_ROOT, 'game_logs', str(session_id), f"{stream}.txt")
+
+def _parse_range_header(range_header, size):
+    """
+    Parse a single-range "bytes=" header
+
+    Returns:
+        (start, end) inclusive, None when there is no usable range (serve the
+        whole log), or False when the range cannot be satisfied
+    """
+    match = RANGE_HEADER_PATTERN.match(range_header.strip()) if range_header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+def _log_response(request, data, filename):
+    """Response for a slice of a log, gzip-encoded when the client accepts it"""
+    if len(data) >= LOG_GZIP_MIN_BYTES and 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = HttpResponse(gzip.compress(data), content_type='text/plain; charset=utf-8')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(data, content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+def _iter_log_file(log_path, chunk_size=64 * 1024):
+    with open(log_path, 'rb') as log_file:
+        yield from iter(lambda: log_file.read(chunk_size), b'')
+
+def _ranged_log_response(request, data_or_path, size, filename):
+    """Serve a whole log or the byte range asked for, from a file path or bytes"""
+    byte_range = _parse_range_header(request.META.get('HTTP_RANGE'), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is not None:
+        start, end = byte_range
+        if isinstance(data_or_path, bytes):
+            data = data_or_path[start:end + 1]
+        else:
+            with open(data_or_path, 'rb') as log_file:
+                log_file.seek(start)
+                data = log_file.read(end - start + 1)
+        # Range responses are never re-encoded so offsets stay meaningful
+        response = HttpResponse(data, status=206, content_type='text/plain; charset=utf-8')
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    if isinstance(data_or_path, bytes):
+        response = _log_response(request, data_or_path, filename)
+    elif 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = StreamingHttpResponse(compress_sequence(_iter_log_file(data_or_path)),
+                                         content_type='text/plain; charset=utf-8')
+        response['Content-Encoding'] = 'gzip'
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+        patch_vary_headers(response, ['Accept-Encoding'])
+    else:
+        response = FileResponse(open(data_or_path, 'rb'), content_type='text/plain; charset=utf-8',
+                                filename=filename, as_attachment=False)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_session_logs(request, session_id):
+    """List the game and player logs of a session"""
+    try:
+        session = get_object_or_404(GameSession, session_id=session_id, player=request.user)
+        log_dir = os.path.join(settings.MEDIA_ROOT, 'game_logs', str(session.session_id))
+
+        logs = []
+        if os.path.isdir(log_dir):
+            sync_session_log(session.session_id)
+            for filename in sorted(os.listdir(log_dir)):
+                stream, extension = os.path.splitext(filename)
+                if extension != '.txt':
+                    continue
+                log_path = os.path.join(log_dir, filename)
+                logs.append({
+                    'name': stream,
+                    'size': os.path.getsize(log_path),
+                    'hands': update_index(log_path),
+                    'archived': False
+                })
+        else:
+            archive = get_log_archive()
+            for stream in archive.streams(session.session_id):
+                logs.append({
+                    'name': stream,
+                    'size': None,
+                    'hands': len(archive.hands(session.session_id, stream)),
+                    'archived': True
+                })
+
+        return JsonResponse({'session_id': str(session.session_id), 'logs': logs})
+
+    except Exception as e:
+        logger.error(f"Error listing session logs: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_session_log(request, session_id, stream):
+    """
+    Serve a game or player log
+
+    Query parameters:
+        tail: return only the last N hands
+        hand: return only the hand with this round number (the latest one if
+              the session restarted its numbering)
+    Without them the whole log is served, honouring a "Range: bytes=" header.
+    """
+    try:
+        session = get_object_or_404(GameSession, session_id=session_id, player=request.user)
+        if not LOG_STREAM_PATTERN.match(stream):
+            return JsonResponse({'error': 'Invalid log name'}, status=400)
+
+        try:
+            tail = int(request.GET['tail']) if 'tail' in request.GET else None
+            hand = int(request.GET['hand']) if 'hand' in request.GET else None
+        except ValueError:
+            return JsonResponse({'error': 'tail and hand must be integers'}, status=400)
+        if tail is not None:
+            tail = max(0, min(tail, LOG_MAX_TAIL_HANDS))
+
+        filename = f"{stream}.txt"
+        log_path = _session_log_path(session.session_id, stream)
+
+        if os.path.exists(log_path):
+            sync_session_log(session.session_id)
+
+            if hand is not None:
+                text = read_hand_text(log_path, hand)
+                if text is None:
+                    return JsonResponse({'error': 'Hand not found'}, status=404)
+                return _log_response(request, text.encode(), filename)
+
+            if tail is not None:
+                start = tail_offset(log_path, tail)
+                if start is None:
+                    return _log_response(request, b'', filename)
+                with open(log_path, 'rb') as log_file:
+                    log_file.seek(start)
+                    return _log_response(request, log_file.read(), filename)
+
+            return _ranged_log_response(request, log_path, os.path.getsize(log_path), filename)
+
+        # Fall back to the segmented archive for sessions that were migrated
+        archive = get_log_archive()
+        if stream not in archive.streams(session.session_id):
+            return JsonResponse({'error': 'Log not found'}, status=404)
+
+        if hand is not None:
+            text = archive.read_hand(session.session_id, hand, stream)
+            if text is None:
+                return JsonResponse({'error': 'Hand not found'}, status=404)
+            return _log_response(request, text.encode(), filename)
+
+        if tail is not None:
+            text = archive.tail(session.session_id, tail, stream) if tail else ''
+            return _log_response(request, text.encode(), filename)
+
+        data = archive.read_stream(session.session_id, stream).encode()
+        return _ranged_log_response(request, data, len(data), filename)
+
+    except Exception as e:
+        logger.error(f"Error serving session log: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_bot_profile(request, bot_id):
+    """
+    Aggregated decision profile of a bot, per bot version
+
+    Query parameters:
+        version: ISO timestamp of the bot version; the latest profiled one if omitted
+        output: 'summary' (JSON, default), 'pstats' (file for pstats/snakeviz)
+                or 'collapsed' (collapsed stacks for flamegraph tools)
+    """
+    try:
+        bot = get_object_or_404(BotRepository, id=bot_id)
+        if bot.user_id != request.user.id and not request.user.is_staff:
+            return JsonResponse({'error': 'Profiles are only available to the bot owner'}, status=403)
+
+        profiles = list(bot.profiles.order_by('-bot_version'))
+        if not profiles:
+            return JsonResponse({'error': 'This bot has not been profiled'}, status=404)
+
+        version = request.GET.get('version')
+        profile = profiles[0] if not version else next(
+            (candidate for candidate in profiles if candidate.bot_version.isoformat() == version), None
+        )
+        if profile is None:
+            return JsonResponse({'error': f'No profile for version {version}'}, status=404)
+
+        stats = load_stats(profile.stats)
+        output = request.GET.get('output', 'summary')
+        filename = f"{bot.name.replace(' ', '_')}-{profile.bot_version:%Y%m%d%H%M%S}"
+        if output == 'pstats':
+            response = HttpResponse(dump_stats(stats), content_type='application/octet-stream')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.pstats"'
+            return response
+        if output == 'collapsed':
+            response = HttpResponse(collapsed_stacks(stats), content_type='text/plain; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.collapsed.txt"'
+            return response
+        if output != 'summary':
+            return JsonResponse({'error': "output must be 'summary', 'pstats' or 'collapsed'"}, status=400)
+
+        return JsonResponse({
+            'bot': str(bot.id),
+            'name': bot.name,
+            'version': profile.bot_version.isoformat(),
+            'decisions': profile.decisions,
+            'total_time': round(profile.total_time, 6),
+            'mean_decision_ms': round(1000 * profile.total_time / profile.decisions, 3) if profile.decisions else 0,
+            'top_functions': top_functions(stats),
+            'versions': [
+                {'version': candidate.bot_version.isoformat(), 'decisions': candidate.decisions,
+                 'total_time': round(candidate.total_time, 6)}
+                for candidate in profiles
+            ],
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting bot profile: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def list_bot_profiles(request):
+    """Profiled bot versions ordered by the decision time they used"""
+    try:
+        profiles = BotProfile.objects.select_related('bot').order_by('-total_time')[:200]
+        return JsonResponse({'profiles': [
+            {
+                'bot': str(profile.bot_id),
+                'name': profile.bot.name,
+                'version': profile.bot_version.isoformat(),
+                'decisions': profile.decisions,
+                'total_time': round(profile.total_time, 6),
+                'mean_decision_ms': round(1000 * profile.total_time / profile.decisions, 3) if profile.decisions else 0,
+            }
+            for profile in profiles
+        ]})
+
+    except Exception as e:
+        logger.error(f"Error listing bot profiles: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+def _hud_access_error(request, key):
+    """
+    Error response if the requester may not see HUD stats of a player key, else None
+
+    The house bot and public (active) bots are visible to everyone; users only
+    to themselves and private bots only to their owner.
+    """
+    if key == 'house' or request.user.is_staff:
+        return None
+    kind, _, value = key.partition(':')
+    if kind == 'user':
+        if value != str(request.user.id):
+            return JsonResponse({'error': "HUD stats of other users are private"}, status=403)
+        return None
+    if kind == 'bot':
+        try:
+            bot = BotRepository.objects.filter(id=uuid.UUID(value)).first()
+        except ValueError:
+            bot = None
+        if bot is None:
+            return JsonResponse({'error': 'Bot not found'}, status=404)
+        if not bot.is_active and bot.user_id != request.user.id:
+            return JsonResponse({'error': 'HUD stats of private bots are only available to the bot owner'}, status=403)
+        return None
+    return JsonResponse({'error': "Player keys look like 'bot:<uuid>', 'user:<id>' or 'house'"}, status=400)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_hud_stats(request):
+    """
+    Get HUD statistics for a player
+
+    Query parameters:
+        subject: 'bot:<uuid>', 'user:<id>' or 'house'
+        opponent: optional key of the same form; all opponents if omitted
+    """
+    try:
+        subject = request.GET.get('subject')
+        opponent = request.GET.get('opponent')
+
+        if not subject:
+            return JsonResponse({'error': 'subject is required'}, status=400)
+
+        for key in (subject, opponent):
+            error = key and _hud_access_error(request, key)
+            if error:
+                return error
+
+        return JsonResponse(get_hud(subject, opponent))
+
+    except Exception as e:
+        logger.error(f"Error getting HUD stats: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_bots(request):
@@ -695,9 +1054,14 @@ def start_bot_vs_bot_game(request):
         player_bot_id = data.get('player_bot_id')
         opponent_bot_id = data.get('opponent_bot_id')
         hands_to_play = data.get('hands_to_play', 100)
+        early_stopping = data.get('early_stopping') or ''
+        profile_bots = bool(data.get('profile', False))
         
         if not player_bot_id or not opponent_bot_id:
             return JsonResponse({'error': 'Both bots must be specified'}, status=400)
+
+        if early_stopping and early_stopping not in EARLY_STOPPING_METHODS:
+            return JsonResponse({'error': f"early_stopping must be one of {', '.join(EARLY_STOPPING_METHODS)}"}, status=400)
         
         try:
             player_bot = BotRepository.objects.get(id=player_bot_id)
@@ -713,6 +1077,8 @@ def start_bot_vs_bot_game(request):
             player_bot=player_bot,
             opponent_bot=opponent_bot,
             hands_to_play=hands_to_play,
+            early_stopping=early_stopping,
+            profile_bots=profile_bots,
             player_stack=200,
             bot_stack=200,
             current_coins=0,
@@ -738,8 +1104,6 @@ def start_bot_vs_bot_game(request):
         logger.error(f"Error starting bot vs bot game: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
     
-import subprocess
-import tempfile
 import os
 import json
 
@@ -780,58 +1144,54 @@ except Exception as e:
     traceback.print_exc()
 """
         
-        # Execute with timeout and sandboxing
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(python_code)
-            temp_file = f.name
-        
+        # Execute with timeout in a warm sandbox interpreter
         try:
-            result = subprocess.run(
-                ['python3', temp_file],
-                capture_output=True,
-                text=True,
-                timeout=5,  # 5 second timeout
-                cwd=tempfile.gettempdir()
-            )
-            
-            output = result.stdout
-            error = result.stderr if result.stderr else None
-            
-            return JsonResponse({
-                'output': output,
-                'error': error
-            })
-            
-        except subprocess.TimeoutExpired:
+            result = run_python(python_code, timeout=5)  # 5 second timeout
+        except SandboxBusy:
+            return JsonResponse({'output': '', 'error': 'All sandboxes are busy, try again'}, status=503)
+        
+        if result.timed_out:
             return JsonResponse({
-                'output': '',
-                'error': 'Command timed out'
+                'output': result.stdout,
+                'error': 'Command timed out',
+                'resources': result.resources
             })
-        finally:
-            os.unlink(temp_file)
+        
+        error = '\n'.join(filter(None, [result.stderr, limit_message(result)]))
+        return JsonResponse({
+            'output': result.stdout,
+            'error': error or None,
+            'resources': result.resources
+        })
             
     except Exception as e:
         logger.error(f"Error executing command: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def run_code(request):
-    """Run user Python code in a sandbox environment"""
+def _run_code_seed(data):
+    """
+    The seed of a run_code request, or None
+
+    A seeded run seeds the random module before the user code runs, so its
+    output only depends on the code and game state and can be cached.
+    """
+    seed = data.get('seed')
+    if seed is None:
+        return None
     try:
-        data = request.data
-        code_content = data.get('content', '')
-        game_state = data.get('game_state', {})
-        
-        if not code_content.strip():
-            return JsonResponse({'output': '', 'errors': []})
-        
-        # Prepare Python code with game_state available
-        python_code = f"""
+        return int(seed)
+    except (TypeError, ValueError):
+        raise ValueError('seed must be an integer')
+
+
+def _run_code_source(code_content, game_state, seed=None):
+    """Wrap user code for run_code, with game_state available"""
+    seeding = '' if seed is None else f"import random\nrandom.seed({seed})\n"
+    return f"""
 import json
 import sys
 import traceback
-
+{seeding}
 # Make game_state available
 game_state = {json.dumps(game_state)}
 
@@ -841,41 +1201,110 @@ except Exception as e:
     print(f"Error: {{e}}")
     traceback.print_exc()
 """
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def run_code(request):
+    """Run user Python code in a sandbox environment"""
+    try:
+        data = request.data
+        code_content = data.get('content', '')
+        game_state = data.get('game_state', {})
         
-        # Execute with timeout and sandboxing
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(python_code)
-            temp_file = f.name
+        if not code_content.strip():
+            return JsonResponse({'output': '', 'errors': []})
         
         try:
-            result = subprocess.run(
-                ['python3', temp_file],
-                capture_output=True,
-                text=True,
-                timeout=10,  # 10 second timeout for full scripts
-                cwd=tempfile.gettempdir()
-            )
-            
-            output = result.stdout
-            errors = [result.stderr] if result.stderr else []
-            
-            return JsonResponse({
-                'output': output,
-                'errors': errors
-            })
-            
-        except subprocess.TimeoutExpired:
+            seed = _run_code_seed(data)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
+        # Prepare Python code with game_state available
+        python_code = _run_code_source(code_content, game_state, seed)
+        
+        # Execute with timeout in a warm sandbox interpreter; seeded runs may come from the cache
+        try:
+            result = run_python(python_code, timeout=10, cache=seed is not None)  # 10 second timeout for full scripts
+        except SandboxBusy:
+            return JsonResponse({'output': '', 'errors': ['All sandboxes are busy, try again']}, status=503)
+        
+        if result.timed_out:
             return JsonResponse({
-                'output': '',
-                'errors': ['Code execution timed out']
+                'output': result.stdout,
+                'errors': ['Code execution timed out'],
+                'resources': result.resources
             })
-        finally:
-            os.unlink(temp_file)
+        
+        return JsonResponse({
+            'output': result.stdout,
+            'errors': list(filter(None, [result.stderr, limit_message(result)])),
+            'resources': result.resources,
+            'cached': result.cached
+        })
         
     except Exception as e:
         logger.error(f"Error running code: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
     
+def _server_sent_events(stream):
+    """Sandbox stream as server-sent events: stdout/stderr chunks, then the result"""
+    try:
+        for name, data in stream:
+            if name == 'result':
+                message = 'Code execution timed out' if data.timed_out else limit_message(data)
+                data = {
+                    'returncode': data.returncode,
+                    'timed_out': data.timed_out,
+                    'limit_exceeded': data.limit_exceeded,
+                    'errors': [message] if message else [],
+                    'resources': data.resources,
+                }
+            yield f"event: {name}\ndata: {json.dumps(data)}\n\n"
+    except SandboxError as e:
+        logger.error(f"Error streaming code: {str(e)}")
+        yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+    finally:
+        stream.close()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def stream_code(request):
+    """
+    Run user Python code in the sandbox, streaming its output as it is written
+
+    The response is text/event-stream: "stdout" and "stderr" events carry
+    JSON-encoded text, and a final "result" event carries the exit status,
+    any limit hit and the resources used. Output written before a timeout is
+    still delivered.
+    """
+    try:
+        data = request.data
+        code_content = data.get('content', '')
+        game_state = data.get('game_state', {})
+        
+        if not code_content.strip():
+            return JsonResponse({'output': '', 'errors': []})
+        
+        try:
+            seed = _run_code_seed(data)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
+        try:
+            stream = stream_python(_run_code_source(code_content, game_state, seed), timeout=10)
+        except SandboxBusy:
+            return JsonResponse({'output': '', 'errors': ['All sandboxes are busy, try again']}, status=503)
+        
+        response = StreamingHttpResponse(_server_sent_events(stream), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Don't let a proxy hold events back
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error streaming code: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+    
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def cashout_game(request):
@@ -913,5 +1342,7 @@ def cashout_game(request):
             'user': UserProfileSerializer(request.user).data
         }, status=status.HTTP_200_OK)
         
+    except GameSessionConflict as e:
+        return _session_conflict_response(e)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -1,6 +1,8 @@
 from pathlib import Path
 from decouple import config
 import os
+import sys
+import tempfile
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -133,6 +135,35 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Move a session's game and player logs into the segmented archive when it ends (see poker/log_archive.py)
+POKER_ARCHIVE_SESSION_LOGS = config('POKER_ARCHIVE_SESSION_LOGS', default=True, cast=bool)
+
+# Per-phase timing of make-move requests (see poker/tracing.py)
+POKER_TRACING = config('POKER_TRACING', default=False, cast=bool)
+
+# tracemalloc report stored with each bot vs bot simulation (see poker/memory.py)
+POKER_MEMORY_REPORT = config('POKER_MEMORY_REPORT', default=False, cast=bool)
+
+# Warm interpreters per web process for the IDE's run_code/execute_command (see poker/sandbox.py)
+POKER_SANDBOX_POOL_SIZE = config('POKER_SANDBOX_POOL_SIZE', default=2, cast=int)
+POKER_SANDBOX_PYTHON = config('POKER_SANDBOX_PYTHON', default=sys.executable)
+# Per-run sandbox limits; CPU time is limited to the run's timeout
+POKER_SANDBOX_MEMORY_MB = config('POKER_SANDBOX_MEMORY_MB', default=512, cast=int)
+POKER_SANDBOX_MAX_PROCESSES = config('POKER_SANDBOX_MAX_PROCESSES', default=64, cast=int)
+POKER_SANDBOX_MAX_OUTPUT = config('POKER_SANDBOX_MAX_OUTPUT', default=256 * 1024, cast=int)
+# Results of seeded sandbox runs kept per web process (see poker/result_cache.py)
+POKER_SANDBOX_CACHE_ENTRIES = config('POKER_SANDBOX_CACHE_ENTRIES', default=512, cast=int)
+POKER_SANDBOX_CACHE_BYTES = config('POKER_SANDBOX_CACHE_BYTES', default=32 * 1024 * 1024, cast=int)
+POKER_SANDBOX_CACHE_TTL = config('POKER_SANDBOX_CACHE_TTL', default=3600, cast=int)
+
+# IDE file storage (see poker/user_files.py); 'filesystem' keeps files under POKER_USER_FILES_ROOT instead of S3
+POKER_USER_FILES_STORAGE = config('POKER_USER_FILES_STORAGE', default='s3')
+POKER_USER_FILES_ROOT = config('POKER_USER_FILES_ROOT', default=os.path.join(BASE_DIR, 'user_files'))
+POKER_USER_FILES_MAX_CONNECTIONS = config('POKER_USER_FILES_MAX_CONNECTIONS', default=20, cast=int)
+# Local read-through copies of user files, checked against the bucket by ETag
+POKER_USER_FILES_CACHE_DIR = config('POKER_USER_FILES_CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'poker_user_files'))
+POKER_USER_FILES_CACHE_BYTES = config('POKER_USER_FILES_CACHE_BYTES', default=64 * 1024 * 1024, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
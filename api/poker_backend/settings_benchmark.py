@@ -0,0 +1,14 @@
+# Settings for `manage.py run_benchmarks`: an in-memory database so the
+# manager and simulator benchmarks never touch a real one
+import tempfile
+from .settings import *
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        # Shared cache so the simulator thread sees the same in-memory database
+        'NAME': 'file:benchmark?mode=memory&cache=shared',
+    }
+}
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='poker_benchmark_')